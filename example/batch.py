@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+批量处理多份数据库手册 PDF（不同 Aspen 版本）
+  - 输入：目录（递归查找 *.pdf）或 glob 模式，可给多个
+  - 每份文档在进程池中独立跑 pdf.py 的单遍流程（抽取 → 识别 → 解析 → CSV）
+  - 清单 manifest.json 记录每份文档的 sha256、状态、耗时、页数、行数；
+    sha256 已在清单中且成功的文档直接跳过，失败的下次重跑
+  - --page-timeout：逐页在受监督的子进程中提取，失败页面记入清单
+
+用法:
+  python example/batch.py manuals/ -o example/data/batch --workers 4
+  python example/batch.py "manuals/V1*/**/*.pdf"
+"""
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import time
+
+from page_cache import file_sha256, open_cache
+from pdf import (DEFAULT_BACKENDS, extract_text_pages, parse_alias_name_from_text,
+                 parse_backends, relevant_lines, write_records_csv)
+
+MANIFEST_VERSION = 1
+
+
+def find_pdfs(inputs):
+    """目录递归查找 *.pdf，其余按 glob 展开；去重并保持顺序"""
+    found = []
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            found.extend(sorted(p for p in path.rglob("*") if p.suffix.lower() == ".pdf"))
+        elif path.is_file():
+            found.append(path)
+        else:
+            found.extend(Path(p) for p in sorted(glob.glob(item, recursive=True)))
+    seen = set()
+    return [p for p in found if not (p.resolve() in seen or seen.add(p.resolve()))]
+
+
+def load_manifest(path):
+    """读取清单 {sha256: 记录}；不存在或版本不符时返回空清单"""
+    try:
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    if data.get("version") != MANIFEST_VERSION:
+        return {}
+    return data.get("documents", {})
+
+
+def save_manifest(path, documents):
+    """先写临时文件再替换，中途中断也不会留下半个清单"""
+    path = Path(path)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps({"version": MANIFEST_VERSION, "documents": documents},
+                              ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def process_document(pdf_path, pdf_hash, out_dir, backends=DEFAULT_BACKENDS, use_cache=True, page_timeout=None):
+    """子进程任务：处理一份 PDF，写出 CSV 与中间文本，返回清单记录"""
+    pdf_path = Path(pdf_path)
+    out_csv = Path(out_dir) / f"{pdf_path.stem}-{pdf_hash[:8]}.csv"
+    mid_txt = out_csv.with_suffix(".pages_text.txt")
+    entry = {"path": str(pdf_path), "output": str(out_csv), "status": "ok",
+             "pages": 0, "rows": 0, "seconds": 0.0, "error": None, "failed_pages": []}
+
+    def counted(page_texts):
+        for page in page_texts:
+            entry["pages"] += 1
+            yield page
+
+    t0 = time.perf_counter()
+    cache = open_cache(use_cache)
+    try:
+        # 单文档的逐页日志不打到批处理输出里
+        with contextlib.redirect_stdout(io.StringIO()), mid_txt.open("w", encoding="utf-8") as sink:
+            pages = counted(extract_text_pages(pdf_path, cache, backends=backends, page_timeout=page_timeout,
+                                               failures=entry["failed_pages"]))
+            records = parse_alias_name_from_text(relevant_lines(pages, sink), normalized=True)
+        write_records_csv(out_csv, records)
+        entry["rows"] = len(records)
+    except Exception as e:
+        entry["status"] = "failed"
+        entry["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        if cache is not None:
+            cache.close()
+    entry["seconds"] = round(time.perf_counter() - t0, 3)
+    return entry
+
+
+def run_batch(inputs, out_dir, manifest_path=None, workers=None, backends=DEFAULT_BACKENDS, use_cache=True,
+              page_timeout=None):
+    """批量处理，返回本次运行的清单记录列表"""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = Path(manifest_path) if manifest_path else out_dir / "manifest.json"
+    documents = load_manifest(manifest_path)
+
+    pdfs = find_pdfs(inputs)
+    print(f"📚 找到 PDF: {len(pdfs)} 份")
+    todo = {}
+    for pdf_path in pdfs:
+        pdf_hash = file_sha256(pdf_path)
+        if documents.get(pdf_hash, {}).get("status") == "ok":
+            print(f"⏭️  已处理，跳过: {pdf_path}")
+        elif pdf_hash in todo:
+            print(f"⏭️  内容重复，跳过: {pdf_path}（同 {todo[pdf_hash]}）")
+        else:
+            todo[pdf_hash] = pdf_path
+    if not todo:
+        print("✅ 没有需要处理的文档")
+        return []
+
+    workers = max(1, min(workers or os.cpu_count() or 1, len(todo)))
+    print(f"🚀 待处理: {len(todo)} 份，进程数: {workers}")
+    results = []
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(process_document, pdf_path, pdf_hash, out_dir, backends, use_cache,
+                               page_timeout): pdf_hash
+                   for pdf_hash, pdf_path in todo.items()}
+        for future in as_completed(futures):
+            pdf_hash = futures[future]
+            try:
+                entry = future.result()
+            except Exception as e:  # 子进程崩溃等
+                entry = {"path": str(todo[pdf_hash]), "output": None, "status": "failed",
+                         "pages": 0, "rows": 0, "seconds": 0.0, "error": f"{type(e).__name__}: {e}",
+                         "failed_pages": []}
+            documents[pdf_hash] = entry
+            save_manifest(manifest_path, documents)  # 每完成一份就落盘
+            results.append(entry)
+            if entry["status"] == "ok":
+                failed = f", 失败页 {len(entry['failed_pages'])}" if entry["failed_pages"] else ""
+                print(f"  ✅ {entry['path']}: {entry['pages']} 页, {entry['rows']} 行, {entry['seconds']:.1f}s{failed}")
+            else:
+                print(f"  ❌ {entry['path']}: {entry['error']}")
+
+    n_ok = sum(1 for entry in results if entry["status"] == "ok")
+    print(f"\n🎉 完成 {n_ok}/{len(results)} 份，用时 {time.perf_counter() - t0:.1f}s")
+    print(f"📋 清单: {manifest_path}")
+    return results
+
+
+def main():
+    ap = argparse.ArgumentParser(description="批量处理多份数据库手册 PDF")
+    ap.add_argument("inputs", nargs="+", help="PDF 文件、目录或 glob 模式")
+    ap.add_argument("-o", "--out-dir", default="example/data/batch", help="输出目录（每份文档一个 CSV）")
+    ap.add_argument("--manifest", default=None, help="清单路径（默认 <out-dir>/manifest.json）")
+    ap.add_argument("--workers", type=int, default=None, help="并行进程数（默认 CPU 核数）")
+    ap.add_argument("--backend", dest="backends", type=parse_backends, default=DEFAULT_BACKENDS,
+                    help="提取后端（逗号分隔的回退顺序），默认 auto")
+    ap.add_argument("--no-cache", action="store_true", help="不读写逐页文本缓存")
+    ap.add_argument("--page-timeout", type=float, default=None, metavar="SECONDS",
+                    help="每页限时，超时/崩溃的页面换下一个后端重试一次（记入清单 failed_pages）")
+    args = ap.parse_args()
+
+    run_batch(args.inputs, args.out_dir, args.manifest, args.workers, args.backends, not args.no_cache,
+              args.page_timeout)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
 import time, win32com.client, pythoncom
 
+from compound_index import resolve_with_local_index
+
 # ==============   配置：要添加的组分关键字   ==============
 wanted = [
     "water", 
@@ -10,6 +12,9 @@ wanted = [
 
 # =========================================================
 
+# 本地化合物索引批量预解析（见 compound_index.py），命中的关键字不再经过 COM
+local_ids = resolve_with_local_index(wanted)
+
 def find_component_id_basic(app, keyword):
     """
     基础版组分查找：使用Aspen Plus内置搜索
@@ -30,6 +35,12 @@ def find_component_id_basic(app, keyword):
         component_id = common_components[keyword_lower]
         print(f"[SUCCESS] 内置映射找到: '{keyword}' → {component_id}")
         return component_id
+
+    # 本地索引预解析结果（同样不经 COM）
+    if keyword in local_ids:
+        component_id = local_ids[keyword]
+        print(f"[SUCCESS] 本地索引找到: '{keyword}' → {component_id}")
+        return component_id
     
     try:
         # 方法2: 尝试通过Engine访问（如果有的话）
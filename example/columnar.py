@@ -0,0 +1,442 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+列式化合物数据库格式（.col），与 CSV 并存，供加载方 mmap 直接使用
+文件布局：
+  MAGIC(8 字节) | 头部长度(8 字节, 小端) | JSON 头部 | 对齐到 8 字节的各列缓冲区
+列类型：
+  - str : 偏移数组 (n+1 个) + UTF-8 数据缓冲区，按需解码单个字符串
+  - dict: 字典编码，取值表放在头部，每行一个整数编码（databank / source_table 等重复值多的列）
+  - int : 定长整数数组
+只依赖标准库 array / mmap / memoryview；装了 numpy 时可零拷贝得到整列数组
+
+用法:
+  python example/columnar.py convert example/data/final_compounds.csv --dict-columns databank,source_table
+  python example/columnar.py info example/data/final_compounds.col
+  python example/columnar.py bench example/data/final_compounds.csv
+"""
+
+from array import array
+from pathlib import Path
+import argparse
+import csv
+import json
+import mmap
+import sys
+import tempfile
+
+MAGIC = b"CMPDCOL1"
+ALIGN = 8
+SUFFIX = ".col"
+
+
+def columnar_path(csv_path):
+    """与 CSV 并存的列式文件路径：xxx.csv → xxx.col"""
+    return Path(csv_path).with_suffix(SUFFIX)
+
+
+def _smallest_typecode(max_value, signed=False):
+    for code in (("b", "h", "i", "q") if signed else ("B", "H", "I", "Q")):
+        if max_value < 1 << (array(code).itemsize * 8 - signed):
+            return code
+    raise OverflowError(max_value)
+
+
+SPILL_ITEMS = 1 << 16  # 每个列缓冲区攒满这么多项就写入临时文件
+
+
+class _SpillBuffer:
+    """
+    只追加的列缓冲区：内存中最多攒 SPILL_ITEMS 项，满了写入临时文件；
+    close 时按块读回（整数数组可顺便转换成更小的类型），内存占用与总行数无关
+    """
+
+    def __init__(self, typecode, tmp_dir=None):
+        self.typecode = typecode
+        self.pending = bytearray() if typecode == "B" else array(typecode)
+        self.file = tempfile.TemporaryFile(dir=tmp_dir)
+        self.spilled = 0
+
+    def __len__(self):
+        return self.spilled + len(self.pending)
+
+    def append(self, value):
+        self.pending.append(value)
+        if len(self.pending) >= SPILL_ITEMS:
+            self.flush()
+
+    def extend(self, raw):
+        self.pending += raw
+        if len(self.pending) >= SPILL_ITEMS:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            self.file.write(self.pending)
+            self.spilled += len(self.pending)
+            del self.pending[:]
+
+    def chunks(self, typecode):
+        """按块读回，每块转换成 typecode 后的字节"""
+        self.flush()
+        self.file.seek(0)
+        itemsize = array(self.typecode).itemsize
+        while True:
+            raw = self.file.read(SPILL_ITEMS * itemsize)
+            if not raw:
+                return
+            if typecode == self.typecode:
+                yield raw
+            else:
+                chunk = array(self.typecode)
+                chunk.frombytes(raw)
+                yield array(typecode, chunk).tobytes()
+
+    def close(self):
+        self.file.close()
+
+
+class ColumnarWriter:
+    """
+    逐行追加、close() 时写出；每列的缓冲区分块写入临时文件，close 时再拼接到 .col
+    columns: 列名；dict_columns: 做字典编码的列；int_columns: 整数列
+    tmp_dir: 临时文件目录（默认系统临时目录）
+    """
+
+    def __init__(self, path, columns, dict_columns=(), int_columns=(), tmp_dir=None):
+        self.path = Path(path)
+        self.columns = list(columns)
+        self.kinds = ["dict" if c in dict_columns else "int" if c in int_columns else "str" for c in self.columns]
+        self.num_rows = 0
+        self._spills = []
+        self._data = []
+        for kind in self.kinds:
+            if kind == "str":
+                offsets = self._spill("Q", tmp_dir)
+                offsets.append(0)
+                self._data.append((offsets, self._spill("B", tmp_dir)))
+            elif kind == "dict":
+                self._data.append(({}, self._spill("I", tmp_dir)))
+            else:
+                self._data.append([self._spill("q", tmp_dir), 0, 0])  # 缓冲区, 最小值, 最大值
+
+    def _spill(self, typecode, tmp_dir):
+        buf = _SpillBuffer(typecode, tmp_dir)
+        self._spills.append(buf)
+        return buf
+
+    def append(self, row):
+        for kind, data, value in zip(self.kinds, self._data, row):
+            if kind == "str":
+                offsets, buf = data
+                buf.extend(value.encode("utf-8"))
+                offsets.append(len(buf))
+            elif kind == "dict":
+                mapping, codes = data
+                code = mapping.get(value)
+                if code is None:
+                    code = mapping[value] = len(mapping)
+                codes.append(code)
+            else:
+                value = int(value)
+                data[0].append(value)
+                data[1], data[2] = min(data[1], value), max(data[2], value)
+        self.num_rows += 1
+
+    def extend(self, rows):
+        for row in rows:
+            self.append(row)
+
+    def _buffers(self):
+        """每列 → (头部描述, [(缓冲区, 写出类型), ...])；整数数组压成能容纳最大值的最小类型"""
+        for name, kind, data in zip(self.columns, self.kinds, self._data):
+            if kind == "str":
+                offsets, buf = data
+                yield {"name": name, "kind": kind}, [(offsets, _smallest_typecode(len(buf))), (buf, "B")]
+            elif kind == "dict":
+                mapping, codes = data
+                yield ({"name": name, "kind": kind, "values": list(mapping)},
+                       [(codes, _smallest_typecode(max(len(mapping) - 1, 0)))])
+            else:
+                buf, lo, hi = data
+                yield {"name": name, "kind": kind}, [(buf, _smallest_typecode(max(hi, -lo - 1, 0), signed=lo < 0))]
+
+    def abort(self):
+        """丢弃已追加的行、删除临时文件，不写出 .col；close() 之后调用无副作用"""
+        for buf in self._spills:
+            buf.close()
+        self._spills = []
+
+    def close(self):
+        columns, buffers = [], []
+        position = 0
+        for meta, bufs in self._buffers():
+            meta["buffers"] = []
+            for buf, typecode in bufs:
+                length = len(buf) * array(typecode).itemsize
+                meta["buffers"].append({"offset": position, "length": length, "typecode": typecode})
+                buffers.append((buf, typecode, length))
+                position += length + (-length % ALIGN)
+            columns.append(meta)
+        header = json.dumps({"num_rows": self.num_rows, "byteorder": sys.byteorder, "columns": columns},
+                            ensure_ascii=False).encode("utf-8")
+        header += b" " * (-(len(MAGIC) + 8 + len(header)) % ALIGN)
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")  # 写完再改名，中途出错不留半个 .col
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(MAGIC)
+                f.write(len(header).to_bytes(8, "little"))
+                f.write(header)
+                for buf, typecode, length in buffers:
+                    for raw in buf.chunks(typecode):
+                        f.write(raw)
+                    f.write(b"\0" * (-length % ALIGN))
+            tmp_path.replace(self.path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+            self.abort()
+        return self.path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class StrColumn:
+    """偏移 + UTF-8 缓冲区；按下标解码单个字符串"""
+
+    def __init__(self, offsets, data):
+        self.offsets = offsets
+        self.data = data
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        return str(self.data[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+    def __iter__(self):
+        offsets, data = self.offsets, self.data
+        for i in range(len(self)):
+            yield str(data[offsets[i]:offsets[i + 1]], "utf-8")
+
+
+class DictColumn:
+    """字典编码列：values 为取值表，codes 为每行的编码"""
+
+    def __init__(self, values, codes):
+        self.values = values
+        self.codes = codes
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, i):
+        return self.values[self.codes[i]]
+
+    def __iter__(self):
+        values = self.values
+        return (values[code] for code in self.codes)
+
+    def code_of(self, value):
+        """取值 → 编码（不存在返回 None），便于直接在编码数组上过滤"""
+        try:
+            return self.values.index(value)
+        except ValueError:
+            return None
+
+
+class ColumnarTable:
+    """mmap 打开 .col 文件；各列是指向映射内存的 memoryview，打开几乎不花时间，也不占用额外内存"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._file = open(self.path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"不是列式化合物文件: {self.path}")
+        header_len = int.from_bytes(self._mmap[len(MAGIC):len(MAGIC) + 8], "little")
+        start = len(MAGIC) + 8
+        header = json.loads(self._mmap[start:start + header_len])
+        base = start + header_len
+        swap = header["byteorder"] != sys.byteorder
+
+        self.num_rows = header["num_rows"]
+        self._views = []
+        self.columns = {}
+        for meta in header["columns"]:
+            bufs = [self._buffer(base, spec, swap) for spec in meta["buffers"]]
+            if meta["kind"] == "str":
+                self.columns[meta["name"]] = StrColumn(bufs[0], bufs[1])
+            elif meta["kind"] == "dict":
+                self.columns[meta["name"]] = DictColumn(meta["values"], bufs[0])
+            else:
+                self.columns[meta["name"]] = bufs[0]
+
+    def _buffer(self, base, spec, swap):
+        view = memoryview(self._mmap)[base + spec["offset"]:base + spec["offset"] + spec["length"]]
+        self._views.append(view)
+        if spec["typecode"] == "B":
+            return view
+        if swap:  # 字节序不同的机器上写出的文件：复制一份并转换
+            arr = array(spec["typecode"], view)
+            arr.byteswap()
+            return arr
+        cast = view.cast(spec["typecode"])
+        self._views.append(cast)
+        return cast
+
+    @property
+    def column_names(self):
+        return list(self.columns)
+
+    def __len__(self):
+        return self.num_rows
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def row(self, i):
+        return tuple(column[i] for column in self.columns.values())
+
+    def iter_rows(self):
+        return zip(*self.columns.values())
+
+    def numpy(self, name):
+        """整数列 / 字典列编码 → numpy 数组（零拷贝，只读）"""
+        import numpy as np
+
+        column = self.columns[name]
+        return np.asarray(column.codes if isinstance(column, DictColumn) else column)
+
+    def close(self):
+        views, self._views = getattr(self, "_views", []), []
+        self.columns = {}
+        try:
+            for view in reversed(views):
+                view.release()
+            self._mmap.close()
+        except BufferError:
+            # 外部仍持有由列导出的缓冲区（如 numpy 数组），映射在最后一个引用释放时自动关闭
+            pass
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_csv_as_columnar(csv_path, out_path=None, dict_columns=(), int_columns=()):
+    """把已有 CSV（首行为表头）转成列式文件，返回输出路径"""
+    out_path = Path(out_path) if out_path else columnar_path(csv_path)
+    with open(csv_path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            raise ValueError(f"空 CSV: {csv_path}")
+        with ColumnarWriter(out_path, header, dict_columns, int_columns) as writer:
+            writer.extend(reader)
+    return out_path
+
+
+# --------- 命令行 ---------
+def _load_csv_dicts(path):
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        rows = list(csv.DictReader(f))
+    return len(rows)
+
+
+def _load_columnar(path):
+    with ColumnarTable(path) as table:
+        return len(table)
+
+
+def _timed_load(loader, path):
+    """子进程任务：加载一次，返回 (秒, 峰值 RSS)"""
+    import time
+    from perf import peak_rss_bytes
+
+    base = peak_rss_bytes()
+    t0 = time.perf_counter()
+    loader(path)
+    return time.perf_counter() - t0, peak_rss_bytes(), base
+
+
+def cmd_convert(args):
+    out = write_csv_as_columnar(args.csv, args.output, _split(args.dict_columns), _split(args.int_columns))
+    print(f"💾 {args.csv} → {out} ({out.stat().st_size:,} 字节)")
+
+
+def cmd_info(args):
+    with ColumnarTable(args.path) as table:
+        print(f"📦 {args.path}: {len(table):,} 行")
+        for name, column in table.columns.items():
+            if isinstance(column, DictColumn):
+                print(f"   {name}: dict（{len(column.values)} 个取值）")
+            elif isinstance(column, StrColumn):
+                print(f"   {name}: str（{len(column.data):,} 字节）")
+            else:
+                print(f"   {name}: int（{column.format}）")
+        for i in range(min(args.head, len(table))):
+            print(f"   {i:2d}. {table.row(i)}")
+
+
+def cmd_bench(args):
+    from perf import format_bytes, run_isolated
+
+    csv_path = Path(args.csv)
+    col_path = columnar_path(csv_path)
+    if not col_path.exists():
+        write_csv_as_columnar(csv_path, col_path, _split(args.dict_columns))
+    print(f"{'loader':<26}{'sec':>9}{'peak RSS':>12}{'RSS 增量':>12}")
+    for label, loader, path in (("csv.DictReader → list", _load_csv_dicts, csv_path),
+                                ("ColumnarTable (mmap)", _load_columnar, col_path)):
+        seconds, peak, base = run_isolated(_timed_load, loader, path)
+        delta = peak - base if peak is not None and base is not None else None
+        print(f"{label:<26}{seconds:>9.4f}{format_bytes(peak):>12}{format_bytes(delta):>12}")
+
+
+def _split(value):
+    return tuple(v.strip() for v in (value or "").split(",") if v.strip())
+
+
+def main():
+    ap = argparse.ArgumentParser(description="列式化合物数据库（mmap）工具")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p1 = sub.add_parser("convert", help="CSV → .col")
+    p1.add_argument("csv", help="输入 CSV（首行为表头）")
+    p1.add_argument("-o", "--output", default=None, help="输出路径（默认与 CSV 同名 .col）")
+    p1.add_argument("--dict-columns", default="databank,source_table", help="字典编码的列（逗号分隔）")
+    p1.add_argument("--int-columns", default="", help="整数列（逗号分隔）")
+    p1.set_defaults(func=cmd_convert)
+
+    p2 = sub.add_parser("info", help="查看 .col 文件的列与前几行")
+    p2.add_argument("path")
+    p2.add_argument("--head", type=int, default=5)
+    p2.set_defaults(func=cmd_info)
+
+    p3 = sub.add_parser("bench", help="对比 CSV 全量解析与 mmap 打开的耗时与内存")
+    p3.add_argument("csv")
+    p3.add_argument("--dict-columns", default="databank,source_table")
+    p3.set_defaults(func=cmd_bench)
+
+    args = ap.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
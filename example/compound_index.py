@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+本地化合物查找索引（SQLite），由合并后的化合物 CSV 构建
+  - 每个化合物登记若干规范化键：别名、注册名、分子式（别名去掉异构体后缀，如 C2H6O-2 → C2H6O）、CAS 号
+  - keys 表为 WITHOUT ROWID，主键 (key, kind, alias, name) 即覆盖索引：按键查找只读一段连续的 B 树叶子
+  - 批量查找：关键字先写入临时表，一次 JOIN 取回全部命中，几千个关键字只需几毫秒
+  - Aspen 自动化脚本（cate.py / search.py）先用它批量解析，只有未命中或有歧义的关键字才走 COM
+
+CSV 中没有 CAS 号；需要时用 --cas 提供补充表（列: cas 与 alias_or_code 或 alias）
+
+用法:
+  python example/compound_index.py build example/data/final_compounds.csv --cas example/data/cas.csv
+  python example/compound_index.py lookup water C2H6O 7732-18-5
+  python example/compound_index.py bench --n 5000
+"""
+
+from pathlib import Path
+from typing import NamedTuple
+import argparse
+import csv
+import re
+import sqlite3
+import time
+import unicodedata
+
+DEFAULT_INDEX = "example/data/compound_index.sqlite3"
+DEFAULT_SOURCE = "example/data/final_compounds.csv"
+INDEX_VERSION = 1
+# 键的种类，数值越小优先级越高：同一关键字同时命中别名和分子式时以别名为准
+KINDS = ("alias", "name", "cas", "formula")
+KIND_ALIAS, KIND_NAME, KIND_CAS, KIND_FORMULA = range(len(KINDS))
+
+CAS_PATTERN = re.compile(r"(\d{2,7})-?(\d{2})-?(\d)")
+# 别名 = 分子式 [-异构体后缀]；分子式部分须以字母或括号开头且含数字（CH4、C2H6O-2、(NH4)2SO4）
+FORMULA_ALIAS = re.compile(r"([A-Z(][A-Z0-9()]*?\d[A-Z0-9()]*)(?:-[A-Z0-9]+)?")
+
+
+class Match(NamedTuple):
+    kind: str
+    alias: str
+    name: str
+    databank: str
+
+
+def _cas_checksum_ok(digits, check):
+    """CAS 校验位：除校验位外的数字自右向左依次乘 1, 2, 3, ... 求和，模 10"""
+    return sum(i * int(d) for i, d in enumerate(reversed(digits), 1)) % 10 == int(check)
+
+
+def is_cas(key):
+    m = CAS_PATTERN.fullmatch(key)
+    return bool(m) and _cas_checksum_ok(m.group(1) + m.group(2), m.group(3))
+
+
+def normalize_key(text):
+    """
+    统一大小写与分隔符：全角转半角、大写、空白/下划线并成 "-"；
+    校验位正确的 CAS 号统一成 N-NN-N（去前导零，分隔符可省略）
+    """
+    key = re.sub(r"[\s_]+", "-", unicodedata.normalize("NFKC", str(text)).strip().upper())
+    if is_cas(key):
+        m = CAS_PATTERN.fullmatch(key)
+        return f"{int(m.group(1))}-{m.group(2)}-{m.group(3)}"
+    return key
+
+
+def formula_of(alias):
+    """别名看起来是分子式（可带异构体后缀）时返回分子式部分，否则 None"""
+    m = FORMULA_ALIAS.fullmatch(alias)
+    return m.group(1) if m else None
+
+
+def iter_source_rows(csv_path):
+    """读取合并 CSV（alias_or_code / registered_name）或几何提取 CSV（alias / name）"""
+    with open(csv_path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            alias = (row.get("alias_or_code") or row.get("alias") or "").strip().upper()
+            name = (row.get("registered_name") or row.get("name") or "").strip().upper()
+            if alias and name:
+                yield alias, name, (row.get("databank") or "").strip()
+
+
+def _iter_cas_rows(csv_path):
+    with open(csv_path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            cas = normalize_key(row.get("cas") or "")
+            alias = (row.get("alias_or_code") or row.get("alias") or "").strip().upper()
+            if alias and is_cas(cas):
+                yield cas, alias
+
+
+def best_matches(matches):
+    """lookup_many 的结果中优先级最高的那类命中"""
+    return [m for m in matches if m.kind == matches[0].kind] if matches else []
+
+
+def unique_alias(matches):
+    """最高优先级命中对应唯一别名时返回该别名，否则（未命中或有歧义）None"""
+    aliases = {m.alias for m in best_matches(matches)}
+    return aliases.pop() if len(aliases) == 1 else None
+
+
+class CompoundIndex:
+    """本地化合物索引；可作为上下文管理器使用"""
+
+    def __init__(self, path=DEFAULT_INDEX, check_same_thread=True):
+        self.path = Path(path)
+        # check_same_thread=False：供多线程服务使用，由调用方加锁串行化访问
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=check_same_thread)
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS keys (
+                key TEXT NOT NULL, kind INTEGER NOT NULL,
+                alias TEXT NOT NULL, name TEXT NOT NULL, databank TEXT NOT NULL,
+                PRIMARY KEY (key, kind, alias, name)
+            ) WITHOUT ROWID;
+            CREATE TEMP TABLE IF NOT EXISTS query (key TEXT PRIMARY KEY) WITHOUT ROWID;
+            """
+        )
+
+    @classmethod
+    def build(cls, path, sources, cas_files=()):
+        """从一个或多个化合物 CSV（及可选的 CAS 补充表）重建索引，返回 CompoundIndex"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.unlink(missing_ok=True)
+        index = cls(tmp)
+        compounds = {}  # (alias, name) → databank，先出现的优先
+        for source in sources:
+            for alias, name, databank in iter_source_rows(source):
+                compounds.setdefault((alias, name), databank)
+        rows = set()
+        by_alias = {}
+        for (alias, name), databank in compounds.items():
+            by_alias.setdefault(alias, []).append((name, databank))
+            rows.add((normalize_key(alias), KIND_ALIAS, alias, name, databank))
+            rows.add((normalize_key(name), KIND_NAME, alias, name, databank))
+            formula = formula_of(alias)
+            if formula is not None:
+                rows.add((formula, KIND_FORMULA, alias, name, databank))
+        n_cas = 0
+        for cas_file in cas_files:
+            for cas, alias in _iter_cas_rows(cas_file):
+                for name, databank in by_alias.get(alias, ()):
+                    rows.add((cas, KIND_CAS, alias, name, databank))
+                    n_cas += 1
+        with index.conn:
+            index.conn.executemany("INSERT INTO keys VALUES (?, ?, ?, ?, ?)", sorted(rows))
+            index.conn.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)", [
+                ("version", str(INDEX_VERSION)),
+                ("sources", ";".join(str(s) for s in sources)),
+                ("compounds", str(len(compounds))),
+                ("cas_keys", str(n_cas)),
+                ("built_at", time.strftime("%Y-%m-%d %H:%M:%S")),
+            ])
+        index.close()
+        tmp.replace(path)  # 建好后整体替换，读者不会看到半个索引
+        return cls(path)
+
+    def meta(self):
+        return dict(self.conn.execute("SELECT key, value FROM meta"))
+
+    def lookup_many(self, keywords):
+        """
+        批量查找：{关键字: [Match, ...]}，每个关键字的结果按键种类优先级、别名排序；未命中为空列表
+        """
+        keys = {kw: normalize_key(kw) for kw in keywords}
+        hits = {}
+        with self.conn:
+            self.conn.execute("DELETE FROM temp.query")
+            self.conn.executemany("INSERT OR IGNORE INTO temp.query VALUES (?)", ((k,) for k in set(keys.values())))
+            for key, kind, alias, name, databank in self.conn.execute(
+                """
+                SELECT k.key, k.kind, k.alias, k.name, k.databank
+                FROM temp.query q JOIN keys k ON k.key = q.key
+                ORDER BY k.key, k.kind, k.alias, k.name
+                """
+            ):
+                hits.setdefault(key, []).append(Match(KINDS[kind], alias, name, databank))
+        return {kw: hits.get(key, []) for kw, key in keys.items()}
+
+    def lookup(self, keyword):
+        return self.lookup_many([keyword])[keyword]
+
+    def resolve_many(self, keywords):
+        """
+        批量解析为别名：{关键字: 别名或 None}
+        只看优先级最高的那类命中；该类命中唯一的别名才算解析成功，有歧义（如分子式对应多个异构体）返回 None
+        """
+        return {kw: unique_alias(matches) for kw, matches in self.lookup_many(keywords).items()}
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def resolve_with_local_index(keywords, path=DEFAULT_INDEX):
+    """
+    供 Aspen 自动化脚本调用：用本地索引批量预解析，返回 {关键字: 别名}（只含解析成功的）；
+    索引不存在时返回空 dict，调用方照常走 COM
+    """
+    if not Path(path).exists():
+        print(f"[INFO] 本地化合物索引不存在: {path}（python example/compound_index.py build 生成），全部交给 Aspen 解析")
+        return {}
+    with CompoundIndex(path) as index:
+        resolved = {kw: alias for kw, alias in index.resolve_many(keywords).items() if alias}
+    print(f"[INFO] 本地索引预解析: {len(resolved)}/{len(keywords)} 个关键字")
+    return resolved
+
+
+def cmd_build(args):
+    sources = [Path(s) for s in args.sources]
+    missing = [s for s in sources + [Path(c) for c in args.cas] if not s.exists()]
+    if missing:
+        print(f"❌ 文件不存在: {', '.join(map(str, missing))}")
+        return
+    t0 = time.perf_counter()
+    with CompoundIndex.build(args.output, sources, args.cas) as index:
+        meta = index.meta()
+        counts = dict(index.conn.execute("SELECT kind, COUNT(*) FROM keys GROUP BY kind"))
+    print(f"🗂️  {args.output}: {int(meta['compounds']):,} 个化合物，{time.perf_counter() - t0:.2f}s")
+    for kind, name in enumerate(KINDS):
+        print(f"   {name:8s}: {counts.get(kind, 0):,} 个键")
+
+
+def cmd_lookup(args):
+    with CompoundIndex(args.index) as index:
+        results = index.lookup_many(args.keywords)
+        resolved = index.resolve_many(args.keywords)
+    for kw in args.keywords:
+        matches = results[kw]
+        status = f"→ {resolved[kw]}" if resolved[kw] else ("（有歧义）" if matches else "（未找到）")
+        print(f"🔍 {kw} {status}")
+        for m in matches[:args.limit]:
+            print(f"   [{m.kind}] {m.alias:15s} {m.name}  ({m.databank})")
+        if len(matches) > args.limit:
+            print(f"   ... (还有 {len(matches) - args.limit} 个)")
+
+
+def cmd_bench(args):
+    import random
+    with CompoundIndex(args.index) as index:
+        keys = [k for (k,) in index.conn.execute("SELECT key FROM keys")]
+        rnd = random.Random(args.seed)
+        # 一半命中（改写大小写/分隔符），一半不存在
+        keywords = [rnd.choice(keys).lower().replace("-", " ") if i % 2 else f"NO-SUCH-{i}" for i in range(args.n)]
+        index.lookup_many(keywords[:10])  # 预热
+        t0 = time.perf_counter()
+        resolved = index.resolve_many(keywords)
+        elapsed = time.perf_counter() - t0
+    n_hit = sum(1 for alias in resolved.values() if alias)
+    print(f"⏱️  批量解析 {args.n:,} 个关键字: {elapsed * 1000:.1f} ms（唯一解析 {n_hit:,} 个）")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="本地化合物查找索引（别名 / 注册名 / 分子式 / CAS）")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    pb = sub.add_parser("build", help="从化合物 CSV 构建索引")
+    pb.add_argument("sources", nargs="*", default=[DEFAULT_SOURCE], help="化合物 CSV（可多个，先出现的优先）")
+    pb.add_argument("-o", "--output", default=DEFAULT_INDEX, help="索引路径")
+    pb.add_argument("--cas", action="append", default=[], help="CAS 补充表（列: cas, alias_or_code），可多次给出")
+    pb.set_defaults(func=cmd_build)
+    pl = sub.add_parser("lookup", help="查找关键字")
+    pl.add_argument("keywords", nargs="+")
+    pl.add_argument("--index", default=DEFAULT_INDEX)
+    pl.add_argument("--limit", type=int, default=10, help="每个关键字最多显示的命中数")
+    pl.set_defaults(func=cmd_lookup)
+    pbench = sub.add_parser("bench", help="批量查找计时")
+    pbench.add_argument("--index", default=DEFAULT_INDEX)
+    pbench.add_argument("--n", type=int, default=5000, help="关键字个数")
+    pbench.add_argument("--seed", type=int, default=0)
+    pbench.set_defaults(func=cmd_bench)
+    args = ap.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+本地化合物查询服务：合并后的化合物表只加载一次，LangGraph agent 与 Aspen 脚本共用同一份热索引
+  - resolve：批量精确解析（compound_index.py 的 SQLite 索引，别名 / 注册名 / CAS / 分子式）
+  - search：名称模糊查找（fuzzy_index.py 的三元组索引）
+  - filter：按数据库位掩码筛选（databanks.py，如 "在 P11 和 P93 中但不在 PCD 中"；掩码未知的化合物不参与）
+  - stats：LRU 结果缓存命中率与各接口的延迟直方图（对数分桶）
+两种接入方式：
+  - HTTP（仅本机）: GET /resolve?q=water&q=CH4、POST /resolve {"keywords": [...]}、
+    GET /search?q=...&limit=5&cutoff=0.3、GET /filter?has=P11,P93&not=PCD&limit=20、GET /stats
+  - MCP stdio（FastMCP）：加到 configs/mcp_config.json，工具名 resolve_compounds / search_compounds /
+    filter_compounds / compound_service_stats
+
+用法:
+  python example/compound_service.py http --port 8765
+  python example/compound_service.py mcp --csv /abs/path/example/data/final_compounds.csv
+"""
+
+from collections import OrderedDict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+import argparse
+import csv
+import json
+import math
+import sys
+import threading
+import time
+
+import numpy as np
+
+from compound_index import DEFAULT_SOURCE, CompoundIndex, best_matches, normalize_key, unique_alias
+from compound_record import make_record
+from databanks import columns_of, row_mask, select
+from fuzzy_index import DEFAULT_CUTOFF, fuzzy_key, load_fuzzy_index
+
+
+class LRUCache:
+    """OrderedDict 实现的 LRU 缓存，记录命中 / 未命中次数"""
+
+    _MISSING = object()
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.hits = self.misses = 0
+
+    def get(self, key, default=None):
+        value = self.data.get(key, self._MISSING)
+        if value is self._MISSING:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self.data.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self.data[key] = value
+        self.data.move_to_end(key)
+        if len(self.data) > self.maxsize:
+            self.data.popitem(last=False)
+
+    def info(self):
+        total = self.hits + self.misses
+        return {"size": len(self.data), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else None}
+
+
+class LatencyHistogram:
+    """对数分桶的延迟直方图：第 b 个桶计入 (2^(b-1), 2^b] 微秒的请求"""
+
+    def __init__(self, n_buckets=32):
+        self.counts = [0] * n_buckets
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        us = seconds * 1e6
+        bucket = min(max(0, math.ceil(math.log2(us))) if us > 1 else 0, len(self.counts) - 1)
+        self.counts[bucket] += 1
+        self.count += 1
+        self.total += us
+        self.max = max(self.max, us)
+
+    def quantile(self, q):
+        """分位数（取所在桶的上界，微秒）"""
+        if not self.count:
+            return None
+        target, seen = q * self.count, 0
+        for bucket, n in enumerate(self.counts):
+            seen += n
+            if seen >= target:
+                return 2 ** bucket
+        return 2 ** (len(self.counts) - 1)
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean_us": round(self.total / self.count, 1) if self.count else None,
+            "max_us": round(self.max, 1),
+            "p50_us": self.quantile(0.50), "p95_us": self.quantile(0.95), "p99_us": self.quantile(0.99),
+            "buckets": {f"<={2 ** b}us": n for b, n in enumerate(self.counts) if n},
+        }
+
+
+class CompoundService:
+    """
+    加载一次，三个查询接口共用；所有接口经同一把锁串行执行（SQLite 连接与缓存都不是线程安全的），
+    单次查询在毫秒以内，串行不是瓶颈
+    """
+
+    def __init__(self, csv_path=DEFAULT_SOURCE, index_path=None, cache_size=4096):
+        csv_path = Path(csv_path)
+        if not csv_path.exists():
+            raise FileNotFoundError(f"化合物 CSV 不存在: {csv_path}（先运行 merge_csv.py）")
+        index_path = Path(index_path) if index_path else csv_path.with_name("compound_index.sqlite3")
+        # 索引不存在或比 CSV 旧就重建
+        if not index_path.exists() or index_path.stat().st_mtime_ns < csv_path.stat().st_mtime_ns:
+            CompoundIndex.build(index_path, [csv_path]).close()
+        self.index = CompoundIndex(index_path, check_same_thread=False)
+        self.fuzzy = load_fuzzy_index(csv_path)
+        with open(csv_path, "r", encoding="utf-8", newline="") as f:
+            self.records = [make_record(row.get("databank") or "", row.get("alias_or_code") or "",
+                                        row.get("registered_name") or "", row.get("source_table") or "",
+                                        row_mask(row))
+                            for row in csv.DictReader(f)]
+        self.masks = np.fromiter((r.databank_mask for r in self.records), dtype=np.int64, count=len(self.records))
+        self.cache = LRUCache(cache_size)
+        self.latency = {}
+        self.lock = threading.Lock()
+        self.csv_path = csv_path
+
+    @contextmanager
+    def _timed(self, endpoint):
+        t0 = time.perf_counter()
+        try:
+            with self.lock:
+                yield
+        finally:
+            self.latency.setdefault(endpoint, LatencyHistogram()).record(time.perf_counter() - t0)
+
+    def resolve(self, keywords):
+        """
+        批量精确解析：{关键字: {"alias": 唯一别名或 None, "candidates": 最高优先级的命中}}；
+        按规范化键缓存，缓存未命中的关键字一次批量查 SQLite
+        """
+        with self._timed("resolve"):
+            results, missing = {}, {}
+            for kw in keywords:
+                cached = self.cache.get(("resolve", normalize_key(kw)))
+                if cached is None:
+                    missing[kw] = normalize_key(kw)
+                else:
+                    results[kw] = cached
+            for kw, matches in self.index.lookup_many(list(missing)).items():
+                result = {"alias": unique_alias(matches), "candidates": [m._asdict() for m in best_matches(matches)]}
+                self.cache.put(("resolve", missing[kw]), result)
+                results[kw] = result
+            return {kw: results[kw] for kw in keywords}
+
+    def search(self, query, limit=5, cutoff=DEFAULT_CUTOFF):
+        """模糊查找：[{score, alias, name, databank, field}, ...]；limit < 0 或 cutoff 不在 0..1 时抛 ValueError"""
+        _check_limit(limit)
+        if not 0 <= cutoff <= 1:
+            raise ValueError(f"cutoff 必须在 0 到 1 之间: {cutoff}")
+        with self._timed("search"):
+            key = ("search", fuzzy_key(query), limit, cutoff)
+            result = self.cache.get(key)
+            if result is None:
+                result = [m._asdict() for m in self.fuzzy.search(query, limit, cutoff)] if self.fuzzy else []
+                self.cache.put(key, result)
+            return result
+
+    def filter(self, has=(), without=(), limit=20):
+        """
+        按数据库列筛选：{"count": 匹配总数, "unknown": 掩码未知而未参与筛选的化合物数, "compounds": 前 limit 条}；
+        未知列名或 limit < 0 时抛 ValueError
+        """
+        _check_limit(limit)
+        with self._timed("filter"):
+            key = ("filter", tuple(has), tuple(without), limit)
+            result = self.cache.get(key)
+            if result is None:
+                hits = select(self.masks, has, without).nonzero()[0]
+                result = {"count": int(len(hits)), "unknown": int((self.masks < 0).sum()),
+                          "compounds": [dict(self.records[i]._asdict(), databanks=columns_of(self.records[i].databank_mask))
+                                        for i in hits[:limit]]}
+                self.cache.put(key, result)
+            return result
+
+    def stats(self):
+        return {
+            "source": str(self.csv_path),
+            "compounds": len(self.records),
+            "cache": self.cache.info(),
+            "latency": {endpoint: hist.summary() for endpoint, hist in sorted(self.latency.items())},
+        }
+
+
+def _check_limit(limit):
+    if limit < 0:
+        raise ValueError(f"limit 不能为负数: {limit}")
+
+
+def _number_arg(params, name, default, convert, what):
+    """查询参数 → 数字；不合法时抛带参数名的 ValueError（HTTP 返回 400）"""
+    text = params.get(name, [default])[0]
+    try:
+        return convert(text)
+    except ValueError:
+        raise ValueError(f"参数 {name} 必须是{what}: {text!r}") from None
+
+
+def _column_arg(values):
+    """查询参数 has=P11,P93（可重复）→ 列名列表"""
+    return [v.strip().upper() for value in values for v in value.split(",") if v.strip()]
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    """JSON 接口；service 挂在 server 上"""
+
+    def _send(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _dispatch(self, path, params, body=None):
+        service = self.server.service
+        if path == "/resolve":
+            keywords = body.get("keywords", []) if body is not None else params.get("q", [])
+            if not isinstance(keywords, list):
+                raise ValueError('"keywords" 必须是字符串列表')
+            return service.resolve([str(k) for k in keywords])
+        if path == "/search":
+            return service.search(params.get("q", [""])[0], _number_arg(params, "limit", "5", int, "整数"),
+                                  _number_arg(params, "cutoff", str(DEFAULT_CUTOFF), float, "数字"))
+        if path == "/filter":
+            return service.filter(_column_arg(params.get("has", [])), _column_arg(params.get("not", [])),
+                                  _number_arg(params, "limit", "20", int, "整数"))
+        if path == "/stats":
+            return service.stats()
+        return None
+
+    def _handle(self, body=None):
+        url = urlparse(self.path)
+        try:
+            result = self._dispatch(url.path, parse_qs(url.query), body)
+        except ValueError as e:
+            self._send(400, {"error": str(e)})
+            return
+        if result is None:
+            self._send(404, {"error": f"未知接口: {url.path}"})
+        else:
+            self._send(200, result)
+
+    def do_GET(self):
+        self._handle()
+
+    def do_POST(self):
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        except ValueError:
+            self._send(400, {"error": "请求体不是合法 JSON"})
+            return
+        if not isinstance(body, dict):
+            self._send(400, {"error": "请求体必须是 JSON 对象，如 {\"keywords\": [...]}"})
+            return
+        self._handle(body)
+
+    def log_message(self, format, *args):  # 不逐条打印请求；延迟看 /stats
+        pass
+
+
+def serve_http(service, host, port):
+    server = HTTPServer((host, port), ServiceHandler)
+    server.service = service
+    print(f"🌐 化合物服务: http://{host}:{port}  （/resolve /search /filter /stats，Ctrl+C 退出）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def serve_mcp(service):
+    from mcp.server.fastmcp import FastMCP
+
+    mcp = FastMCP("compounds")
+
+    @mcp.tool()
+    def resolve_compounds(keywords: list[str]) -> dict:
+        """把别名 / 注册名 / CAS 号 / 分子式批量解析为 Aspen 数据库别名；有歧义或未找到时 alias 为 null 并给出候选"""
+        return service.resolve(keywords)
+
+    @mcp.tool()
+    def search_compounds(query: str, limit: int = 5, cutoff: float = DEFAULT_CUTOFF) -> list[dict]:
+        """按名称模糊查找化合物（三元组相似度），返回按相似度排序的候选"""
+        return service.search(query, limit, cutoff)
+
+    @mcp.tool()
+    def filter_compounds(has: list[str] | None = None, without: list[str] | None = None, limit: int = 20) -> dict:
+        """按数据库列筛选化合物，如 has=["P11","P93"], without=["PCD"]；可选列: P11 P10 P93 P856 PCD；掩码未知的化合物不参与"""
+        return service.filter(has or [], without or [], limit)
+
+    @mcp.tool()
+    def compound_service_stats() -> dict:
+        """缓存命中率与各接口的延迟直方图"""
+        return service.stats()
+
+    mcp.run()  # 默认 stdio
+
+
+def main():
+    ap = argparse.ArgumentParser(description="本地化合物查询服务（HTTP / MCP stdio）")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    for name, help_text in (("http", "本机 HTTP 服务"), ("mcp", "MCP stdio 服务")):
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument("--csv", default=DEFAULT_SOURCE, help="合并后的化合物 CSV")
+        p.add_argument("--index", help="SQLite 索引路径（默认与 CSV 同目录的 compound_index.sqlite3）")
+        p.add_argument("--cache-size", type=int, default=4096, help="LRU 缓存条目数")
+        if name == "http":
+            p.add_argument("--host", default="127.0.0.1")
+            p.add_argument("--port", type=int, default=8765)
+    args = ap.parse_args()
+
+    # MCP 走 stdio，stdout 只能输出协议消息，提示信息一律写 stderr
+    t0 = time.perf_counter()
+    try:
+        service = CompoundService(args.csv, args.index, args.cache_size)
+    except FileNotFoundError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
+    print(f"📚 已加载 {len(service.records):,} 个化合物（{time.perf_counter() - t0:.2f}s）", file=sys.stderr)
+    if args.cmd == "http":
+        serve_http(service, args.host, args.port)
+    else:
+        serve_mcp(service)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+数据库列 ↔ 位掩码（各解析器与合并共用同一套映射）
+  P11 = bit0, P10 = bit1, P93 = bit2, P856 = bit3, PCD = bit4
+每个化合物用一个整数记录它出现在 "Available in Databank" 表的哪些列里，
+"在 P11 和 P93 中但不在 PCD 中" 之类的查询变成对整列掩码的向量化位运算，不必再解析一遍 PDF
+只有几何解析（extract_databank_tables.py）知道 X 标记在哪一列；纯文本解析器丢失了列位置，
+写出 UNKNOWN_MASK（-1），合并时再用几何 CSV 补上精确掩码（merge_csv.py --masks）
+
+用法:
+  python example/databanks.py example/data/final_compounds.col --has P11,P93 --not PCD
+"""
+
+from pathlib import Path
+import argparse
+import csv
+import re
+
+DATABANK_COLUMNS = ("P11", "P10", "P93", "P856", "PCD")
+DATABANK_BITS = {col: 1 << i for i, col in enumerate(DATABANK_COLUMNS)}
+# 表头里 P856 和 PCD 常连在一起（"P856PCD"），不能按 \b 切分
+DATABANK_TOKEN = re.compile("|".join(sorted(DATABANK_COLUMNS, key=len, reverse=True)))
+MASK_FIELD = "databank_mask"
+UNKNOWN_MASK = -1  # 列位置未知（纯文本解析器的输出），任何按列的筛选都不匹配
+
+
+def mask_of(columns):
+    """数据库列名 → 位掩码；未知列名抛 ValueError"""
+    mask = 0
+    for col in columns:
+        try:
+            mask |= DATABANK_BITS[col.strip().upper()]
+        except KeyError:
+            raise ValueError(f"未知数据库列: {col!r}（可选: {', '.join(DATABANK_COLUMNS)}）") from None
+    return mask
+
+
+def columns_of(mask):
+    """位掩码 → 数据库列名列表（按 DATABANK_COLUMNS 顺序）；掩码未知返回 None"""
+    if mask < 0:
+        return None
+    return [col for col in DATABANK_COLUMNS if mask & DATABANK_BITS[col]]
+
+
+def row_mask(row):
+    """从 CSV 行（dict）取 databank_mask 列；缺失、为空或非法时为 UNKNOWN_MASK（不按 databank 取值猜测）"""
+    try:
+        mask = int((row.get(MASK_FIELD) or "").strip())
+    except ValueError:
+        return UNKNOWN_MASK
+    return mask if mask >= 0 else UNKNOWN_MASK
+
+
+def read_exact_masks(csv_path):
+    """
+    读取 extract_databank_tables.py 的几何 CSV（alias, name, databank_mask 列），
+    返回 {(ALIAS, NAME): 精确位掩码}；同一化合物出现在多页时取并集
+    """
+    masks = {}
+    with open(csv_path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            alias = (row.get("alias") or "").strip().upper()
+            name = (row.get("name") or "").strip().upper()
+            mask = row_mask(row)
+            if alias and name and mask != UNKNOWN_MASK:
+                masks[alias, name] = masks.get((alias, name), 0) | mask
+    return masks
+
+
+def select(masks, has=(), without=()):
+    """
+    向量化筛选：masks 为整数数组（如 ColumnarTable.numpy("databank_mask")），
+    返回 "包含 has 中全部列、且不含 without 中任一列" 的布尔数组；掩码未知的行一律不匹配
+    """
+    import numpy as np
+
+    masks = np.asarray(masks)
+    need, drop = mask_of(has), mask_of(without)
+    return (masks >= 0) & ((masks & need) == need) & ((masks & drop) == 0)
+
+
+def _column_list(value):
+    """argparse 类型：逗号分隔的数据库列名"""
+    columns = [v.strip().upper() for v in (value or "").split(",") if v.strip()]
+    try:
+        mask_of(columns)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e)) from None
+    return columns
+
+
+def main():
+    from columnar import ColumnarTable
+
+    ap = argparse.ArgumentParser(description="按数据库位掩码筛选列式化合物库（.col）")
+    ap.add_argument("col", nargs="?", default="example/data/final_compounds.col", help="列式文件路径")
+    ap.add_argument("--has", type=_column_list, default=[], help="必须包含的数据库列，逗号分隔（如 P11,P93）")
+    ap.add_argument("--not", dest="without", type=_column_list, default=[], help="必须不包含的数据库列，逗号分隔")
+    ap.add_argument("--head", type=int, default=20, help="打印前 N 条结果")
+    args = ap.parse_args()
+
+    if not Path(args.col).exists():
+        print(f"❌ 列式文件未找到: {args.col}（先用 merge_csv.py --columnar 生成）")
+        return
+    with ColumnarTable(args.col) as table:
+        if MASK_FIELD not in table.column_names:
+            print(f"❌ {args.col} 没有 {MASK_FIELD} 列")
+            return
+        masks = table.numpy(MASK_FIELD)
+        hits = select(masks, args.has, args.without).nonzero()[0]
+        print(f"🔍 匹配: {len(hits):,} / {len(table):,} 个化合物")
+        n_unknown = int((masks < 0).sum())
+        if n_unknown:
+            print(f"   （{n_unknown:,} 个化合物掩码未知，不参与筛选；合并时用 --masks 指定几何 CSV 可补全）")
+        for i in hits[:args.head]:
+            row = dict(zip(table.column_names, table.row(int(i))))
+            print(f"   {row.get('alias_or_code', ''):15s} {row.get('registered_name', ''):40s} "
+                  f"{' '.join(columns_of(row[MASK_FIELD]))}")
+        if len(hits) > args.head:
+            print(f"   ... (还有 {len(hits) - args.head:,} 个)")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,88 +4,155 @@
 """
 升级版 PyMuPDF PDF 文字提取器
 只处理包含化合物表格的页面（含有 P11 P10 的页面）
+每页只做一次 dict 提取；页面分类结果写入 PDF 旁的索引文件（<pdf>.pages.json），
+下次运行（或其他工具）可直接跳到化合物表格页面
+text 格式写完后与 extract_with_pymupdf.py 一样生成偏移索引（<输出>.offsets.json，见 pp_index.py）
 """
 
 from pathlib import Path
+import argparse
+import json
 import re
 
+from page_cache import file_sha256, open_cache
+from pp_index import save_offset_index
+from pymupdf_pages import PageWriter, dict_lines, dict_text, iter_pages
+
+# 修改为更宽松的检查：只要包含 P11 P10 即可
+COMPOUND_TABLE_PATTERN = re.compile(r'P11\s+P10', re.IGNORECASE)
+DATABANK_COLUMN_PATTERN = re.compile(r'P11|P10|P93|P856|PCD')
+PAGE_INDEX_VERSION = 1
+
 def has_compound_table(page_text):
     """检查页面是否包含化合物表格标识"""
-    # 修改为更宽松的检查：只要包含 P11 P10 即可
-    pattern = r'P11\s+P10'
-    return bool(re.search(pattern, page_text, re.IGNORECASE))
+    return bool(COMPOUND_TABLE_PATTERN.search(page_text))
+
+def classify_page(text_dict):
+    """
+    由一次 dict 提取完成页面分类
+    has_table 是否含化合物表；header_lines 表头 Alias 行在本页文本行中的序号；
+    databanks 表头中出现的数据库列
+    """
+    lines = dict_lines(text_dict)
+    header_lines = [i for i in range(len(lines) - 1)
+                    if lines[i] == "Alias" and lines[i + 1] == "Name"]
+    databanks = []
+    for line in lines:
+        if COMPOUND_TABLE_PATTERN.match(line):
+            for column in DATABANK_COLUMN_PATTERN.findall(line):
+                if column not in databanks:
+                    databanks.append(column)
+    info = {
+        "has_table": has_compound_table(dict_text(text_dict)),
+        "header_lines": header_lines,
+        "databanks": databanks,
+    }
+    return info
+
+def page_index_path(pdf_path):
+    """页面索引文件：与 PDF 同目录，<pdf 文件名>.pages.json"""
+    pdf_path = Path(pdf_path)
+    return pdf_path.with_name(pdf_path.name + ".pages.json")
+
+def load_page_index(pdf_path, pdf_hash=None):
+    """读取页面索引；文件不存在、版本或 PDF 内容不一致时返回 None"""
+    path = page_index_path(pdf_path)
+    if not path.exists():
+        return None
+    try:
+        index = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if pdf_hash is None:
+        pdf_hash = file_sha256(pdf_path)
+    if (index.get("version") != PAGE_INDEX_VERSION or
+            index.get("pdf_sha256") != pdf_hash or
+            index.get("rule") != COMPOUND_TABLE_PATTERN.pattern):
+        return None
+    return index
+
+def save_page_index(pdf_path, pdf_hash, total_pages, table_pages):
+    """写入页面索引：只记录化合物表格页面（其余页面即为非表格页）"""
+    index = {
+        "version": PAGE_INDEX_VERSION,
+        "pdf_sha256": pdf_hash,
+        "rule": COMPOUND_TABLE_PATTERN.pattern,
+        "total_pages": total_pages,
+        "pages": {str(page_no): info for page_no, info in table_pages.items()},
+    }
+    path = page_index_path(pdf_path)
+    path.write_text(json.dumps(index, ensure_ascii=False, indent=1), encoding="utf-8")
+    return path
 
-def extract_compound_pages_with_pymupdf(pdf_path, output_path):
-    """使用 PyMuPDF 只提取包含化合物表格的页面"""
+def extract_compound_pages_with_pymupdf(pdf_path, output_path, workers=1, use_cache=True, rescan=False,
+                                        output_format="text"):
+    """
+    使用 PyMuPDF 只提取包含化合物表格的页面；workers > 1 时按页码区间多进程提取
+    结果逐页流式写入 output_path（output_format: text / jsonl）
+    存在有效的页面索引时只处理索引中的表格页；rescan=True 时忽略索引重新扫描全部页面
+    """
     try:
         import fitz  # PyMuPDF
         
         print("使用 PyMuPDF 提取化合物页面...")
         print("过滤规则: 页面包含 'P11 P10' 即处理")
         
-        # 打开PDF文件
+        # 打开PDF文件（只读取页数，逐页提取由 iter_pages 负责）
         doc = fitz.open(str(pdf_path))
         total_pages = len(doc)
+        doc.close()
         
         print(f"总页数: {total_pages}")
+        if workers > 1:
+            print(f"并行进程数: {workers}")
+        
+        # 逐页缓存（--no-cache 时为 None）
+        cache = open_cache(use_cache)
+        
+        # 页面索引：有效时直接跳到表格页
+        pdf_hash = file_sha256(pdf_path)
+        index = None if rescan else load_page_index(pdf_path, pdf_hash)
+        pages = None
+        if index is not None:
+            pages = [int(page_no) for page_no in index["pages"]]
+            print(f"使用页面索引: {page_index_path(pdf_path)} ({len(pages)} 个表格页)")
         
-        all_lines = []
         processed_pages = 0
         compound_pages = []
+        table_pages = {}
+        output_path.parent.mkdir(exist_ok=True)
         
-        for page_num in range(total_pages):
-            page = doc.load_page(page_num)
-            
-            # 先获取页面的完整文本用于检查
-            page_text = page.get_text()
-            
-            # 检查是否包含化合物表格
-            if has_compound_table(page_text):
-                compound_pages.append(page_num + 1)
-                processed_pages += 1
-                
-                print(f"处理化合物页面: {page_num + 1}")
-                
-                # 添加页面标记
-                all_lines.append(f"===== PAGE {page_num + 1} =====")
-                all_lines.append("---")
-                
-                # 获取页面详细文本块进行逐行提取
-                text_dict = page.get_text("dict")
-                
-                # 提取每一行文字
-                for block in text_dict["blocks"]:
-                    if "lines" in block:  # 文本块
-                        for line in block["lines"]:
-                            line_text = ""
-                            for span in line["spans"]:
-                                line_text += span["text"]
-                            
-                            # 清理文字并添加
-                            line_text = line_text.strip()
-                            if line_text:  # 只添加非空行
-                                all_lines.append(line_text)
-                                all_lines.append("---")  # 每行后添加分隔符
+        # 逐页扫描（workers > 1 时按页码区间多进程并行，结果按页序合并），边提取边写出
+        with PageWriter(output_path, output_format) as writer:
+            for page_no, text_dict in iter_pages(pdf_path, total_pages, workers, cache=cache,
+                                                 pages=pages, pdf_hash=pdf_hash):
+                info = classify_page(text_dict)
+                if info["has_table"]:
+                    table_pages[page_no] = info
+                    compound_pages.append(page_no)
+                    processed_pages += 1
+                    
+                    print(f"处理化合物页面: {page_no}")
+                    
+                    writer.write_page(page_no, text_dict)
                 
-                # 页面结束标记
-                all_lines.append("")
-                all_lines.append("---")
-            
-            # 显示总体进度
-            if (page_num + 1) % 50 == 0:
-                print(f"扫描进度: {page_num + 1}/{total_pages} 页 (找到 {len(compound_pages)} 个化合物页面)")
+                # 显示总体进度
+                if page_no % 50 == 0:
+                    print(f"扫描进度: {page_no}/{total_pages} 页 (找到 {len(compound_pages)} 个化合物页面)")
         
-        doc.close()
+        if cache is not None:
+            cache.close()
         
-        # 写入输出文件
-        output_path.parent.mkdir(exist_ok=True)
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(all_lines))
+        if index is None:
+            print(f"📇 页面索引: {save_page_index(pdf_path, pdf_hash, total_pages, table_pages)}")
+        
+        if output_format == "text":
+            print(f"🗂️  偏移索引: {save_offset_index(output_path)}")
         
         print(f"\n✅ 提取完成")
         print(f"📄 扫描页数: {total_pages}")
         print(f"🎯 化合物页面: {len(compound_pages)}")
-        print(f"📝 提取行数: {len(all_lines):,}")
+        print(f"📝 提取行数: {writer.line_count:,}")
         print(f"💾 文件大小: {output_path.stat().st_size:,} 字节")
         print(f"💾 保存到: {output_path}")
         
@@ -108,11 +175,21 @@ def extract_compound_pages_with_pymupdf(pdf_path, output_path):
         return False
 
 def main():
+    ap = argparse.ArgumentParser(description="使用 PyMuPDF 只提取包含化合物表格的页面")
+    ap.add_argument("pdf", nargs="?", default="example/data/11.pdf", help="输入 PDF 路径")
+    ap.add_argument("-o", "--output", default=None, help="输出路径（默认 example/data/PP.txt 或 PP.jsonl）")
+    ap.add_argument("--format", choices=PageWriter.FORMATS, default="text",
+                    help="text: 每行后加 --- 分隔符；jsonl: 每行一条记录（页码/块/行/bbox/字号/文字）")
+    ap.add_argument("--workers", type=int, default=1, help="并行进程数（按页码区间切分，默认 1）")
+    ap.add_argument("--no-cache", action="store_true", help="不读写逐页文本缓存")
+    ap.add_argument("--rescan", action="store_true", help="忽略页面索引，重新扫描全部页面")
+    args = ap.parse_args()
+    
     # 输入PDF路径
-    pdf_path = Path("example/data/11.pdf")
+    pdf_path = Path(args.pdf)
     
     # 输出文本路径
-    output_path = Path("example/data/PP.txt")
+    output_path = Path(args.output or f"example/data/PP.{'jsonl' if args.format == 'jsonl' else 'txt'}")
     
     # 检查输入文件是否存在
     if not pdf_path.exists():
@@ -131,7 +208,7 @@ def main():
     print()
     
     # 执行提取
-    success = extract_compound_pages_with_pymupdf(pdf_path, output_path)
+    success = extract_compound_pages_with_pymupdf(pdf_path, output_path, args.workers, not args.no_cache, args.rescan, args.format)
     
     if success:
         print()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+按几何位置重建 "Available in Databank" 化合物表（Alias / Name / P11 P10 P93 P856 PCD）
+直接读取 page.get_text("dict") 中各 span 的 bbox：
+  - 表头 span 的 x 位置给出各列锚点，其余 span 用 NumPy 一次性按 x 归入列
+  - 按 y 中心聚类成行，X 标记按列归入对应数据库，并记为位掩码（见 databanks.py）
+每页一遍即可输出 CSV，不再经过 --- 文本 → 分表 → 配对 → 合并 四个阶段
+"""
+
+from pathlib import Path
+import argparse
+import csv
+import re
+
+import numpy as np
+
+from databanks import DATABANK_COLUMNS, DATABANK_TOKEN, MASK_FIELD, mask_of
+from extract_compound_pages import has_compound_table, load_page_index
+from page_cache import file_sha256, open_cache
+from pymupdf_pages import dict_text, iter_pages
+
+COLUMNS = ("Alias", "Name") + DATABANK_COLUMNS
+TRAILING_MARKS = re.compile(r"(?:\s+X)+\s*$")
+ROW_TOLERANCE = 3.0     # 同一行 span 的 y 中心最大偏差（pt）
+LEFT_MARGIN = 20.0      # Alias 列左侧允许的偏移，更靠左的 span（页眉页脚、侧栏）不属于表格
+
+
+def page_spans(text_dict):
+    """展开为 span 列表 [(x0, y_center, text, x1), ...]，跳过纯空白 span"""
+    spans = []
+    for block in text_dict["blocks"]:
+        for line in block["lines"]:
+            for span in line["spans"]:
+                text = span["text"]
+                if text.strip():
+                    x0, y0, x1, y1 = span["bbox"]
+                    spans.append((x0, (y0 + y1) / 2, text, x1))
+    return spans
+
+
+def find_headers(spans):
+    """
+    找出本页所有表头，返回 [(表头 y, 列名元组, 列锚点数组), ...]
+    列锚点为各列左边界 x；连在一起的 "P856PCD" 按字符比例拆开；
+    有的表只有部分数据库列（如传热流体表只有 P11 P10）
+    """
+    headers = []
+    for x0, y, text, _ in spans:
+        if text.strip() != "Alias":
+            continue
+        same_row = [s for s in spans if abs(s[1] - y) <= ROW_TOLERANCE]
+        name_x = [sx0 for sx0, _, st, _ in same_row if st.strip() == "Name"]
+        anchors = {"Alias": x0}
+        if name_x:
+            anchors["Name"] = name_x[0]
+        for sx0, _, st, sx1 in same_row:
+            # 按字符比例拆出每个数据库列的起点
+            for m in DATABANK_TOKEN.finditer(st):
+                anchors.setdefault(m.group(), sx0 + (sx1 - sx0) * m.start() / len(st))
+        columns = tuple(col for col in COLUMNS if col in anchors)
+        if "Name" in anchors and len(columns) > 2:
+            headers.append((y, columns, np.array([anchors[col] for col in columns])))
+    return headers
+
+
+def extract_table_rows(text_dict, page_no=None):
+    """
+    从单页 dict 中重建化合物表行
+    返回 [{"page", "alias", "name", "databanks": [列名, ...], "mask": 位掩码}, ...]
+    """
+    spans = page_spans(text_dict)
+    headers = find_headers(spans)
+    if not headers:
+        return []
+
+    rows = []
+    for h, (header_y, columns, anchors) in enumerate(headers):
+        bottom = headers[h + 1][0] - ROW_TOLERANCE if h + 1 < len(headers) else np.inf
+        # 名称过长时末尾的 X 会和名称并成一个 span，先按字符比例拆出来
+        mark_x = (anchors[1] + anchors[2]) / 2
+        table_spans = [piece for span in spans if header_y + ROW_TOLERANCE < span[1] < bottom
+                       for piece in _split_trailing_marks(span, mark_x)]
+        if not table_spans:
+            continue
+        xs = np.array([s[0] for s in table_spans])
+        ys = np.array([s[1] for s in table_spans])
+        idx = np.nonzero(xs >= anchors[0] - LEFT_MARGIN)[0]
+        if idx.size == 0:
+            continue
+
+        # 列：以相邻锚点的中点为边界，一次 searchsorted 归列
+        bounds = (anchors[:-1] + anchors[1:]) / 2
+        cols = np.searchsorted(bounds, xs[idx])
+
+        # 行：按 y 排序后，相邻 y 中心相差超过容差即换行
+        order = np.lexsort((xs[idx], ys[idx]))
+        idx, cols = idx[order], cols[order]
+        row_starts = np.flatnonzero(np.diff(ys[idx]) > ROW_TOLERANCE) + 1
+
+        for members in np.split(np.arange(idx.size), row_starts):
+            cells = [[] for _ in columns]
+            for m in members:
+                cells[cols[m]].append(table_spans[idx[m]][2])
+            rows.extend(_assemble_row(columns, cells, rows, page_no))
+    return rows
+
+
+def _split_trailing_marks(span, mark_x):
+    """span 跨过第一个数据库列边界且以 X 结尾时，拆成 [正文, X, X, ...]"""
+    x0, y, text, x1 = span
+    m = TRAILING_MARKS.search(text)
+    if m is None or x1 <= mark_x or not text[:m.start()].strip():
+        return [span]
+    width = (x1 - x0) / len(text)
+    pieces = [(x0, y, text[:m.start()], x0 + width * m.start())]
+    for mark in re.finditer("X", text[m.start():]):
+        start = m.start() + mark.start()
+        pieces.append((x0 + width * start, y, "X", x0 + width * (start + 1)))
+    return pieces
+
+
+def _assemble_row(columns, cells, rows, page_no):
+    """
+    把一行各列的文字拼成记录；只有 Name 列有字的行视为上一行名称的续行
+    （注册名不含空格，续行直接拼接）
+    """
+    alias, name = (" ".join("".join(cell).split()) for cell in cells[:2])
+    marks = ["".join(cell).strip() for cell in cells[2:]]
+    if not alias and name and not any(marks) and rows:
+        prev = rows[-1]
+        prev["name"] += name
+        return []
+    if not alias or not name or any(mark not in ("", "X") for mark in marks):
+        return []
+    databanks = [col for col, mark in zip(columns[2:], marks) if mark == "X"]
+    return [{
+        "page": page_no,
+        "alias": alias,
+        "name": name,
+        "databanks": databanks,
+        "mask": mask_of(databanks),
+    }]
+
+
+def extract_databank_tables(pdf_path, output_path, workers=1, use_cache=True):
+    """逐页按几何位置重建化合物表并写出 CSV，返回行数"""
+    import fitz  # PyMuPDF
+
+    doc = fitz.open(str(pdf_path))
+    total_pages = len(doc)
+    doc.close()
+
+    # 有页面索引时只读表格页，否则逐页判断
+    pdf_hash = file_sha256(pdf_path)
+    index = load_page_index(pdf_path, pdf_hash)
+    pages = [int(page_no) for page_no in index["pages"]] if index else None
+
+    cache = open_cache(use_cache)
+    n_rows = 0
+    try:
+        output_path.parent.mkdir(exist_ok=True)
+        with open(output_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["page", "alias", "name", *DATABANK_COLUMNS, MASK_FIELD])
+            for page_no, text_dict in iter_pages(pdf_path, total_pages, workers, cache=cache,
+                                                 pages=pages, pdf_hash=pdf_hash):
+                if pages is None and not has_compound_table(dict_text(text_dict)):
+                    continue
+                for row in extract_table_rows(text_dict, page_no):
+                    writer.writerow([row["page"], row["alias"], row["name"],
+                                     *("X" if col in row["databanks"] else "" for col in DATABANK_COLUMNS),
+                                     row["mask"]])
+                    n_rows += 1
+    finally:
+        if cache is not None:
+            cache.close()
+    return n_rows
+
+
+def main():
+    ap = argparse.ArgumentParser(description="按 span 几何位置重建 Available in Databank 化合物表")
+    ap.add_argument("pdf", nargs="?", default="example/data/11.pdf", help="输入 PDF 路径")
+    ap.add_argument("-o", "--output", default="example/data/databank_tables.csv", help="输出 CSV 路径")
+    ap.add_argument("--workers", type=int, default=1, help="并行进程数（按页码区间切分，默认 1）")
+    ap.add_argument("--no-cache", action="store_true", help="不读写逐页文本缓存")
+    args = ap.parse_args()
+
+    pdf_path = Path(args.pdf)
+    output_path = Path(args.output)
+    if not pdf_path.exists():
+        print(f"❌ PDF文件未找到: {pdf_path}")
+        return
+
+    print(f"📖 输入PDF: {pdf_path}")
+    n_rows = extract_databank_tables(pdf_path, output_path, args.workers, not args.no_cache)
+    print(f"✅ 化合物行数: {n_rows:,}")
+    print(f"💾 保存到: {output_path}")
+
+
+if __name__ == "__main__":
+    main()
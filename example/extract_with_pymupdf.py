@@ -4,68 +4,60 @@
 """
 使用 PyMuPDF 逐行提取 PDF 文字
 每一行之间添加 --- 分隔符
+text 格式写完后顺带生成偏移索引（<输出>.offsets.json，见 pp_index.py），供按页/按表随机访问
 """
 
 from pathlib import Path
+import argparse
 import sys
 
-def extract_text_with_pymupdf(pdf_path, output_path):
-    """使用 PyMuPDF 逐行提取文字"""
+from page_cache import open_cache
+from pp_index import save_offset_index
+from pymupdf_pages import PageWriter, iter_pages
+
+def extract_text_with_pymupdf(pdf_path, output_path, workers=1, use_cache=True, output_format="text"):
+    """
+    使用 PyMuPDF 逐行提取文字；workers > 1 时按页码区间多进程提取
+    结果逐页流式写入 output_path（output_format: text / jsonl），内存占用与 PDF 大小无关
+    """
     try:
         import fitz  # PyMuPDF
         
         print("使用 PyMuPDF 提取文字...")
         
-        # 打开PDF文件
+        # 打开PDF文件（只读取页数，逐页提取由 iter_pages 负责）
         doc = fitz.open(str(pdf_path))
         total_pages = len(doc)
+        doc.close()
         
         print(f"总页数: {total_pages}")
+        if workers > 1:
+            print(f"并行进程数: {workers}")
         
-        all_lines = []
+        # 逐页缓存（--no-cache 时为 None）
+        cache = open_cache(use_cache)
         
-        for page_num in range(total_pages):
-            page = doc.load_page(page_num)
-            
-            # 添加页面标记
-            all_lines.append(f"===== PAGE {page_num + 1} =====")
-            all_lines.append("---")
-            
-            # 获取页面文本块
-            text_dict = page.get_text("dict")
-            
-            # 提取每一行文字
-            for block in text_dict["blocks"]:
-                if "lines" in block:  # 文本块
-                    for line in block["lines"]:
-                        line_text = ""
-                        for span in line["spans"]:
-                            line_text += span["text"]
-                        
-                        # 清理文字并添加
-                        line_text = line_text.strip()
-                        if line_text:  # 只添加非空行
-                            all_lines.append(line_text)
-                            all_lines.append("---")  # 每行后添加分隔符
-            
-            # 页面结束标记
-            all_lines.append("")
-            all_lines.append("---")
-            
-            # 显示进度
-            if (page_num + 1) % 10 == 0:
-                print(f"已处理: {page_num + 1}/{total_pages} 页")
+        output_path.parent.mkdir(exist_ok=True)
         
-        doc.close()
+        # 逐页提取（workers > 1 时按页码区间多进程并行，结果按页序合并），边提取边写出
+        with PageWriter(output_path, output_format) as writer:
+            for page_no, text_dict in iter_pages(pdf_path, total_pages, workers, cache=cache):
+                writer.write_page(page_no, text_dict)
+                
+                # 显示进度
+                if page_no % 10 == 0:
+                    print(f"已处理: {page_no}/{total_pages} 页")
         
-        # 写入输出文件
-        output_path.parent.mkdir(exist_ok=True)
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(all_lines))
+        if cache is not None:
+            cache.close()
+        
+        if output_format == "text":
+            index_path = save_offset_index(output_path)
+            print(f"🗂️  偏移索引: {index_path}")
         
         print(f"✅ 提取完成")
         print(f"📄 总页数: {total_pages}")
-        print(f"📝 总行数: {len(all_lines):,}")
+        print(f"📝 总行数: {writer.line_count:,}")
         print(f"💾 文件大小: {output_path.stat().st_size:,} 字节")
         print(f"💾 保存到: {output_path}")
         
@@ -80,11 +72,20 @@ def extract_text_with_pymupdf(pdf_path, output_path):
         return False
 
 def main():
+    ap = argparse.ArgumentParser(description="使用 PyMuPDF 逐行提取 PDF 文字")
+    ap.add_argument("pdf", nargs="?", default="example/data/11.pdf", help="输入 PDF 路径")
+    ap.add_argument("-o", "--output", default=None, help="输出路径（默认 example/data/PP.txt 或 PP.jsonl）")
+    ap.add_argument("--format", choices=PageWriter.FORMATS, default="text",
+                    help="text: 每行后加 --- 分隔符；jsonl: 每行一条记录（页码/块/行/bbox/字号/文字）")
+    ap.add_argument("--workers", type=int, default=1, help="并行进程数（按页码区间切分，默认 1）")
+    ap.add_argument("--no-cache", action="store_true", help="不读写逐页文本缓存")
+    args = ap.parse_args()
+    
     # 输入PDF路径
-    pdf_path = Path("example/data/11.pdf")
+    pdf_path = Path(args.pdf)
     
     # 输出文本路径
-    output_path = Path("example/data/PP.txt")
+    output_path = Path(args.output or f"example/data/PP.{'jsonl' if args.format == 'jsonl' else 'txt'}")
     
     # 检查输入文件是否存在
     if not pdf_path.exists():
@@ -102,7 +103,7 @@ def main():
     print()
     
     # 执行提取
-    success = extract_text_with_pymupdf(pdf_path, output_path)
+    success = extract_text_with_pymupdf(pdf_path, output_path, args.workers, not args.no_cache, output_format=args.format)
     
     if success:
         print()
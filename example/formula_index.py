@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+分子式 → 元素计数向量，整库存成一个 numpy 矩阵（行 = 化合物，列 = 元素）
+  - 别名大多是全大写的分子式（C2H6O-2、C10H16N2O8、AL2(SO4)3），去掉 "-" 后的异构体后缀再解析
+  - 全大写丢了元素符号的大小写，按以下规则消歧：
+      * 有机物中常见的字母组合优先拆开（CO → C+O，HF → H+F，CS2 → C+S2，HPO4 → H+P+O4，OS → O+S）；
+        其余优先两字母符号（SICL2 → Si+Cl2，NAO7 → Na+O7，CU → Cu，PB → Pb）
+      * 优先的读法走不通时回溯换另一种（C10H7BR：B+R 不成立 → Br）
+    SN（锡）、OS（锇）这类会被拆开，可用 parse 子命令检查解析结果
+  - 解析不了的别名（AIR、抽取噪声）计为全 0 且标记为无效，不参与查询
+  - 查询是对整个矩阵的向量化比较：同分异构体 = 整行相等；"C ≤ 3 且不含卤素" = 两列比较再按位与
+  - 矩阵存成 .npz（默认 <CSV>.formula.npz），来源 CSV 变化时自动重建
+
+用法:
+  python example/formula_index.py isomers C4H10O
+  python example/formula_index.py where "C<=3" "X=0"
+  python example/formula_index.py where "C>=6" --only C,H,O
+  python example/formula_index.py parse C2H6SICL2 "AL2(SO4)3" CUSO4*5H2O
+"""
+
+from functools import lru_cache
+from pathlib import Path
+import argparse
+import operator
+import re
+import time
+
+import numpy as np
+
+from compound_index import DEFAULT_SOURCE
+from npz_index import is_stale, load_npz, load_or_build, read_entries, save_npz
+
+FORMULA_INDEX_VERSION = 1
+ELEMENTS = (
+    "H He Li Be B C N O F Ne Na Mg Al Si P S Cl Ar K Ca Sc Ti V Cr Mn Fe Co Ni Cu Zn Ga Ge As Se Br Kr "
+    "Rb Sr Y Zr Nb Mo Tc Ru Rh Pd Ag Cd In Sn Sb Te I Xe Cs Ba La Ce Pr Nd Pm Sm Eu Gd Tb Dy Ho Er Tm Yb "
+    "Lu Hf Ta W Re Os Ir Pt Au Hg Tl Pb Bi Po At Rn Fr Ra Ac Th Pa U Np Pu Am Cm Bk Cf Es Fm Md No Lr "
+    "Rf Db Sg Bh Hs Mt Ds Rg Cn Nh Fl Mc Lv Ts Og"
+).split()
+_SYMBOL = {e.upper(): e for e in ELEMENTS}
+# 优先拆成两个单字母元素的组合（有机物里 CO / HF / CS2 / PO4 远比 Co / Hf / Cs / Po 常见）
+_SPLIT_FIRST = {"BH", "CF", "CN", "CO", "CS", "HF", "HO", "HS", "NH", "NO", "NP", "OS", "PO", "SC"}
+# 条件里可用的元素组
+GROUPS = {"X": ("F", "Cl", "Br", "I", "At")}
+_OPS = {"<=": operator.le, ">=": operator.ge, "==": operator.eq, "!=": operator.ne,
+        "<": operator.lt, ">": operator.gt, "=": operator.eq}
+_CONDITION = re.compile(r"\s*([A-Za-z]{1,2})\s*(<=|>=|==|!=|<|>|=)\s*(\d+)\s*")
+_HYDRATE_SEP = re.compile(r"[.*·]")
+
+
+def _symbol_choices(s, i):
+    """位置 i 处可能的元素符号，按优先顺序"""
+    one = _SYMBOL.get(s[i])
+    two = _SYMBOL.get(s[i:i + 2]) if i + 1 < len(s) and s[i + 1].isalpha() else None
+    if two and one and s[i:i + 2] in _SPLIT_FIRST:
+        return [one, two]
+    return [c for c in (two, one) if c]
+
+
+def _parse_part(s):
+    """解析不含水合分隔符的一段（全大写），返回 {元素: 个数} 或 None"""
+
+    def count_at(i):
+        j = i
+        while j < len(s) and s[j].isdigit():
+            j += 1
+        return (int(s[i:j]) if j > i else 1), j
+
+    @lru_cache(maxsize=None)
+    def seq(i):
+        """从 i 解析到末尾或对应的 ')'，返回 (counts, 结束位置)；同一起点的结果唯一，可记忆化"""
+        if i == len(s) or s[i] == ")":
+            return {}, i
+        if s[i] == "(":
+            inner = seq(i + 1)
+            if inner is None or inner[1] == len(s):
+                return None
+            n, j = count_at(inner[1] + 1)
+            rest = seq(j)
+            if rest is None:
+                return None
+            return _merge(_scaled(inner[0], n), rest[0]), rest[1]
+        if not s[i].isalpha():
+            return None
+        for sym in _symbol_choices(s, i):
+            n, j = count_at(i + len(sym))
+            rest = seq(j)
+            if rest is not None:
+                return _merge({sym: n}, rest[0]), rest[1]
+        return None
+
+    result = seq(0)
+    return result[0] if result is not None and result[1] == len(s) and result[0] else None
+
+
+def _scaled(counts, n):
+    return {e: c * n for e, c in counts.items()}
+
+
+def _merge(a, b):
+    merged = dict(a)
+    for e, c in b.items():
+        merged[e] = merged.get(e, 0) + c
+    return merged
+
+
+def parse_formula(text):
+    """
+    分子式 → {元素: 个数}；不是分子式返回 None。
+    接受大小写混写（C2H5Cl）和全大写（C2H5CL）、括号、水合物（CUSO4*5H2O），去掉 "-" 后的异构体后缀
+    """
+    text = str(text).strip().split("-", 1)[0].replace(" ", "")
+    if not text:
+        return None
+    total = {}
+    for part in _HYDRATE_SEP.split(text.upper()):
+        m = re.match(r"\d+", part)
+        mult = int(m.group()) if m else 1
+        counts = _parse_part(part[m.end():] if m else part)
+        if counts is None:
+            return None
+        total = _merge(total, _scaled(counts, mult))
+    return total
+
+
+def hill_order(elements):
+    """Hill 顺序：有 C 时 C、H 在前，其余按字母"""
+    elements = set(elements)
+    head = [e for e in ("C", "H") if "C" in elements and e in elements]
+    return head + sorted(elements - set(head))
+
+
+def format_formula(counts):
+    counts = {e: c for e, c in counts.items() if c}
+    return "".join(f"{e}{counts[e] if counts[e] > 1 else ''}" for e in hill_order(counts))
+
+
+def parse_condition(text):
+    """"C<=3" / "X=0" → (元素或元素组, 比较函数, 数值)；非法时抛 ValueError"""
+    m = _CONDITION.fullmatch(text)
+    if not m:
+        raise ValueError(f"无法解析条件: {text!r}（形如 C<=3、X=0、Cl>0）")
+    name, op, value = m.groups()
+    name = name.upper()
+    if name not in GROUPS and name not in _SYMBOL:
+        raise ValueError(f"未知元素或元素组: {name!r}")
+    return GROUPS.get(name, (_SYMBOL.get(name),)), _OPS[op], int(value)
+
+
+class FormulaIndex:
+    """
+    counts: (化合物数, 元素数) 的 int16 矩阵；elements: 列对应的元素（只含库中出现过的，Hill 顺序）；
+    valid: 别名能否解析为分子式
+    """
+
+    def __init__(self, entries, elements, counts, valid, meta=None):
+        self.entries = entries
+        self.elements = list(elements)
+        self.column = {e: i for i, e in enumerate(self.elements)}
+        self.counts = counts
+        self.valid = valid
+        self.meta = meta or {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    @classmethod
+    def from_entries(cls, entries, meta=None):
+        parsed = [parse_formula(alias) for alias, _, _ in entries]
+        elements = hill_order({e for counts in parsed if counts for e in counts})
+        column = {e: i for i, e in enumerate(elements)}
+        matrix = np.zeros((len(entries), len(elements)), dtype=np.int16)
+        for row, counts in enumerate(parsed):
+            for e, c in (counts or {}).items():
+                matrix[row, column[e]] = c
+        valid = np.fromiter((counts is not None for counts in parsed), dtype=bool, count=len(parsed))
+        return cls(list(entries), elements, matrix, valid, meta)
+
+    @classmethod
+    def from_csv(cls, sources):
+        return cls.from_entries(*read_entries(sources))
+
+    def save(self, path):
+        save_npz(path, self.entries, dict(self.meta, version=FORMULA_INDEX_VERSION, elements=self.elements),
+                 counts=self.counts, valid=self.valid)
+
+    @classmethod
+    def load(cls, path):
+        entries, meta, arrays = load_npz(path, FORMULA_INDEX_VERSION)
+        return cls(entries, meta["elements"], arrays["counts"], arrays["valid"], meta)
+
+    def is_stale(self):
+        return is_stale(self.meta)
+
+    def vector(self, counts):
+        """{元素: 个数} → 与矩阵列对齐的向量；含库中没有的元素时返回 None"""
+        if any(e not in self.column for e, c in counts.items() if c):
+            return None
+        vec = np.zeros(len(self.elements), dtype=self.counts.dtype)
+        for e, c in counts.items():
+            if c:
+                vec[self.column[e]] = c
+        return vec
+
+    def isomers(self, formula):
+        """与 formula 元素组成完全相同的化合物（布尔数组）；formula 不是分子式时抛 ValueError"""
+        counts = parse_formula(formula)
+        if counts is None:
+            raise ValueError(f"无法解析分子式: {formula!r}")
+        vec = self.vector(counts)
+        if vec is None:
+            return np.zeros(len(self), dtype=bool)
+        return self.valid & (self.counts == vec).all(axis=1)
+
+    def element_counts(self, elements):
+        """若干元素的计数之和（整列）；库中没有的元素计 0"""
+        cols = [self.column[e] for e in elements if e in self.column]
+        if not cols:
+            return np.zeros(len(self), dtype=np.int32)
+        return self.counts[:, cols].sum(axis=1, dtype=np.int32)
+
+    def where(self, conditions=(), only=None):
+        """
+        conditions: ["C<=3", "X=0", ...]（全部满足）；only: 只允许出现的元素，如 ["C", "H", "O"]
+        返回布尔数组
+        """
+        hit = self.valid.copy()
+        for text in conditions:
+            elements, op, value = parse_condition(text)
+            hit &= op(self.element_counts(elements), value)
+        if only is not None:
+            allowed = {_SYMBOL.get(e.strip().upper(), e) for e in only}
+            others = [e for e in self.elements if e not in allowed]
+            hit &= self.element_counts(others) == 0
+        return hit
+
+    def rows(self, mask, limit=None):
+        """布尔数组 → 前 limit 个 [(alias, name, databank, 分子式), ...]"""
+        return [(*self.entries[i], format_formula(dict(zip(self.elements, self.counts[i].tolist()))))
+                for i in np.flatnonzero(mask)[:limit]]
+
+
+def formula_index_path(source):
+    source = Path(source)
+    return source.with_name(source.stem + ".formula.npz")
+
+
+def load_formula_index(source=DEFAULT_SOURCE, path=None):
+    """读取 .npz；不存在、版本不符或 CSV 已变化时重建并尝试写回；CSV 也不存在时返回 None"""
+    return load_or_build(FormulaIndex, source, path or formula_index_path(source))
+
+
+def _print_rows(index, mask, head):
+    for alias, name, databank, formula in index.rows(mask, head):
+        print(f"   {alias:15s} {formula:14s} {name}  ({databank})")
+    n = int(mask.sum())
+    if n > head:
+        print(f"   ... (还有 {n - head:,} 个)")
+
+
+def _load(args):
+    t0 = time.perf_counter()
+    index = load_formula_index(args.source, args.index)
+    if index is None:
+        print(f"❌ 化合物 CSV 未找到: {args.source}")
+    elif args.verbose:
+        print(f"📚 {len(index):,} 个化合物（可解析 {int(index.valid.sum()):,}），{len(index.elements)} 种元素，"
+              f"{time.perf_counter() - t0:.3f}s")
+    return index
+
+
+def cmd_parse(args):
+    for text in args.formulas:
+        counts = parse_formula(text)
+        print(f"🧪 {text:20s} → " + (f"{format_formula(counts)}  {counts}" if counts else "（不是分子式）"))
+
+
+def cmd_isomers(args):
+    index = _load(args)
+    if index is None:
+        return
+    try:
+        t0 = time.perf_counter()
+        mask = index.isomers(args.formula)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+    print(f"🔍 {args.formula} 的同分异构体: {int(mask.sum()):,} 个（{(time.perf_counter() - t0) * 1000:.2f} ms）")
+    _print_rows(index, mask, args.head)
+
+
+def cmd_where(args):
+    index = _load(args)
+    if index is None:
+        return
+    try:
+        t0 = time.perf_counter()
+        mask = index.where(args.conditions, args.only)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+    desc = args.conditions + (["只含 " + ",".join(args.only)] if args.only else [])
+    print(f"🔍 {' 且 '.join(desc) or '全部'}: {int(mask.sum()):,} 个（{(time.perf_counter() - t0) * 1000:.2f} ms）")
+    _print_rows(index, mask, args.head)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="分子式元素计数矩阵：同分异构体与元素条件查询")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    pp = sub.add_parser("parse", help="解析分子式（检查消歧结果）")
+    pp.add_argument("formulas", nargs="+")
+    pp.set_defaults(func=cmd_parse)
+    pi = sub.add_parser("isomers", help="同分异构体")
+    pi.add_argument("formula")
+    pi.set_defaults(func=cmd_isomers)
+    pw = sub.add_parser("where", help="元素条件，如 \"C<=3\" \"X=0\"（X = 卤素）")
+    pw.add_argument("conditions", nargs="*")
+    pw.add_argument("--only", type=lambda v: [e.strip() for e in v.split(",") if e.strip()],
+                    help="只允许出现的元素，逗号分隔（如 C,H,O）")
+    pw.set_defaults(func=cmd_where)
+    for p in (pi, pw):
+        p.add_argument("--source", default=DEFAULT_SOURCE, help="化合物 CSV")
+        p.add_argument("--index", help="索引路径（默认 <CSV>.formula.npz）")
+        p.add_argument("--head", type=int, default=20, help="打印前 N 条结果")
+        p.add_argument("-v", "--verbose", action="store_true", help="打印索引概况")
+    args = ap.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
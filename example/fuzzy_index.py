@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+化合物名称模糊查找：别名 / 注册名上的三元组（trigram）倒排索引
+  - 字符串先规范化（大写，只保留字母数字），"4-hydroxy acetophenone" 与 "4-HYDROXYACETOPHENONE" 是同一个键
+  - 三元组编码成整数（37 个符号 → 37³ 个槽位），倒排表是 CSR 形式的两个 numpy 数组：offsets / postings，不需要词表
+  - 查询：取出各三元组的倒排段拼接后计数，相似度 = 共有三元组 / 两边三元组并集（Jaccard），低于阈值的丢弃
+  - 大索引里出现在大量字符串中的常见三元组（"$$C"、"ENE" 之类）占了倒排段的大半：召回候选时不计，
+    候选确定后再用常见三元组的位图补上计数，返回的分数仍是全部三元组上的 Jaccard
+  - 索引存成 .npz（默认 <CSV>.fuzzy.npz）；来源 CSV 的大小或 mtime 变了视为过期，自动重建
+
+用法:
+  python example/fuzzy_index.py build example/data/final_compounds.csv
+  python example/fuzzy_index.py search "4-hydroxy acetophenone" "ethyl alcohol" --cutoff 0.2
+  python example/fuzzy_index.py bench --synthetic 50000
+"""
+
+from pathlib import Path
+from typing import NamedTuple
+import argparse
+import math
+import re
+import time
+import unicodedata
+
+import numpy as np
+
+from compound_index import DEFAULT_SOURCE
+from npz_index import is_stale, load_npz, load_or_build, read_entries, save_npz
+
+FUZZY_INDEX_VERSION = 1
+DEFAULT_CUTOFF = 0.3
+PAD = "$"
+# 符号表：填充符、数字、大写字母；三元组 (a, b, c) 编码为 (a * BASE + b) * BASE + c
+SYMBOLS = PAD + "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+BASE = len(SYMBOLS)
+_SYMBOL_CODE = {ch: i for i, ch in enumerate(SYMBOLS)}
+_NON_ALNUM = re.compile(r"[^0-9A-Z]+")
+FIELDS = ("alias", "name")
+# 常见三元组：出现在超过 STOP_FRACTION 的字符串中、且倒排段长于 STOP_MIN_POSTINGS（小索引不受影响）
+STOP_FRACTION = 0.05
+STOP_MIN_POSTINGS = 4096
+
+
+class FuzzyMatch(NamedTuple):
+    score: float
+    alias: str
+    name: str
+    databank: str
+    field: str  # 命中的是别名还是注册名
+
+
+def fuzzy_key(text):
+    """全角转半角、大写、去掉所有非字母数字"""
+    return _NON_ALNUM.sub("", unicodedata.normalize("NFKC", str(text)).upper())
+
+
+def trigram_codes(key):
+    """规范化键 → 去重后的三元组编码（前补两个、后补一个填充符，短词也有三元组）"""
+    codes = [_SYMBOL_CODE[ch] for ch in PAD + PAD + key + PAD]
+    return sorted({(codes[i] * BASE + codes[i + 1]) * BASE + codes[i + 2] for i in range(len(codes) - 2)})
+
+
+def fuzzy_index_path(source):
+    source = Path(source)
+    return source.with_name(source.stem + ".fuzzy.npz")
+
+
+class FuzzyIndex:
+    """
+    entries: [(alias, name, databank), ...]；每个条目的别名和注册名各是一条被索引的字符串，
+    第 i 个条目对应字符串 2i（别名）与 2i + 1（注册名）
+    常见三元组的位图（stop_bits，每个常见三元组 n/8 字节）在构造时由倒排表算出，不写入 .npz
+    """
+
+    def __init__(self, entries, offsets, postings, lengths, meta=None):
+        self.entries = entries
+        self.offsets = offsets
+        self.postings = postings
+        self.lengths = lengths
+        self.meta = meta or {}
+        n = len(lengths)
+        stop = np.flatnonzero(np.diff(offsets) > max(STOP_FRACTION * n, STOP_MIN_POSTINGS))
+        self.stop_slot = np.full(BASE ** 3, -1, dtype=np.int32)
+        self.stop_slot[stop] = np.arange(len(stop), dtype=np.int32)
+        self.stop_bits = np.zeros((len(stop), (n + 7) // 8), dtype=np.uint8)
+        for slot, code in enumerate(stop.tolist()):
+            dense = np.zeros(n, dtype=bool)
+            dense[postings[offsets[code]:offsets[code + 1]]] = True
+            self.stop_bits[slot] = np.packbits(dense)
+
+    def __len__(self):
+        return len(self.entries)
+
+    @classmethod
+    def from_entries(cls, entries, meta=None):
+        string_ids, codes, lengths = [], [], []
+        for i, (alias, name, _) in enumerate(entries):
+            for j, text in enumerate((alias, name)):
+                grams = trigram_codes(fuzzy_key(text))
+                string_ids.extend([2 * i + j] * len(grams))
+                codes.extend(grams)
+                lengths.append(len(grams))
+        codes = np.asarray(codes, dtype=np.int32)
+        order = np.argsort(codes, kind="stable")  # 同一三元组内保持字符串编号递增
+        postings = np.asarray(string_ids, dtype=np.int32)[order]
+        offsets = np.zeros(BASE ** 3 + 1, dtype=np.int32)
+        np.cumsum(np.bincount(codes, minlength=BASE ** 3), out=offsets[1:])
+        return cls(list(entries), offsets, postings, np.asarray(lengths, dtype=np.int32), meta)
+
+    @classmethod
+    def from_csv(cls, sources):
+        """从一个或多个化合物 CSV 构建；(alias, name) 相同的只保留先出现的"""
+        return cls.from_entries(*read_entries(sources))
+
+    def save(self, path):
+        save_npz(path, self.entries, dict(self.meta, version=FUZZY_INDEX_VERSION),
+                 offsets=self.offsets, postings=self.postings, lengths=self.lengths)
+
+    @classmethod
+    def load(cls, path):
+        entries, meta, arrays = load_npz(path, FUZZY_INDEX_VERSION)
+        return cls(entries, arrays["offsets"], arrays["postings"], arrays["lengths"], meta)
+
+    def is_stale(self):
+        return is_stale(self.meta)
+
+    def search(self, query, limit=10, cutoff=DEFAULT_CUTOFF):
+        """
+        返回相似度 ≥ cutoff 的条目（每个条目取别名 / 注册名中较高的分数），按分数降序，最多 limit 个
+        查询含常见三元组时，候选只按其余三元组召回（共有数 ≥ cutoff × 其余三元组数），
+        主要靠常见三元组才相似的条目可能漏掉；不含常见三元组时结果是精确的
+        """
+        codes = np.asarray(trigram_codes(fuzzy_key(query)), dtype=np.int64)
+        if limit <= 0 or len(codes) <= 2 or not len(self.entries):  # 空查询只有填充符三元组
+            return []
+        slots = self.stop_slot[codes]
+        common = slots >= 0
+        counted = codes if common.all() else codes[~common]  # 查询全是常见三元组时只能全部计数
+        # bincount 按字符串编号计数：比 np.unique（要排序）快，开销与倒排段总长成正比
+        starts, ends = self.offsets[counted].tolist(), self.offsets[counted + 1].tolist()
+        shared = np.bincount(np.concatenate([self.postings[a:b] for a, b in zip(starts, ends)]),
+                             minlength=len(self.lengths))
+        # Jaccard ≥ cutoff 要求共有三元组 ≥ cutoff × 查询三元组数，先按计数筛掉绝大多数字符串
+        ids = np.flatnonzero(shared >= max(1, math.ceil(cutoff * len(counted) - 1e-9)))
+        shared = shared[ids]
+        if len(counted) < len(codes):
+            # 候选再查常见三元组的位图，补成全部三元组上的共有数
+            byte, bit = ids >> 3, (7 - (ids & 7)).astype(np.uint8)
+            for slot in slots[common].tolist():
+                shared += (self.stop_bits[slot][byte] >> bit) & 1
+        scores = shared / (len(codes) + self.lengths[ids] - shared)
+        keep = scores >= cutoff
+        ids, scores = ids[keep], scores[keep]
+        results, seen = [], set()
+        for k in np.argsort(-scores, kind="stable"):
+            entry = int(ids[k]) // 2
+            if entry in seen:
+                continue
+            seen.add(entry)
+            alias, name, databank = self.entries[entry]
+            results.append(FuzzyMatch(float(scores[k]), alias, name, databank, FIELDS[int(ids[k]) % 2]))
+            if len(results) >= limit:
+                break
+        return results
+
+
+def load_fuzzy_index(source=DEFAULT_SOURCE, path=None):
+    """
+    读取 source 对应的 .npz 索引；不存在、版本不符或 CSV 已变化时重建并尝试写回。
+    source 也不存在时返回 None（调用方不做模糊查找）
+    """
+    return load_or_build(FuzzyIndex, source, path or fuzzy_index_path(source))
+
+
+def synthetic_entries(n, words, seed=0):
+    """合成条目：从 words 中随机取 1~4 个词拼成注册名，别名为分子式风格，用于大规模计时"""
+    import random
+    rnd = random.Random(seed)
+    entries = []
+    for i in range(n):
+        name = "-".join(rnd.choice(words) for _ in range(rnd.choice((1, 2, 2, 3, 3, 4))))
+        entries.append((f"C{rnd.randint(1, 40)}H{rnd.randint(1, 80)}O{rnd.randint(0, 9)}-{i}", name, "PURE11"))
+    return entries
+
+
+def name_words(entries):
+    """注册名按 "-" 等分隔符切出的词（合成语料的词表）"""
+    return sorted({w for _, name, _ in entries for w in re.split(r"[-,()]+", name) if len(w) > 1})
+
+
+def _print_matches(query, matches):
+    print(f"🔍 {query}" + ("" if matches else "（无匹配）"))
+    for m in matches:
+        print(f"   {m.score:.2f} [{m.field:5s}] {m.alias:15s} {m.name}  ({m.databank})")
+
+
+def cmd_build(args):
+    t0 = time.perf_counter()
+    index = FuzzyIndex.from_csv(args.sources)
+    path = Path(args.output) if args.output else fuzzy_index_path(args.sources[0])
+    index.save(path)
+    print(f"🗂️  {path}: {len(index):,} 个化合物, {len(index.postings):,} 条倒排, 常见三元组 {len(index.stop_bits)} 个, "
+          f"{path.stat().st_size / 1024:.0f} KB, {time.perf_counter() - t0:.2f}s")
+
+
+def cmd_search(args):
+    index = load_fuzzy_index(args.source, args.index)
+    if index is None:
+        print(f"❌ 化合物 CSV 未找到: {args.source}")
+        return
+    for query in args.queries:
+        _print_matches(query, index.search(query, args.limit, args.cutoff))
+
+
+def cmd_bench(args):
+    import random
+    index = load_fuzzy_index(args.source, args.index)
+    if index is None:
+        print(f"❌ 化合物 CSV 未找到: {args.source}")
+        return
+    if args.synthetic:
+        # 用真实注册名的词重新组合：三元组分布接近真实数据，规模可任意放大
+        t0 = time.perf_counter()
+        index = FuzzyIndex.from_entries(synthetic_entries(args.synthetic, name_words(index.entries), args.seed))
+        print(f"🧪 合成 {len(index):,} 个化合物，建索引 {time.perf_counter() - t0:.2f}s，常见三元组 {len(index.stop_bits)} 个")
+    rnd = random.Random(args.seed)
+    # 查询：随机取注册名，改成小写、分隔符换成空格、随机删掉一个字符
+    queries = []
+    for _ in range(args.queries):
+        name = rnd.choice(index.entries)[1].lower().replace("-", " ")
+        k = rnd.randrange(len(name))
+        queries.append(name[:k] + name[k + 1:])
+    times, n_hit = [], 0
+    for q in queries:
+        t0 = time.perf_counter()
+        n_hit += bool(index.search(q, args.limit, args.cutoff))
+        times.append(time.perf_counter() - t0)
+    times.sort()
+    print(f"⏱️  {args.queries:,} 次查询: 平均 {sum(times) / len(times) * 1e6:.0f} µs, "
+          f"p95 {times[int(len(times) * 0.95)] * 1e6:.0f} µs（有结果 {n_hit:,} 次）")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="化合物名称三元组模糊查找")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    pb = sub.add_parser("build", help="从化合物 CSV 建索引并保存为 .npz")
+    pb.add_argument("sources", nargs="*", default=[DEFAULT_SOURCE], help="化合物 CSV（可多个，先出现的优先）")
+    pb.add_argument("-o", "--output", help="索引路径（默认 <第一个 CSV>.fuzzy.npz）")
+    pb.set_defaults(func=cmd_build)
+    for name, func, help_text in (("search", cmd_search, "模糊查找"), ("bench", cmd_bench, "查询计时")):
+        p = sub.add_parser(name, help=help_text)
+        if name == "search":
+            p.add_argument("queries", nargs="+")
+        else:
+            p.add_argument("--synthetic", type=int, default=0, help="改用 N 个合成化合物（由 CSV 中注册名的词组合）")
+            p.add_argument("--queries", type=int, default=2000, help="查询次数")
+            p.add_argument("--seed", type=int, default=0)
+        p.add_argument("--source", default=DEFAULT_SOURCE, help="化合物 CSV")
+        p.add_argument("--index", help="索引路径（默认 <CSV>.fuzzy.npz）")
+        p.add_argument("--limit", type=int, default=5, help="最多返回的条目数")
+        p.add_argument("--cutoff", type=float, default=DEFAULT_CUTOFF, help="相似度阈值（0~1）")
+        p.set_defaults(func=func)
+    args = ap.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
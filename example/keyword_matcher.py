@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+多关键字匹配：把"这一行是否包含任一标记"编译成一个合并正则，每行只扫描一遍，
+并报告命中的是哪个标记。供 pdf.py / parse_tables.py / parse_pymupdf_output.py 的行过滤共用。
+"""
+
+import re
+
+
+def _alternation(keywords, flags):
+    # 不加捕获组：纯字面量的多选分支才能用上 re 的首字符集快速扫描
+    return re.compile("|".join(re.escape(k) for k in sorted(keywords, key=len, reverse=True)), flags)
+
+
+class KeywordMatcher:
+    """
+    contains: 行内任意位置出现即命中的关键字（相当于 any(k in line)）
+    prefixes: 只在行首出现才命中的关键字（相当于 line.startswith(k)）
+    同一位置可命中多个关键字时，报告最长的那个
+    """
+
+    def __init__(self, contains=(), prefixes=(), ignore_case=False):
+        if not contains and not prefixes:
+            raise ValueError("KeywordMatcher 至少需要一个关键字")
+        self.ignore_case = ignore_case
+        flags = re.IGNORECASE if ignore_case else 0
+        self.keywords = list(prefixes) + list(contains)
+        self.pattern = _alternation(contains, flags) if contains else None
+        self.prefix_pattern = _alternation(prefixes, flags) if prefixes else None
+        # 命中的文字 → 关键字
+        self._by_text = {self._key(k): k for k in self.keywords}
+
+    def _key(self, text):
+        return text.lower() if self.ignore_case else text
+
+    def search(self, text):
+        """返回命中的关键字（行首关键字优先，其次最靠左的行内关键字），未命中返回 None"""
+        m = None
+        if self.prefix_pattern is not None:
+            m = self.prefix_pattern.match(text)
+        if m is None and self.pattern is not None:
+            m = self.pattern.search(text)
+        if m is None:
+            return None
+        found = m.group()
+        keyword = self._by_text.get(self._key(found))
+        if keyword is None:  # 忽略大小写时个别字符的大小写折叠与 lower() 不一致
+            keyword = next(k for k in self.keywords if re.fullmatch(re.escape(k), found, re.IGNORECASE))
+        return keyword
+
+    def __call__(self, text):
+        return self.search(text)
+
+    def reject(self, lines):
+        """过滤掉命中任一关键字的行"""
+        if self.prefix_pattern is None:
+            search = self.pattern.search
+            return [line for line in lines if search(line) is None]
+        return [line for line in lines if self.search(line) is None]
+
+    def __repr__(self):
+        return f"KeywordMatcher({self.keywords!r})"
@@ -5,12 +5,95 @@
 CSV合并工具：将所有解析后的table CSV文件合并为最终的化合物数据库
 """
 
+from collections import Counter
 from pathlib import Path
+import argparse
 import csv
+import heapq
+from operator import attrgetter
 import re
+import shutil
+import sqlite3
+import tempfile
 
-def merge_csv_files(input_dir, output_file):
-    """合并所有CSV文件"""
+from columnar import ColumnarWriter, columnar_path
+from compound_record import make_record
+from databanks import DATABANK_COLUMNS, DATABANK_BITS, MASK_FIELD, UNKNOWN_MASK, read_exact_masks, row_mask
+from page_cache import file_sha256
+
+FIELDNAMES = ['databank', 'alias_or_code', 'registered_name', 'source_table', MASK_FIELD]  # 即 CompoundRecord 字段顺序
+RUN_SIZE = 200_000   # 外部归并：每个有序段最多的行数（决定内存上限）
+MAX_FAN_IN = 128     # 外部归并：一次同时打开的有序段数
+
+def iter_valid_rows(csv_file):
+    """
+    读取单个 CSV，逐行产出规范化后的 CompoundRecord（source_table 为文件名），跳过不完整的行；
+    没有 databank_mask 列（或为空）的行掩码记为未知
+    """
+    source_table = Path(csv_file).stem
+    with open(csv_file, 'r', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            databank = row.get('databank', '').strip()
+            alias = row.get('alias_or_code', '').strip().upper()
+            name = row.get('registered_name', '').strip().upper()
+            
+            # 基本验证
+            if alias and name and databank:
+                yield make_record(databank, alias, name, source_table, row_mask(row))
+
+class MergeStats:
+    """合并时随写出顺带累计的统计（按数据库计数、按数据库列计数、前 N 个样例、各来源表保留数），不必再读一遍输出文件"""
+
+    def __init__(self, n_samples=10):
+        self.n_samples = n_samples
+        self.total = 0
+        self.databanks = Counter()
+        self.by_source = Counter()
+        self.columns = Counter()
+        self.unknown_masks = 0
+        self.samples = []
+
+    def add(self, databank, alias, name, source_table, mask=UNKNOWN_MASK):
+        self.total += 1
+        self.databanks[databank] += 1
+        self.by_source[source_table] += 1
+        if mask == UNKNOWN_MASK:
+            self.unknown_masks += 1
+        for col in DATABANK_COLUMNS if mask != UNKNOWN_MASK else ():
+            if mask & DATABANK_BITS[col]:
+                self.columns[col] += 1
+        if len(self.samples) < self.n_samples:
+            self.samples.append((alias, name))
+
+    def report(self):
+        print(f"\n📊 化合物数据分析:")
+        print("=" * 50)
+        print(f"📝 总化合物数: {self.total:,}")
+        
+        print(f"\n📋 按数据库分类:")
+        for db, count in sorted(self.databanks.items()):
+            print(f"   {db}: {count:,} 个")
+        
+        if self.columns or self.unknown_masks:
+            print(f"\n📋 按数据库列（{MASK_FIELD}）:")
+            for col in DATABANK_COLUMNS:
+                print(f"   {col}: {self.columns[col]:,} 个")
+            if self.unknown_masks:
+                print(f"   掩码未知: {self.unknown_masks:,} 个（文本解析器给不出列位置，可用 --masks 指定几何 CSV）")
+        
+        print(f"\n🔍 前{self.n_samples}个化合物样例:")
+        for i, (alias, name) in enumerate(self.samples, 1):
+            print(f"   {i:2d}. {alias} → {name}")
+        
+        if self.total > len(self.samples):
+            print(f"   ... (还有 {self.total - len(self.samples):,} 个)")
+
+def merge_csv_files(input_dir, output_file, stats=None, columnar=None, masks=None):
+    """
+    合并所有CSV文件
+    masks: {(alias, name): 精确位掩码}（见 databanks.read_exact_masks），命中的化合物用它替换解析器给出的掩码
+    """
     
     print("🔧 CSV文件合并工具")
     print("=" * 50)
@@ -28,7 +111,7 @@ def merge_csv_files(input_dir, output_file):
     print()
     
     # 统计数据
-    total_compounds = 0
+    total_rows = 0  # 读到的有效行（去重前），与外部归并 / 增量模式的 "总行数" 相同
     processed_files = 0
     failed_files = []
     all_compounds = []
@@ -37,32 +120,18 @@ def merge_csv_files(input_dir, output_file):
     # 逐个处理CSV文件
     for csv_file in csv_files:
         try:
-            with open(csv_file, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                file_compounds = 0
-                
-                for row in reader:
-                    databank = row.get('databank', '').strip()
-                    alias = row.get('alias_or_code', '').strip().upper()
-                    name = row.get('registered_name', '').strip().upper()
-                    
-                    # 基本验证
-                    if alias and name and databank:
-                        # 去重：检查是否已存在相同的alias-name对
-                        pair_key = (alias, name)
-                        if pair_key not in seen_pairs:
-                            seen_pairs.add(pair_key)
-                            all_compounds.append({
-                                'databank': databank,
-                                'alias_or_code': alias,
-                                'registered_name': name,
-                                'source_table': csv_file.stem
-                            })
-                            file_compounds += 1
-                
-                total_compounds += file_compounds
-                processed_files += 1
-                print(f"✅ {csv_file.name}: {file_compounds:3d} 化合物")
+            file_compounds = 0
+            for record in iter_valid_rows(csv_file):
+                total_rows += 1
+                # 去重：检查是否已存在相同的alias-name对
+                pair_key = (record.alias, record.name)
+                if pair_key not in seen_pairs:
+                    seen_pairs.add(pair_key)
+                    all_compounds.append(record)
+                    file_compounds += 1
+            
+            processed_files += 1
+            print(f"✅ {csv_file.name}: {file_compounds:3d} 化合物")
                 
         except Exception as e:
             error_msg = f"读取失败: {e}"
@@ -70,7 +139,10 @@ def merge_csv_files(input_dir, output_file):
             print(f"❌ {csv_file.name}: {error_msg}")
     
     # 按alias排序
-    all_compounds.sort(key=lambda x: x['alias_or_code'])
+    all_compounds.sort(key=attrgetter('alias'))
+    if masks:
+        all_compounds = [r._replace(databank_mask=masks.get((r.alias, r.name), r.databank_mask))
+                         for r in all_compounds]
     
     # 写入合并后的CSV文件
     try:
@@ -78,17 +150,21 @@ def merge_csv_files(input_dir, output_file):
         
         with open(output_file, 'w', newline='', encoding='utf-8') as f:
             if all_compounds:
-                fieldnames = ['databank', 'alias_or_code', 'registered_name', 'source_table']
-                writer = csv.DictWriter(f, fieldnames=fieldnames)
-                writer.writeheader()
+                writer = csv.writer(f)
+                writer.writerow(FIELDNAMES)
                 writer.writerows(all_compounds)
+        for record in all_compounds:
+            if stats is not None:
+                stats.add(*record)
+            if columnar is not None:
+                columnar.append(record)
         
         print(f"\n✅ 合并完成!")
         print(f"📊 处理统计:")
         print(f"   - 成功文件: {processed_files}/{len(csv_files)} 个")
-        print(f"   - 总化合物: {total_compounds:,} 个")
+        print(f"   - 总行数: {total_rows:,} 行")
         print(f"   - 去重后: {len(all_compounds):,} 个")
-        print(f"   - 去重率: {((total_compounds - len(all_compounds))/total_compounds*100):.1f}%" if total_compounds > 0 else "   - 去重率: 0%")
+        print(f"   - 去重率: {((total_rows - len(all_compounds))/total_rows*100):.1f}%" if total_rows > 0 else "   - 去重率: 0%")
         print(f"💾 输出文件: {output_file}")
         print(f"📏 文件大小: {output_file.stat().st_size:,} 字节")
         
@@ -104,50 +180,385 @@ def merge_csv_files(input_dir, output_file):
         print(f"❌ 写入输出文件失败: {e}")
         return 0
 
+# --------- 外部归并模式：内存占用与总行数无关 ---------
+def _write_run(rows, path):
+    """有序段文件：每行 (alias, seq, name, databank, source_table, mask)"""
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        csv.writer(f).writerows(rows)
+
+def _read_run(path):
+    with open(path, 'r', newline='', encoding='utf-8') as f:
+        for alias, seq, name, databank, source_table, mask in csv.reader(f):
+            yield alias, int(seq), name, databank, source_table, int(mask)
+
+def _merge_runs(paths):
+    # (alias, seq) 全局唯一，直接按元组比较即为按 (alias, seq) 归并
+    return heapq.merge(*(_read_run(path) for path in paths))
+
+def merge_csv_files_external(input_dir, output_file, run_size=RUN_SIZE, tmp_dir=None, max_fan_in=MAX_FAN_IN,
+                             stats=None, columnar=None, masks=None):
+    """
+    外部 k 路归并版的 merge_csv_files，输出与之逐字节一致：
+      1) 逐个读入 CSV，按读入顺序给每行编号 seq，攒满 run_size 行就按 (alias, seq) 排序写成一个有序段
+      2) 有序段多于 max_fan_in 个时先分组归并，减少同时打开的文件数
+      3) 最后一遍堆归并：同一 alias 的行相邻且按 seq 有序，组内第一次出现的 (alias, name) 即为全局第一次出现，
+         只需为当前 alias 组保留一个名称集合即可去重
+    内存占用由 run_size 与单个 alias 组的大小决定，与总行数无关（masks 见 merge_csv_files，按化合物数常驻内存）
+    """
+    print("🔧 CSV文件合并工具（外部归并模式）")
+    print("=" * 50)
+
+    csv_files = sorted(input_dir.glob("table_*.csv"))
+    if not csv_files:
+        print(f"❌ 没有找到CSV文件在 {input_dir}")
+        return
+
+    print(f"📁 输入目录: {input_dir}")
+    print(f"📄 找到 {len(csv_files)} 个CSV文件")
+    print(f"💾 输出文件: {output_file}")
+    print(f"🧮 每段最多 {run_size:,} 行")
+    print()
+
+    work_dir = Path(tempfile.mkdtemp(prefix="merge_runs_", dir=tmp_dir))
+    runs = []
+    failed_files = []
+    total_rows = 0
+    try:
+        # 1) 切分为有序段
+        buffer = []
+        for csv_file in csv_files:
+            try:
+                for r in iter_valid_rows(csv_file):
+                    buffer.append((r.alias, total_rows, r.name, r.databank, r.source_table, r.databank_mask))
+                    total_rows += 1
+                    if len(buffer) >= run_size:
+                        buffer.sort()
+                        runs.append(work_dir / f"run_{len(runs):05d}.csv")
+                        _write_run(buffer, runs[-1])
+                        buffer = []
+            except Exception as e:
+                error_msg = f"读取失败: {e}"
+                failed_files.append((csv_file.name, error_msg))
+                print(f"❌ {csv_file.name}: {error_msg}")
+        if buffer:
+            buffer.sort()
+            runs.append(work_dir / f"run_{len(runs):05d}.csv")
+            _write_run(buffer, runs[-1])
+            buffer = []
+        print(f"📦 有序段: {len(runs)} 个，共 {total_rows:,} 行")
+
+        # 2) 有序段过多时分组预归并
+        n_written = len(runs)
+        while len(runs) > max_fan_in:
+            merged = []
+            for i in range(0, len(runs), max_fan_in):
+                group = runs[i:i + max_fan_in]
+                if len(group) == 1:
+                    merged.append(group[0])
+                    continue
+                path = work_dir / f"run_{n_written:05d}.csv"
+                n_written += 1
+                _write_run(_merge_runs(group), path)
+                for run in group:
+                    run.unlink()
+                merged.append(path)
+            runs = merged
+
+        # 3) 最终归并 + 按 alias 组去重，边归并边写出
+        stats = stats if stats is not None else MergeStats()
+        n_kept = 0
+        output_file.parent.mkdir(exist_ok=True)
+        with open(output_file, 'w', newline='', encoding='utf-8') as f:
+            writer = None
+            current_alias = None
+            names = set()
+            for alias, _, name, databank, source_table, mask in _merge_runs(runs):
+                if alias != current_alias:
+                    current_alias = alias
+                    names.clear()
+                if name in names:
+                    continue
+                names.add(name)
+                if masks:
+                    mask = masks.get((alias, name), mask)
+                if writer is None:  # 与内存模式一致：没有任何化合物时不写表头
+                    writer = csv.writer(f)
+                    writer.writerow(FIELDNAMES)
+                writer.writerow([databank, alias, name, source_table, mask])
+                stats.add(databank, alias, name, source_table, mask)
+                if columnar is not None:
+                    columnar.append((databank, alias, name, source_table, mask))
+                n_kept += 1
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    failed_names = {name for name, _ in failed_files}
+    for csv_file in csv_files:
+        if csv_file.name not in failed_names:
+            print(f"✅ {csv_file.name}: {stats.by_source[csv_file.stem]:3d} 化合物")
+
+    print(f"\n✅ 合并完成!")
+    print(f"📊 处理统计:")
+    print(f"   - 成功文件: {len(csv_files) - len(failed_files)}/{len(csv_files)} 个")
+    print(f"   - 总行数: {total_rows:,} 行")
+    print(f"   - 去重后: {n_kept:,} 个")
+    print(f"   - 去重率: {((total_rows - n_kept)/total_rows*100):.1f}%" if total_rows > 0 else "   - 去重率: 0%")
+    print(f"💾 输出文件: {output_file}")
+    print(f"📏 文件大小: {output_file.stat().st_size:,} 字节")
+    if failed_files:
+        print(f"\n❌ 失败文件:")
+        for filename, error in failed_files:
+            print(f"   {filename}: {error}")
+    return n_kept
+
+# --------- 增量合并：只重读变化的输入，只重算它涉及的 (alias, name) ---------
+class MergeIndex:
+    """
+    增量合并的状态（SQLite），可作为上下文管理器使用
+      files : 输入清单（文件名、排序位置、大小、mtime、sha256）
+      rows  : 每个输入的有效行（文件名、行号、databank、alias、name、数据库位掩码）
+      merged: 每个 (alias, name) 的胜出行 = 按 (文件排序位置, 行号) 最早出现的那一行
+    输入变化时只替换该文件的行，并只重算新旧行涉及的 (alias, name)
+    表结构版本记在 PRAGMA user_version 中，旧版本的索引直接清空重建
+    """
+
+    SCHEMA_VERSION = 2
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] != self.SCHEMA_VERSION:
+            self.conn.executescript("DROP TABLE IF EXISTS files; DROP TABLE IF EXISTS rows; DROP TABLE IF EXISTS merged;")
+            self.conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS files (
+                name TEXT PRIMARY KEY, rank INTEGER NOT NULL,
+                size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, sha256 TEXT
+            );
+            CREATE TABLE IF NOT EXISTS rows (
+                file TEXT NOT NULL, row_no INTEGER NOT NULL,
+                databank TEXT NOT NULL, alias TEXT NOT NULL, name TEXT NOT NULL,
+                databank_mask INTEGER NOT NULL,
+                PRIMARY KEY (file, row_no)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS rows_key ON rows(alias, name);
+            CREATE TABLE IF NOT EXISTS merged (
+                alias TEXT NOT NULL, name TEXT NOT NULL,
+                file TEXT NOT NULL, row_no INTEGER NOT NULL, databank TEXT NOT NULL,
+                databank_mask INTEGER NOT NULL,
+                PRIMARY KEY (alias, name)
+            ) WITHOUT ROWID;
+            """
+        )
+
+    def files(self):
+        """{文件名: (大小, mtime_ns, sha256)}"""
+        return {name: (size, mtime_ns, sha) for name, size, mtime_ns, sha
+                in self.conn.execute("SELECT name, size, mtime_ns, sha256 FROM files")}
+
+    def set_ranks(self, names):
+        """按本次 sorted() 的顺序记录每个文件的排序位置（只涉及文件数，不涉及行数）"""
+        self.conn.executemany("UPDATE files SET rank=? WHERE name=?", [(i, name) for i, name in enumerate(names)])
+
+    def update_stat(self, name, size, mtime_ns):
+        self.conn.execute("UPDATE files SET size=?, mtime_ns=? WHERE name=?", (size, mtime_ns, name))
+
+    def _keys_of(self, name):
+        return set(self.conn.execute("SELECT alias, name FROM rows WHERE file=?", (name,)))
+
+    def replace_file(self, name, rank, size, mtime_ns, sha, rows):
+        """替换一个输入的全部行（CompoundRecord 列表），返回受影响的 (alias, name) 集合；sha 为 None 表示读取失败，下次重读"""
+        affected = self._keys_of(name)
+        self.conn.execute("DELETE FROM rows WHERE file=?", (name,))
+        self.conn.executemany(
+            "INSERT INTO rows VALUES (?, ?, ?, ?, ?, ?)",
+            [(name, row_no, r.databank, r.alias, r.name, r.databank_mask) for row_no, r in enumerate(rows)],
+        )
+        self.conn.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)", (name, rank, size, mtime_ns, sha))
+        affected.update((r.alias, r.name) for r in rows)
+        return affected
+
+    def remove_file(self, name):
+        affected = self._keys_of(name)
+        self.conn.execute("DELETE FROM rows WHERE file=?", (name,))
+        self.conn.execute("DELETE FROM files WHERE name=?", (name,))
+        return affected
+
+    def refresh(self, keys):
+        """重算给定 (alias, name) 的胜出行"""
+        for alias, name in keys:
+            winner = self.conn.execute(
+                """
+                SELECT r.file, r.row_no, r.databank, r.databank_mask FROM rows r JOIN files f ON f.name = r.file
+                WHERE r.alias=? AND r.name=? ORDER BY f.rank, r.row_no LIMIT 1
+                """,
+                (alias, name),
+            ).fetchone()
+            if winner is None:
+                self.conn.execute("DELETE FROM merged WHERE alias=? AND name=?", (alias, name))
+            else:
+                self.conn.execute("INSERT OR REPLACE INTO merged VALUES (?, ?, ?, ?, ?, ?)", (alias, name, *winner))
+
+    def total_rows(self):
+        return self.conn.execute("SELECT COUNT(*) FROM rows").fetchone()[0]
+
+    def iter_merged(self):
+        """按 alias、再按首次出现顺序产出 (databank, alias, name, 文件名, 掩码)，与内存模式的稳定排序一致"""
+        return self.conn.execute(
+            """
+            SELECT m.databank, m.alias, m.name, m.file, m.databank_mask FROM merged m JOIN files f ON f.name = m.file
+            ORDER BY m.alias, f.rank, m.row_no
+            """
+        )
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def merge_csv_files_incremental(input_dir, output_file, state_path=None, stats=None, columnar=None, masks=None):
+    """
+    增量版的 merge_csv_files，输出与之逐字节一致：
+      - 大小与 mtime 都没变的输入不读；变了的先比 sha256，内容确实变了才重新解析
+      - 只替换变化文件的行、只重算涉及的 (alias, name)，合并的工作量与变化的表成正比
+      - 最后从索引按序导出 CSV（顺序读出，不再解析/去重任何输入）
+    索引里存的是解析器给出的掩码，masks 在导出时才替换，几何 CSV 变了也不必重建索引
+    """
+    print("🔧 CSV文件合并工具（增量模式）")
+    print("=" * 50)
+
+    csv_files = sorted(input_dir.glob("table_*.csv"))
+    if not csv_files:
+        print(f"❌ 没有找到CSV文件在 {input_dir}")
+        return
+
+    state_path = Path(state_path) if state_path else output_file.with_suffix(".merge.sqlite3")
+    print(f"📁 输入目录: {input_dir}")
+    print(f"📄 找到 {len(csv_files)} 个CSV文件")
+    print(f"🗂️  增量索引: {state_path}")
+    print(f"💾 输出文件: {output_file}")
+    print()
+
+    stats = stats if stats is not None else MergeStats()
+    failed_files = []
+    n_skipped = 0
+    with MergeIndex(state_path) as index:
+        known = index.files()
+        affected = set()
+        names = [csv_file.name for csv_file in csv_files]
+
+        # 删除的输入
+        for name in set(known) - set(names):
+            affected |= index.remove_file(name)
+            print(f"🗑️  已移除: {name}")
+
+        for rank, csv_file in enumerate(csv_files):
+            st = csv_file.stat()
+            old = known.get(csv_file.name)
+            if old is not None and old[2] is not None and old[:2] == (st.st_size, st.st_mtime_ns):
+                n_skipped += 1
+                continue
+            sha = file_sha256(csv_file)
+            if old is not None and old[2] == sha:  # 只是 mtime 变了
+                index.update_stat(csv_file.name, st.st_size, st.st_mtime_ns)
+                n_skipped += 1
+                continue
+
+            rows = []
+            try:
+                rows.extend(iter_valid_rows(csv_file))
+                print(f"🔄 重新读取: {csv_file.name} ({len(rows)} 行)")
+            except Exception as e:
+                # 与全量合并一致：保留出错前读到的行；不记 sha256，下次重读
+                error_msg = f"读取失败: {e}"
+                failed_files.append((csv_file.name, error_msg))
+                print(f"❌ {csv_file.name}: {error_msg}")
+                sha = None
+            affected |= index.replace_file(csv_file.name, rank, st.st_size, st.st_mtime_ns, sha, rows)
+
+        index.set_ranks(names)
+        index.refresh(affected)
+        print(f"♻️  未变化: {n_skipped} 个文件（未重新解析）；重算键: {len(affected):,} 个")
+
+        n_kept = 0
+        output_file.parent.mkdir(exist_ok=True)
+        with open(output_file, 'w', newline='', encoding='utf-8') as f:
+            writer = None
+            for databank, alias, name, file_name, mask in index.iter_merged():
+                if masks:
+                    mask = masks.get((alias, name), mask)
+                if writer is None:  # 与内存模式一致：没有任何化合物时不写表头
+                    writer = csv.writer(f)
+                    writer.writerow(FIELDNAMES)
+                source_table = Path(file_name).stem
+                writer.writerow([databank, alias, name, source_table, mask])
+                stats.add(databank, alias, name, source_table, mask)
+                if columnar is not None:
+                    columnar.append((databank, alias, name, source_table, mask))
+                n_kept += 1
+        total_rows = index.total_rows()
+
+    print(f"\n✅ 合并完成!")
+    print(f"📊 处理统计:")
+    print(f"   - 成功文件: {len(csv_files) - len(failed_files)}/{len(csv_files)} 个")
+    print(f"   - 总行数: {total_rows:,} 行")
+    print(f"   - 去重后: {n_kept:,} 个")
+    print(f"   - 去重率: {((total_rows - n_kept)/total_rows*100):.1f}%" if total_rows > 0 else "   - 去重率: 0%")
+    print(f"💾 输出文件: {output_file}")
+    print(f"📏 文件大小: {output_file.stat().st_size:,} 字节")
+    if failed_files:
+        print(f"\n❌ 失败文件:")
+        for filename, error in failed_files:
+            print(f"   {filename}: {error}")
+    return n_kept
+
 def analyze_compounds(csv_file):
-    """分析化合物数据"""
+    """分析已有的合并结果文件（合并时的统计见 MergeStats，无需再调用本函数）"""
     
     if not csv_file.exists():
         print(f"❌ 文件不存在: {csv_file}")
         return
     
-    print(f"\n📊 化合物数据分析:")
-    print("=" * 50)
-    
     try:
+        stats = MergeStats()
         with open(csv_file, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            compounds = list(reader)
-        
-        print(f"📝 总化合物数: {len(compounds):,}")
-        
-        # 按数据库分类统计
-        databank_stats = {}
-        for compound in compounds:
-            db = compound.get('databank', 'Unknown')
-            databank_stats[db] = databank_stats.get(db, 0) + 1
-        
-        print(f"\n📋 按数据库分类:")
-        for db, count in sorted(databank_stats.items()):
-            print(f"   {db}: {count:,} 个")
-        
-        # 显示前10个化合物样例
-        print(f"\n🔍 前10个化合物样例:")
-        for i, compound in enumerate(compounds[:10], 1):
-            alias = compound.get('alias_or_code', '')
-            name = compound.get('registered_name', '')
-            print(f"   {i:2d}. {alias} → {name}")
-        
-        if len(compounds) > 10:
-            print(f"   ... (还有 {len(compounds)-10:,} 个)")
-            
+            for compound in csv.DictReader(f):
+                stats.add(compound.get('databank', 'Unknown'), compound.get('alias_or_code', ''),
+                          compound.get('registered_name', ''), compound.get('source_table', ''),
+                          row_mask(compound))
+        stats.report()
     except Exception as e:
         print(f"❌ 分析失败: {e}")
 
 def main():
+    ap = argparse.ArgumentParser(description="合并 parsed_csv/table_*.csv 为最终化合物数据库")
+    ap.add_argument("input_dir", nargs="?", default="example/data/parsed_csv", help="输入目录")
+    ap.add_argument("-o", "--output", default="example/data/final_compounds.csv", help="输出 CSV 路径")
+    ap.add_argument("--external", action="store_true",
+                    help="外部 k 路归并：分段排序写临时文件再堆归并，内存占用与总行数无关")
+    ap.add_argument("--run-size", type=int, default=RUN_SIZE, help="外部归并每段最多行数")
+    ap.add_argument("--tmp-dir", default=None, help="外部归并 / 列式文件的临时目录（默认系统临时目录）")
+    ap.add_argument("--incremental", action="store_true",
+                    help="增量合并：记录输入清单与行索引，重跑时只重读变化的 table_*.csv")
+    ap.add_argument("--state", default=None, help="增量索引路径（默认 <输出>.merge.sqlite3）")
+    ap.add_argument("--columnar", action="store_true",
+                    help="同时写出列式文件 <输出>.col（databank/source_table 字典编码，可 mmap 加载）")
+    ap.add_argument("--masks", default=None,
+                    help="几何 CSV（extract_databank_tables.py 输出）作为精确数据库掩码来源；"
+                         "文本解析器给不出列位置，未命中的化合物掩码记为未知（-1）")
+    args = ap.parse_args()
+
     # 输入和输出路径
-    input_dir = Path("example/data/parsed_csv")
-    output_file = Path("example/data/final_compounds.csv")
+    input_dir = Path(args.input_dir)
+    output_file = Path(args.output)
     
     # 检查输入目录
     if not input_dir.exists():
@@ -155,12 +566,36 @@ def main():
         print("请先运行 parse_tables.py 来解析表格")
         return
     
-    # 合并CSV文件
-    compound_count = merge_csv_files(input_dir, output_file)
+    masks = None
+    if args.masks:
+        if not Path(args.masks).exists():
+            print(f"❌ 掩码来源未找到: {args.masks}（先运行 extract_databank_tables.py）")
+            return
+        masks = read_exact_masks(args.masks)
+        print(f"🧭 精确掩码: {len(masks):,} 个化合物（{args.masks}）")
+
+    # 合并CSV文件（统计在合并过程中累计）
+    stats = MergeStats()
+    columnar = (ColumnarWriter(columnar_path(output_file), FIELDNAMES, dict_columns=("databank", "source_table"),
+                               int_columns=(MASK_FIELD,), tmp_dir=args.tmp_dir)
+                if args.columnar else None)
+    try:
+        if args.incremental:
+            compound_count = merge_csv_files_incremental(input_dir, output_file, args.state, stats, columnar, masks)
+        elif args.external:
+            compound_count = merge_csv_files_external(input_dir, output_file, args.run_size, args.tmp_dir,
+                                                      stats=stats, columnar=columnar, masks=masks)
+        else:
+            compound_count = merge_csv_files(input_dir, output_file, stats, columnar, masks)
+        if compound_count and columnar is not None:
+            print(f"🗜️  列式文件: {columnar.close()}")
+    finally:
+        if columnar is not None:
+            columnar.abort()  # 没有化合物或合并出错时不写 .col，只删除临时文件
     
     # 分析结果
-    if compound_count > 0:
-        analyze_compounds(output_file)
+    if compound_count:
+        stats.report()
         print(f"\n🎉 任务完成！")
         print(f"🎯 最终结果: {compound_count:,} 个化合物 alias-name 配对")
         print(f"📁 保存在: {output_file}")
@@ -168,4 +603,4 @@ def main():
         print("❌ 合并失败！")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
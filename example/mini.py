@@ -57,6 +57,23 @@ def search_cid(keyword: str) -> str | None:
             return cid
     return None
 
+# ---------- 模糊查找：精确匹配失败时给出候选（见 fuzzy_index.py） ----------
+try:
+    from fuzzy_index import load_fuzzy_index
+    fuzzy = load_fuzzy_index()   # 读 .npz；化合物 CSV 不存在时为 None
+except ImportError:              # 未安装 numpy
+    fuzzy = None
+
+def fuzzy_cid(keyword: str) -> str | None:
+    if fuzzy is None:
+        return None
+    for m in fuzzy.search(keyword, limit=3):
+        cid = search_cid(m.alias) or search_cid(m.name)
+        if cid:
+            print(f"[Fuzzy] '{keyword}' ≈ {m.name} ({m.alias}, 相似度 {m.score:.2f}) → {cid}")
+            return cid
+    return None
+
 # ---------- 写入组分 ----------
 def existing_ids():
     return {str(tbl.Label(ROW_DIM, r)).strip() for r in range(tbl.RowCount)}
@@ -65,7 +82,7 @@ ids_in_table = existing_ids()
 added = []
 
 for key in keywords:
-    cid = search_cid(key)
+    cid = search_cid(key) or fuzzy_cid(key)
     if not cid:
         print(f"[WARN] '{key}' 未在 PURE 数据库找到")
         continue
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+化合物 CSV 派生索引的 .npz 文件读写（fuzzy_index、formula_index 共用）
+  - 条目 = (alias, name, databank)，来自一个或多个化合物 CSV；(alias, name) 相同的只保留先出现的
+  - 字符串列存成 "\\n" 连接的 UTF-8 uint8 数组，meta 存成 JSON 字节，读取不需要 pickle
+  - meta["sources"] 记录来源 CSV 的 [路径, 大小, mtime_ns]，任一变化即视为过期
+  - meta["version"] 由各索引自己给出，版本不符时 load_npz 抛 ValueError
+"""
+
+from pathlib import Path
+import json
+
+import numpy as np
+
+from compound_index import iter_source_rows
+
+STRING_FIELDS = ("aliases", "names", "databanks")
+
+
+def stat_key(path):
+    st = Path(path).stat()
+    return st.st_size, st.st_mtime_ns
+
+
+def pack_strings(strings):
+    """字符串列表 → uint8 数组（"\\n" 连接的 UTF-8）"""
+    return np.frombuffer("\n".join(strings).encode("utf-8"), dtype=np.uint8)
+
+
+def unpack_strings(array, n):
+    return array.tobytes().decode("utf-8").split("\n") if n else []
+
+
+def read_entries(sources):
+    """从化合物 CSV 读出 (条目列表, meta)；meta 只含 sources"""
+    entries = {}
+    for source in sources:
+        for alias, name, databank in iter_source_rows(source):
+            entries.setdefault((alias, name), databank)
+    meta = {"sources": [[str(s), *stat_key(s)] for s in sources]}
+    return [(alias, name, databank) for (alias, name), databank in entries.items()], meta
+
+
+def save_npz(path, entries, meta, **arrays):
+    """条目、meta 与索引自己的数组一起写入 path（meta 中的 entries 字段由这里填）"""
+    aliases, names, databanks = zip(*entries) if entries else ((), (), ())
+    meta = dict(meta, entries=len(entries))
+    with open(path, "wb") as f:  # 传文件对象，np.savez 不会自动追加 .npz 后缀
+        np.savez(f, **arrays,
+                 aliases=pack_strings(aliases), names=pack_strings(names), databanks=pack_strings(databanks),
+                 meta=np.frombuffer(json.dumps(meta).encode("utf-8"), dtype=np.uint8))
+
+
+def load_npz(path, version):
+    """读取 save_npz 写的文件 → (条目列表, meta, {数组名: 数组})；版本不符时抛 ValueError"""
+    with np.load(path) as data:
+        meta = json.loads(data["meta"].tobytes().decode("utf-8"))
+        if meta.get("version") != version:
+            raise ValueError(f"索引版本不符: {meta.get('version')}（需要 {version}）")
+        n = meta["entries"]
+        entries = list(zip(*(unpack_strings(data[k], n) for k in STRING_FIELDS)))
+        arrays = {k: data[k] for k in data.files if k not in STRING_FIELDS and k != "meta"}
+    return entries, meta, arrays
+
+
+def is_stale(meta):
+    """来源 CSV 不存在或大小 / mtime 与建索引时不同"""
+    try:
+        return any(stat_key(path) != (size, mtime_ns) for path, size, mtime_ns in meta["sources"])
+    except (OSError, KeyError):
+        return True
+
+
+def load_or_build(cls, source, path):
+    """
+    cls.load(path)；文件不存在、损坏、版本不符或来源 CSV 已变化时用 cls.from_csv([source]) 重建并尝试写回。
+    source 也不存在时返回 None
+    """
+    path = Path(path)
+    if path.exists():
+        try:
+            index = cls.load(path)
+            if not is_stale(index.meta):
+                return index
+        except (OSError, ValueError, KeyError):
+            pass
+    if not Path(source).exists():
+        return None
+    index = cls.from_csv([source])
+    try:
+        index.save(path)
+    except OSError:  # 只读目录：只在内存中使用
+        pass
+    return index
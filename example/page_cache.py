@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+逐页文本缓存（SQLite）
+键：(PDF 内容 sha256, 页码, 提取后端, 提取参数)；值：该页提取出的文本或 span dict（JSON）。
+只改解析规则时重新运行，不必再从 PDF 重新抽取文字。
+缓存总大小超过上限时按最近使用时间淘汰。
+"""
+
+import hashlib
+import json
+import sqlite3
+import time
+from pathlib import Path
+
+DEFAULT_CACHE_PATH = Path("example/data/page_cache.sqlite3")
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024  # 512 MB
+COMMIT_EVERY = 64
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    """计算文件内容的 sha256（分块读取）"""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def options_key(options):
+    """提取参数 → 稳定的字符串键"""
+    return json.dumps(options or {}, sort_keys=True, separators=(",", ":"))
+
+
+class PageCache:
+    """逐页提取结果缓存，可作为上下文管理器使用"""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path), timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS pages (
+                pdf_sha256 TEXT NOT NULL,
+                page       INTEGER NOT NULL,
+                backend    TEXT NOT NULL,
+                options    TEXT NOT NULL,
+                payload    TEXT NOT NULL,
+                size       INTEGER NOT NULL,
+                last_used  REAL NOT NULL,
+                PRIMARY KEY (pdf_sha256, backend, options, page)
+            ) WITHOUT ROWID
+            """
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS pages_last_used ON pages(last_used)")
+        self.conn.commit()
+        self._pending = 0
+
+    # —— 读 —— #
+    def get(self, pdf_sha256, page, backend, options=None):
+        """返回缓存的单页结果（已 JSON 解码），未命中返回 None"""
+        row = self.conn.execute(
+            "SELECT payload FROM pages WHERE pdf_sha256=? AND backend=? AND options=? AND page=?",
+            (pdf_sha256, backend, options_key(options), page),
+        ).fetchone()
+        if row is None:
+            return None
+        self._touch(pdf_sha256, backend, options, [page])
+        return json.loads(row[0])
+
+    def cached_pages(self, pdf_sha256, backend, options=None):
+        """该文档在此后端/参数下已缓存的页码集合（不读取内容）"""
+        rows = self.conn.execute(
+            "SELECT page FROM pages WHERE pdf_sha256=? AND backend=? AND options=?",
+            (pdf_sha256, backend, options_key(options)),
+        )
+        return {page for (page,) in rows}
+
+    def _touch(self, pdf_sha256, backend, options, pages):
+        now = time.time()
+        self.conn.executemany(
+            "UPDATE pages SET last_used=? WHERE pdf_sha256=? AND backend=? AND options=? AND page=?",
+            [(now, pdf_sha256, backend, options_key(options), page) for page in pages],
+        )
+        self._mark_dirty(len(pages))
+
+    # —— 写 —— #
+    def put(self, pdf_sha256, page, backend, options, value):
+        """写入单页结果（value 需可 JSON 序列化）"""
+        payload = json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+        self.conn.execute(
+            "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (pdf_sha256, page, backend, options_key(options), payload,
+             len(payload.encode("utf-8")), time.time()),
+        )
+        self._mark_dirty(1)
+
+    def _mark_dirty(self, n):
+        self._pending += n
+        if self._pending >= COMMIT_EVERY:
+            self.flush()
+
+    def flush(self):
+        """提交挂起的写入，并在超出容量时淘汰"""
+        self.conn.commit()
+        self._pending = 0
+        self.evict()
+
+    def evict(self):
+        """总大小超过 max_bytes 时，按最近使用时间从旧到新删除，直到降到上限的 90%"""
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        if total <= self.max_bytes:
+            return 0
+        target = int(self.max_bytes * 0.9)
+        victims = []
+        for key in self.conn.execute(
+            "SELECT pdf_sha256, backend, options, page, size FROM pages ORDER BY last_used"
+        ):
+            if total <= target:
+                break
+            victims.append(key[:4])
+            total -= key[4]
+        self.conn.executemany(
+            "DELETE FROM pages WHERE pdf_sha256=? AND backend=? AND options=? AND page=?",
+            victims,
+        )
+        self.conn.commit()
+        return len(victims)
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_cache(enabled=True, path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES):
+    """--no-cache 时返回 None，调用方据此跳过缓存"""
+    return PageCache(path, max_bytes) if enabled else None
@@ -4,12 +4,32 @@
 """
 解析 PyMuPDF 提取的化合物数据
 处理每行之间有 --- 分隔符的格式
+X 标记各占一行、已丢失列位置，数据库位掩码记为未知（精确掩码见 extract_databank_tables.py）
 """
 
 from pathlib import Path
+import argparse
 import re
 import csv
 
+from columnar import ColumnarWriter, columnar_path
+from compound_record import make_record
+from databanks import MASK_FIELD, UNKNOWN_MASK
+from keyword_matcher import KeywordMatcher
+
+# 表格结束标记
+TABLE_END = KeywordMatcher(
+    contains=["Available in Databank", "Component Databank"],
+    prefixes=["===== PAGE", "Aqueous Component", "Combust Component", "Electrolytes"],
+)
+
+def make_compound(alias, name, x_count):
+    """
+    该格式里 X 标记各占一行、已丢失列位置：有 X 即记为 PURE11（第一个X表示PURE11），
+    位掩码记为未知；返回 CompoundRecord，没有 X 的 databank 留空
+    """
+    return make_record('PURE11' if x_count >= 1 else '', alias, name, databank_mask=UNKNOWN_MASK)
+
 def parse_compound_data(lines):
     """解析化合物数据"""
     
@@ -57,21 +77,10 @@ def parse_compound_data(lines):
             continue
         
         # 检查表格结束
-        if in_compound_table and (
-            line.startswith("===== PAGE") or
-            "Available in Databank" in line or
-            line.startswith("Aqueous Component") or
-            line.startswith("Combust Component") or
-            line.startswith("Electrolytes") or
-            "Component Databank" in line
-        ):
+        if in_compound_table and TABLE_END.search(line):
             # 保存当前化合物（如果有）
             if current_alias and current_name:
-                compounds.append({
-                    'alias': current_alias,
-                    'name': current_name,
-                    'pure11': x_count >= 1  # 第一个X表示PURE11
-                })
+                compounds.append(make_compound(current_alias, current_name, x_count))
             
             # 重置状态
             in_compound_table = False
@@ -91,11 +100,7 @@ def parse_compound_data(lines):
             elif is_chemical_formula(line):
                 # 保存之前的化合物
                 if current_alias and current_name:
-                    compounds.append({
-                        'alias': current_alias,
-                        'name': current_name,
-                        'pure11': x_count >= 1
-                    })
+                    compounds.append(make_compound(current_alias, current_name, x_count))
                 
                 # 开始新的化合物
                 current_alias = line
@@ -108,11 +113,7 @@ def parse_compound_data(lines):
     
     # 保存最后一个化合物
     if current_alias and current_name:
-        compounds.append({
-            'alias': current_alias,
-            'name': current_name,
-            'pure11': x_count >= 1
-        })
+        compounds.append(make_compound(current_alias, current_name, x_count))
     
     return compounds
 
@@ -164,8 +165,14 @@ def is_compound_name(text):
     return True
 
 def main():
-    input_file = Path("example/data/PP.txt")
-    output_file = Path("example/data/compounds_final.csv")
+    ap = argparse.ArgumentParser(description="解析 PyMuPDF 提取的化合物数据（--- 分隔格式）")
+    ap.add_argument("input", nargs="?", default="example/data/PP.txt", help="PyMuPDF 提取的文本")
+    ap.add_argument("-o", "--output", default="example/data/compounds_final.csv", help="输出 CSV 路径")
+    ap.add_argument("--columnar", action="store_true", help="同时写出列式文件（与 CSV 同名 .col，可 mmap 加载）")
+    args = ap.parse_args()
+
+    input_file = Path(args.input)
+    output_file = Path(args.output)
     
     if not input_file.exists():
         print(f"❌ 输入文件未找到: {input_file}")
@@ -185,7 +192,7 @@ def main():
     compounds = parse_compound_data(lines)
     
     # 过滤 PURE11 化合物
-    pure11_compounds = [c for c in compounds if c['pure11']]
+    pure11_compounds = [c for c in compounds if c.databank == 'PURE11']
     
     print(f"✅ 总计化合物: {len(compounds)}")
     print(f"🎯 PURE11 化合物: {len(pure11_compounds)}")
@@ -193,26 +200,33 @@ def main():
     # 写入 CSV
     with open(output_file, 'w', newline='', encoding='utf-8') as f:
         writer = csv.writer(f)
-        writer.writerow(['databank', 'alias_or_code', 'registered_name'])
+        writer.writerow(['databank', 'alias_or_code', 'registered_name', MASK_FIELD])
         
         for compound in pure11_compounds:
             writer.writerow([
-                'PURE11',
-                compound['alias'],
-                compound['name']
+                compound.databank,
+                compound.alias,
+                compound.name,
+                compound.databank_mask
             ])
     
     print(f"💾 保存到: {output_file}")
     
+    if args.columnar:
+        with ColumnarWriter(columnar_path(output_file), ['databank', 'alias_or_code', 'registered_name', MASK_FIELD],
+                            dict_columns=('databank',), int_columns=(MASK_FIELD,)) as col_writer:
+            col_writer.extend((c.databank, c.alias, c.name, c.databank_mask) for c in pure11_compounds)
+        print(f"🗜️  列式文件: {col_writer.path}")
+    
     # 显示示例
     print(f"\n📋 前 15 个 PURE11 化合物:")
     for i, compound in enumerate(pure11_compounds[:15], 1):
-        print(f"{i:2d}. {compound['alias']:15s} -> {compound['name']}")
+        print(f"{i:2d}. {compound.alias:15s} -> {compound.name}")
     
     # 统计信息
     if pure11_compounds:
-        alias_lengths = [len(c['alias']) for c in pure11_compounds]
-        name_lengths = [len(c['name']) for c in pure11_compounds]
+        alias_lengths = [len(c.alias) for c in pure11_compounds]
+        name_lengths = [len(c.name) for c in pure11_compounds]
         
         print(f"\n📊 统计:")
         print(f"   别名长度: {min(alias_lengths)}-{max(alias_lengths)} 字符")
@@ -1,7 +1,25 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+化合物表解析：PP.txt → 分表 → alias/name 配对 → 去重 → final_table.csv
+各阶段都是生成器，默认全程在内存中流式处理，不落中间文件：
+  - --keep-intermediates: 同时写出 tables/table_NN.txt（与 split_tables.py 的输出一致）
+  - --from-tables: 直接读取已有的 tables/ 目录（旧流程）
+  - --workers N: 各表互不依赖，在进程池中并行解析；按表顺序归并，输出与串行逐字节一致
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
 from pathlib import Path
-import re
+import argparse
 import csv
-from collections import Counter
+from collections import Counter, deque
+from itertools import islice
+
+from columnar import ColumnarWriter, columnar_path
+from keyword_matcher import KeywordMatcher
+from split_tables import iter_tables, table_file_lines, table_number, write_table
 
 def filter_odd_elements(lines):
     # remove all sublist with not 2 elements, keep a count of the number of odd elements
@@ -44,79 +62,166 @@ def split_when_both_seen(data):
         result.append(current)
     return result
 
+# 一次扫描判断是否含任一关键字
+CLEAN_MARKERS = KeywordMatcher([
+    "Alias",
+    "Name",
+    "P11 P10",
+    "Available in Databank",
+    "===== PAGE",
+    "Databank",
+    "Pure Component",
+    "Physical Property Data 11.1",
+    "Fluid",
+])
+
 def clean_content(lines):
     """
     Remove lines containing any of the following substrings:
     'Alias', 'Name', 'P11 P10', 'Available in Databank', '===== PAGE', 'Databank', 'Pure Component'
     """
-    remove_keywords = [
-        "Alias",
-        "Name",
-        "P11 P10",
-        "Available in Databank",
-        "===== PAGE",
-        "Databank",
-        "Pure Component",
-        "Physical Property Data 11.1",
-        "Fluid"
-    ]
-    cleaned_lines = []
-    for line in lines:
-        if any(keyword in line for keyword in remove_keywords):
+    return CLEAN_MARKERS.reject(lines)
+
+def parse_table_lines(lines):
+    """单个表 → (alias/name 配对列表, 不是恰好两个元素的分组数)"""
+    lines = clean_content(lines)
+    pairs = split_when_both_seen(lines)
+    pairs = clean_list(pairs)
+    return filter_odd_elements(pairs)
+
+def parse_table(path):
+    """单个 table_NN.txt → (alias/name 配对列表, 不成对的分组数)；可直接提交给进程池"""
+    with open(path, "r", encoding="utf-8") as f:
+        return parse_table_lines(f.readlines())
+
+# --------- 流水线各阶段（生成器） ---------
+def tables_from_text(input_file, keep_dir=None):
+    """PP.txt → 逐个产出表的行（与读回 table_NN.txt 的 readlines() 一致）"""
+    if keep_dir is not None:
+        keep_dir.mkdir(parents=True, exist_ok=True)
+    with open(input_file, "r", encoding="utf-8") as f:
+        for table_no, (_, cleaned_content) in enumerate(iter_tables(f), 1):
+            if keep_dir is not None:
+                write_table(keep_dir, table_no, cleaned_content)
+            yield table_file_lines(cleaned_content)
+
+def table_paths(tables_dir):
+    """已有的 tables/table_*.txt，按表号排序（与直接从 PP.txt 分表的顺序一致）"""
+    return sorted(tables_dir.glob("table_*.txt"), key=table_number)
+
+def _parse_batch(parse, batch):
+    return [parse(table) for table in batch]
+
+def parse_tables(tables, parse=parse_table_lines, workers=1, chunksize=4):
+    """
+    逐表解析，按输入顺序产出 (配对列表, 不成对的分组数)
+    workers > 1 时用进程池，每个任务解析 chunksize 张表；最多同时挂起 2×workers 个任务，
+    按提交顺序取回结果，归并顺序与串行相同，表的读入随消费推进，内存占用有界
+    """
+    if workers <= 1:
+        yield from map(parse, tables)
+        return
+    tables = iter(tables)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        while True:
+            while len(pending) < 2 * workers:
+                batch = list(islice(tables, chunksize))
+                if not batch:
+                    break
+                pending.append(pool.submit(_parse_batch, parse, batch))
+            if not pending:
+                return
+            yield from pending.popleft().result()
+
+def iter_pairs(parsed_tables, stats):
+    """按表顺序归并 alias/name 配对；不成对的分组数累计到 stats["odd"]"""
+    for filtered_pairs, odd_count in parsed_tables:
+        stats["odd"] += odd_count
+        yield from filtered_pairs
+
+def dedupe_pairs(pairs, stats):
+    """按 (alias, name) 去重，保留第一次出现的顺序；重复数累计到 stats["duplicates"]"""
+    seen = set()
+    for alias, name in pairs:
+        key = (alias, name)
+        if key in seen:
+            stats["duplicates"] += 1
             continue
-        cleaned_lines.append(line)
-    return cleaned_lines
-
-# Directory containing all the table files
-tables_dir = Path("example/data/tables")
-
-# Get all table files (e.g., table_01.txt, table_02.txt, ...)
-table_files = sorted(tables_dir.glob("table_*.txt"))
-
-# Collect all pairs and odd counts
-all_pairs = []
-total_odd_count = 0
-alias_lengths = []
-
-for table_file in table_files:
-    with open(table_file, "r", encoding="utf-8") as f:
-        lines = f.readlines()
-        lines = clean_content(lines)
-        pairs = split_when_both_seen(lines)
-        pairs = clean_list(pairs)
-        filtered_pairs, odd_count = filter_odd_elements(pairs)
-        total_odd_count += odd_count
-        all_pairs.extend(filtered_pairs)
-        # Collect alias lengths
-        alias_lengths.extend([len(sublist[0]) for sublist in filtered_pairs])
-
-# Write all pairs to CSV
-output_csv = Path("example/data/final_table.csv")
-output_csv.parent.mkdir(parents=True, exist_ok=True)
-with open(output_csv, "w", encoding="utf-8", newline="") as csvfile:
-    writer = csv.writer(csvfile)
-    writer.writerow(["alias", "name"])
-    for alias, name in all_pairs:
-        writer.writerow([alias, name])
-
-print(f"Total count of sublists with not exactly two elements: {total_odd_count}")
-print(f"Total count of pairs: {len(all_pairs)}")
-print("Alias length counts (dict):")
-alias_length_counts = dict(Counter(alias_lengths))
-print(alias_length_counts)
-
-# Calculate and print percentage of alias length > 8
-if alias_lengths:
-    count_gt_8 = sum(1 for l in alias_lengths if l > 8)
-    percent_gt_8 = (count_gt_8 / len(alias_lengths)) * 100
-    print(f"Percentage of alias length > 8: {percent_gt_8:.2f}%")
-else:
-    print("No aliases found to calculate percentage.")
-
-# Calculate and print percentage of pairs where both alias and name have length > 8
-if all_pairs:
-    count_both_gt_8 = sum(1 for alias, name in all_pairs if len(alias) > 8 and len(name) > 8)
-    percent_both_gt_8 = (count_both_gt_8 / len(all_pairs)) * 100
-    print(f"Percentage of pairs where both alias and name have length > 8: {percent_both_gt_8:.2f}%")
-else:
-    print("No pairs found to calculate percentage where both alias and name have length > 8.")
\ No newline at end of file
+        seen.add(key)
+        yield alias, name
+
+def write_pairs_csv(pairs, output_csv, stats, columnar=None):
+    """写出 CSV，同时统计别名长度；传入 columnar（ColumnarWriter）时同步写入列式文件"""
+    output_csv.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_csv, "w", encoding="utf-8", newline="") as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(["alias", "name"])
+        for alias, name in pairs:
+            writer.writerow([alias, name])
+            if columnar is not None:
+                columnar.append((alias, name))
+            stats["pairs"] += 1
+            stats["alias_lengths"][len(alias)] += 1
+            stats["both_gt_8"] += len(alias) > 8 and len(name) > 8
+
+def print_stats(stats):
+    print(f"Total count of sublists with not exactly two elements: {stats['odd']}")
+    print(f"Total count of duplicate pairs removed: {stats['duplicates']}")
+    print(f"Total count of pairs: {stats['pairs']}")
+    print("Alias length counts (dict):")
+    print(dict(stats["alias_lengths"]))
+
+    # Calculate and print percentage of alias length > 8
+    if stats["pairs"]:
+        count_gt_8 = sum(count for length, count in stats["alias_lengths"].items() if length > 8)
+        print(f"Percentage of alias length > 8: {count_gt_8 / stats['pairs'] * 100:.2f}%")
+        # Calculate and print percentage of pairs where both alias and name have length > 8
+        print(f"Percentage of pairs where both alias and name have length > 8: "
+              f"{stats['both_gt_8'] / stats['pairs'] * 100:.2f}%")
+    else:
+        print("No aliases found to calculate percentage.")
+        print("No pairs found to calculate percentage where both alias and name have length > 8.")
+
+def run_pipeline(input_file, output_csv, keep_dir=None, from_tables=None, columnar=False, workers=1):
+    """
+    PP.txt（或已有表目录）→ final_table.csv（columnar=True 时另写同名 .col），返回统计信息
+    去重与别名长度统计依赖全局的首次出现顺序，在主进程中对按序归并后的配对流进行
+    """
+    stats = {"odd": 0, "duplicates": 0, "pairs": 0, "both_gt_8": 0, "alias_lengths": Counter()}
+    if from_tables:
+        # 子进程自己读表文件，只回传解析结果
+        parsed = parse_tables(table_paths(from_tables), parse_table, workers)
+    else:
+        parsed = parse_tables(tables_from_text(input_file, keep_dir), parse_table_lines, workers)
+    # 出错时 ColumnarWriter 的 __exit__ 只删除临时文件，不写 .col
+    with ColumnarWriter(columnar_path(output_csv), ["alias", "name"]) if columnar else nullcontext() as col_writer:
+        write_pairs_csv(dedupe_pairs(iter_pairs(parsed, stats), stats), output_csv, stats, col_writer)
+    return stats
+
+def main():
+    ap = argparse.ArgumentParser(description="PP.txt → 分表 → 配对 → 去重 → final_table.csv（流式，不落中间文件）")
+    ap.add_argument("input", nargs="?", default="example/data/PP.txt", help="PyMuPDF 提取的文本（--- 分隔格式）")
+    ap.add_argument("-o", "--output", default="example/data/final_table.csv", help="输出 CSV 路径")
+    ap.add_argument("--keep-intermediates", action="store_true", help="同时写出 tables/table_NN.txt")
+    ap.add_argument("--tables-dir", default="example/data/tables", help="中间表目录")
+    ap.add_argument("--from-tables", action="store_true", help="从 --tables-dir 中已有的表文件读取，而不是 PP.txt")
+    ap.add_argument("--columnar", action="store_true", help="同时写出列式文件（与 CSV 同名 .col，可 mmap 加载）")
+    ap.add_argument("--workers", type=int, default=1, help="并行解析的进程数（默认 1，即串行）")
+    args = ap.parse_args()
+
+    input_file = Path(args.input)
+    tables_dir = Path(args.tables_dir)
+    if not args.from_tables and not input_file.exists():
+        print(f"❌ 输入文件不存在: {input_file}")
+        return
+
+    stats = run_pipeline(input_file, Path(args.output),
+                         keep_dir=tables_dir if args.keep_intermediates else None,
+                         from_tables=tables_dir if args.from_tables else None,
+                         columnar=args.columnar,
+                         workers=args.workers)
+    print_stats(stats)
+
+if __name__ == "__main__":
+    main()
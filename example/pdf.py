@@ -5,6 +5,9 @@ APRSYS 'Physical Property Data' PDF 解析工具（按步骤执行）
   1) find-pages  : 识别包含"对照表/目录"的页面
   2) extract     : 从相关页面抽取文字（尽量保留列距）
   3) parse       : 从文字解析 "别名/代码 ↔ 注册名"（聚焦 PURE11）
+  all            : 单遍流式执行 1~3（每页只抽取/归一化一次；--two-pass 使用旧的分步流程）
+  bench          : 对比各提取后端（PyPDF2 / pdfminer / PyMuPDF）的 页/秒、峰值内存、解析行数
+  bench-parse    : 在合成的数百万行文本上测第 3 步解析器的 行/秒
 
 依赖：
   pip install pdfminer.six
@@ -21,85 +24,468 @@ import csv
 import json
 import unicodedata
 from pathlib import Path
-from typing import List, Tuple, Iterable, Optional
+from typing import List, Tuple, Iterable, Iterator, Optional
 
-# --------- 文本提取：多种方法备选 ---------
-def extract_text_pages(pdf_path: Path) -> Iterable[Tuple[int, str]]:
+from compound_record import CompoundRecord
+from databanks import MASK_FIELD, UNKNOWN_MASK
+from keyword_matcher import KeywordMatcher
+from page_cache import file_sha256, open_cache
+
+# --------- 文本提取：可插拔后端 ---------
+class PdfBackend:
     """
-    逐页返回 (page_number, text)，尝试多种方法以应对有问题的 PDF 文件
+    PDF 文本提取后端：构造时打开文档并建立可在各页间复用的状态，
+    page_refs() 逐页给出轻量引用，extract(ref) 才真正做文本提取（便于按页缓存/容错）。
     """
-    # 方法1：尝试 PyPDF2（更容错）
-    try:
+    name = ""
+    options = None  # 写入缓存键的提取参数
+    whole_document = False  # page_refs 先提取整篇再逐页给出（受监督时按进度限时，不用于单页重试）
+
+    def __init__(self, pdf_path: Path):
+        self.pdf_path = pdf_path
+        self.progress = None  # 整篇后端每处理完一页调用 progress(已处理页数)，供监督进程续期限时
+
+    @property
+    def cache_name(self) -> str:
+        return self.name
+
+    def page_refs(self, wanted: Optional[List[int]] = None) -> Iterator[Tuple[int, object]]:
+        raise NotImplementedError
+
+    def extract(self, ref) -> str:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+class PyPDF2Backend(PdfBackend):
+    """PyPDF2：容错较好；reader 打开一次，按下标随机访问页面"""
+    name = "pypdf2"
+
+    def __init__(self, pdf_path: Path):
         import PyPDF2
-        with open(pdf_path, 'rb') as fp:
-            reader = PyPDF2.PdfReader(fp)
-            for i, page in enumerate(reader.pages, start=1):
-                try:
-                    text = page.extract_text()
-                    yield i, text
-                except Exception as page_err:
-                    print(f"[WARN] PyPDF2 页面 {i} 提取失败: {page_err}")
-                    yield i, ""
-        return
-    except ImportError:
-        print("[INFO] PyPDF2 未安装，尝试 pdfminer.six...")
-    except Exception as e:
-        print(f"[WARN] PyPDF2 提取失败: {e}，尝试 pdfminer.six...")
-    
-    # 方法2：尝试 pdfminer.six
-    try:
-        from pdfminer.pdfpage import PDFPage
-        from pdfminer.pdfinterp import PDFResourceManager, PDFPageInterpreter
+        super().__init__(pdf_path)
+        self.version = PyPDF2.__version__
+        self.fp = open(pdf_path, 'rb')
+        self.reader = PyPDF2.PdfReader(self.fp)
+
+    @property
+    def cache_name(self) -> str:
+        return f"pypdf2 {self.version}"
+
+    def page_refs(self, wanted=None):
+        if wanted is None:
+            yield from enumerate(self.reader.pages, start=1)
+            return
+        # 按下标直接取页，不遍历其余页面
+        n_pages = len(self.reader.pages)
+        for i in wanted:
+            if 1 <= i <= n_pages:
+                yield i, self.reader.pages[i - 1]
+
+    def extract(self, ref) -> str:
+        return ref.extract_text()
+
+    def close(self):
+        self.fp.close()
+
+def _open_pdfminer_document(fp):
+    """打开 PDFDocument 并绕过页面标签：标签损坏时 pdfminer 会在遍历页面中途断言失败"""
+    from pdfminer.pdfdocument import PDFDocument, PDFNoPageLabels
+    from pdfminer.pdfparser import PDFParser
+    doc = PDFDocument(PDFParser(fp))
+
+    def no_page_labels():
+        raise PDFNoPageLabels()
+    doc.get_page_labels = no_page_labels
+    return doc
+
+class PdfminerBackend(PdfBackend):
+    """pdfminer.six：整份文档共用一个 TextConverter / PDFPageInterpreter，逐页清空输出缓冲"""
+    name = "pdfminer"
+    options = {"laparams": "default"}
+
+    def __init__(self, pdf_path: Path):
+        import io
+        import pdfminer
         from pdfminer.converter import TextConverter
         from pdfminer.layout import LAParams
-        from pdfminer.high_level import extract_text
-        from pdfminer.pdfparser import PDFParser
-        from pdfminer.pdfdocument import PDFDocument
+        from pdfminer.pdfinterp import PDFResourceManager, PDFPageInterpreter
+        super().__init__(pdf_path)
+        self.version = pdfminer.__version__
+        self.fp = open(pdf_path, 'rb')
+        self.doc = _open_pdfminer_document(self.fp)
+
+        rsrcmgr = PDFResourceManager()
+        self.outfp = io.StringIO()
+        self.device = TextConverter(rsrcmgr, self.outfp, laparams=LAParams())
+        self.interpreter = PDFPageInterpreter(rsrcmgr, self.device)
+
+    @property
+    def cache_name(self) -> str:
+        return f"pdfminer {self.version}"
+
+    def page_refs(self, wanted=None):
+        from pdfminer.pdfpage import PDFPage
+        wanted_set = set(wanted) if wanted is not None else None
+        last_wanted = max(wanted) if wanted else 0
+        for i, page in enumerate(PDFPage.create_pages(self.doc), start=1):
+            if wanted_set is not None:
+                if i > last_wanted:
+                    break  # 最后一个目标页已处理完
+                if i not in wanted_set:
+                    continue  # 只解析页面对象，不做版面分析
+            yield i, page
+
+    def extract(self, ref) -> str:
+        self.outfp.seek(0)
+        self.outfp.truncate(0)
+        self.interpreter.process_page(ref)
+        return self.outfp.getvalue()
+
+    def close(self):
+        self.device.close()
+        self.fp.close()
+
+class PdfminerFullBackend(PdfBackend):
+    """
+    最简单的 pdfminer 整篇提取（按分页符切页，可能失去分页信息），作为最后的兜底
+    与 pdfminer.high_level.extract_text 的输出相同，但绕过页面标签，并在逐页处理时报告进度
+    """
+    name = "pdfminer-full"
+    whole_document = True
+
+    def page_refs(self, wanted=None):
         import io
-        
-        # 方法2a：直接处理文档而不依赖页面标签
+        from pdfminer.converter import TextConverter
+        from pdfminer.layout import LAParams
+        from pdfminer.pdfinterp import PDFResourceManager, PDFPageInterpreter
+        from pdfminer.pdfpage import PDFPage
+        rsrcmgr = PDFResourceManager()
+        outfp = io.StringIO()
+        with open(self.pdf_path, 'rb') as fp, TextConverter(rsrcmgr, outfp, laparams=LAParams()) as device:
+            interpreter = PDFPageInterpreter(rsrcmgr, device)
+            for n, page in enumerate(PDFPage.create_pages(_open_pdfminer_document(fp)), start=1):
+                interpreter.process_page(page)
+                if self.progress is not None:
+                    self.progress(n)
+        full = outfp.getvalue()
+        pages = full.split("\x0c") if "\x0c" in full else [full]  # 没有分页符，整个文档作为一页
+        wanted_set = set(wanted) if wanted is not None else None
+        for i, page in enumerate(pages, start=1):
+            if wanted_set is None or i in wanted_set:
+                yield i, page
+
+    def extract(self, ref) -> str:
+        return ref
+
+class PyMuPDFBackend(PdfBackend):
+    """PyMuPDF：文档打开一次，按下标随机访问页面"""
+    name = "pymupdf"
+
+    def __init__(self, pdf_path: Path):
+        import fitz  # PyMuPDF
+        super().__init__(pdf_path)
+        self.version = fitz.VersionBind
+        self.doc = fitz.open(str(pdf_path))
+
+    @property
+    def cache_name(self) -> str:
+        return f"pymupdf {self.version}"
+
+    def page_refs(self, wanted=None):
+        n_pages = len(self.doc)
+        for i in (range(1, n_pages + 1) if wanted is None else wanted):
+            if 1 <= i <= n_pages:
+                yield i, i - 1
+
+    def extract(self, ref) -> str:
+        return self.doc.load_page(ref).get_text()
+
+    def close(self):
+        self.doc.close()
+
+BACKENDS = {cls.name: cls for cls in (PyPDF2Backend, PdfminerBackend, PdfminerFullBackend, PyMuPDFBackend)}
+# 默认回退链：PyPDF2（更容错）→ pdfminer 逐页 → pdfminer 整篇
+DEFAULT_BACKENDS = ("pypdf2", "pdfminer", "pdfminer-full")
+
+def extract_text_pages(pdf_path: Path, cache=None, pages: Optional[Iterable[int]] = None,
+                       backends: Optional[Iterable[str]] = None, page_timeout: Optional[float] = None,
+                       failures: Optional[list] = None) -> Iterable[Tuple[int, str]]:
+    """
+    逐页返回 (page_number, text)，按 backends 顺序尝试多种方法以应对有问题的 PDF 文件
+    cache: page_cache.PageCache，命中的页面不再重新提取；None 表示不用缓存
+    pages: 只抽取这些页码（直接定位，处理完最后一页即停止）；None 表示全部页面
+    某个后端中途失败时，由下一个后端接着抽取尚未产出的页面
+    page_timeout: 每页限时（秒），设置后在受监督的子进程中提取，见 supervised_text_pages
+    """
+    if page_timeout:
+        yield from supervised_text_pages(pdf_path, cache, pages, backends, page_timeout, failures)
+        return
+
+    pdf_hash = file_sha256(pdf_path) if cache is not None else None
+    wanted = sorted(set(pages)) if pages is not None else None
+    done = set()
+    last_err = None
+
+    for name in (backends or DEFAULT_BACKENDS):
         try:
-            with open(pdf_path, 'rb') as fp:
-                parser = PDFParser(fp)
-                doc = PDFDocument(parser)
-                rsrcmgr = PDFResourceManager()
-                laparams = LAParams()
-                
-                page_count = 0
-                for page in PDFPage.create_pages(doc):
-                    page_count += 1
-                    outfp = io.StringIO()
-                    device = TextConverter(rsrcmgr, outfp, laparams=laparams)
-                    interpreter = PDFPageInterpreter(rsrcmgr, device)
+            backend = BACKENDS[name](pdf_path)
+        except ImportError:
+            print(f"[INFO] {name} 未安装，尝试下一种方法...")
+            continue
+        except Exception as e:
+            print(f"[WARN] {name} 打开失败: {e}，尝试下一种方法...")
+            last_err = e
+            continue
+
+        try:
+            for i, ref in backend.page_refs(wanted):
+                if i in done:
+                    continue
+                text = cache.get(pdf_hash, i, backend.cache_name, backend.options) if cache is not None else None
+                if text is None:
                     try:
-                        interpreter.process_page(page)
-                        text = outfp.getvalue()
-                        yield page_count, text
+                        text = backend.extract(ref)
+                        if cache is not None:
+                            cache.put(pdf_hash, i, backend.cache_name, backend.options, text)
                     except Exception as page_err:
-                        print(f"[WARN] pdfminer 页面 {page_count} 处理失败: {page_err}")
-                        yield page_count, ""
-                    finally:
-                        outfp.close()
-                        device.close()
-        except Exception as e1:
-            print(f"[WARN] pdfminer 直接处理失败: {e1}，尝试简单文本提取...")
-            
-            # 方法2b：最简单的文本提取（可能失去分页信息）
+                        print(f"[WARN] {name} 页面 {i} 提取失败: {page_err}")
+                        text = ""
+                done.add(i)
+                yield i, text
+            return
+        except Exception as e:
+            print(f"[WARN] {name} 提取失败: {e}，尝试下一种方法...")
+            last_err = e
+        finally:
+            backend.close()
+
+    if last_err is not None:
+        print(f"[ERR] 所有方法都失败: {last_err}")
+        raise last_err
+    print("[ERR] 需要安装 PyPDF2 或 pdfminer.six： pip install pdfminer.six")
+    raise ImportError("no PDF text backend available")
+
+# --------- 受监督的逐页提取：每页限时，卡死/崩溃的页面换下一个后端重试一次 ---------
+OPEN_TIMEOUT = 60.0  # 打开文档（含导入后端库）的最短限时，秒
+
+def _page_worker(conn, pdf_path: str, name: str, wanted: Optional[List[int]], after: int):
+    """
+    子进程：持有一个后端实例逐页提取。
+    打开后发 ("ready", 缓存名, 参数, 是否整篇后端)；整篇后端提取期间每处理完一页发 ("progress", 已处理页数)；
+    每页先发 ("begin", 页码)，由父进程回复 "go"（需要提取）或 "skip"（缓存命中）
+    """
+    try:
+        backend = BACKENDS[name](Path(pdf_path))
+    except ImportError as e:
+        conn.send(("unavailable", str(e)))
+        return
+    except Exception as e:
+        conn.send(("error", f"打开失败: {e}"))
+        return
+    try:
+        backend.progress = lambda n: conn.send(("progress", n))
+        conn.send(("ready", backend.cache_name, backend.options, backend.whole_document))
+        for i, ref in backend.page_refs(wanted):
+            if i <= after:
+                continue
+            conn.send(("begin", i))
+            if conn.recv() != "go":
+                continue
             try:
-                full = extract_text(str(pdf_path))
-                if "\x0c" in full:  # 有分页符
-                    pages = full.split("\x0c")
-                    for i, page in enumerate(pages, start=1):
-                        yield i, page
-                else:  # 没有分页符，整个文档作为一页
-                    yield 1, full
-            except Exception as e2:
-                print(f"[ERR] 所有方法都失败: {e2}")
-                raise
-                
-    except ImportError:
-        print("[ERR] 需要安装 pdfminer.six： pip install pdfminer.six")
-        raise
+                conn.send(("page", i, backend.extract(ref)))
+            except Exception as e:
+                conn.send(("page_error", i, str(e)))
+        conn.send(("end",))
+    except Exception as e:
+        conn.send(("error", str(e)))
+    finally:
+        backend.close()
+
+class PageWorker:
+    """父进程一侧的子进程句柄：按页限时等待结果，超时/崩溃时直接结束子进程"""
+
+    def __init__(self, pdf_path: Path, name: str, wanted: Optional[List[int]] = None, after: int = 0):
+        import multiprocessing
+        self.name = name
+        self.conn, child_conn = multiprocessing.Pipe()
+        self.proc = multiprocessing.Process(target=_page_worker, daemon=True,
+                                            args=(child_conn, str(pdf_path), name, wanted, after))
+        self.proc.start()
+        child_conn.close()  # 子进程退出后 recv 会抛 EOFError
+
+    def recv(self, timeout: Optional[float] = None):
+        """收一条消息；超时返回 None；子进程已退出时抛 EOFError"""
+        if timeout is not None and not self.conn.poll(timeout):
+            return None
+        return self.conn.recv()
+
+    def send(self, msg):
+        self.conn.send(msg)
+
+    def close(self, kill: bool = False):
+        if kill and self.proc.is_alive():
+            self.proc.kill()
+        self.proc.join(timeout=5)
+        if self.proc.is_alive():
+            self.proc.kill()
+            self.proc.join()
+        self.conn.close()
+
+def _supervise(worker: PageWorker, cache, pdf_hash, page_timeout: float):
+    """
+    驱动一个 PageWorker，依次产出 ("page", 页码, 文本) 或 ("failed", 页码, 原因)；
+    页面失败后子进程即被结束，返回值为结束状态 ("end" | "failed" | "timeout" | "error" | "unavailable", 说明)
+    每条消息都限时：打开文档 max(page_timeout, OPEN_TIMEOUT)；逐页后端走到下一页 page_timeout；
+    整篇后端提取期间每收到一条 progress 消息续期 page_timeout。打开 / 遍历 / 整篇提取超时返回 "timeout"
+    """
+    cache_name = options = None
+    budget, stage = max(page_timeout, OPEN_TIMEOUT), "打开文档"
+    while True:
+        try:
+            msg = worker.recv(budget)
+        except EOFError:
+            return "error", "子进程意外退出"
+        if msg is None:
+            return "timeout", f"{stage}超时（>{budget:g}s）"
+        kind = msg[0]
+        if kind == "ready":
+            _, cache_name, options, whole_document = msg
+            budget, stage = page_timeout, "整篇提取" if whole_document else "遍历页面"
+        elif kind == "progress":
+            continue  # 整篇提取又处理完一页，按同一限时继续等待
+        elif kind == "begin":
+            budget, stage = page_timeout, "遍历页面"
+            i = msg[1]
+            text = cache.get(pdf_hash, i, cache_name, options) if cache is not None else None
+            if text is not None:
+                worker.send("skip")
+                yield "page", i, text
+                continue
+            worker.send("go")
+            try:
+                reply = worker.recv(page_timeout)
+            except EOFError:
+                reply = ("crash",)
+            if reply is None or reply[0] != "page":
+                if reply is None:
+                    reason = f"超时（>{page_timeout:g}s）"
+                elif reply[0] == "crash":
+                    reason = "子进程崩溃"
+                else:  # page_error
+                    reason = reply[2]
+                yield "failed", i, reason
+                return "failed", reason
+            text = reply[2]
+            if cache is not None:
+                cache.put(pdf_hash, i, cache_name, options, text)
+            yield "page", i, text
+        elif kind == "end":
+            return "end", None
+        else:  # error / unavailable
+            return kind, msg[1]
+
+def supervised_text_pages(pdf_path: Path, cache=None, pages: Optional[Iterable[int]] = None,
+                          backends: Optional[Iterable[str]] = None, page_timeout: float = 30.0,
+                          failures: Optional[list] = None) -> Iterator[Tuple[int, str]]:
+    """
+    与 extract_text_pages 相同的回退链，但每个后端在独立子进程中运行，父进程按页限时：
+      - 某页超时或使子进程崩溃：记为失败，用下一个后端（新的子进程）只重试这一页一次，
+        仍失败则该页文本为空；随后重启当前后端，从下一页继续流式输出
+      - 后端整体出错（打开失败、遍历页面失败）：与原来一样由下一个后端接着处理剩余页面
+      - 打开文档 / 遍历页面 / 整篇提取超时：结束子进程，记一条 page 为 None 的失败，由下一个后端接着处理
+      - 单页重试只用逐页后端（整篇后端重试一页也要提取整篇）
+    failures: 传入列表时，逐条追加失败记录 {"page", "backend", "reason", "retry", "recovered"}
+    """
+    pdf_hash = file_sha256(pdf_path) if cache is not None else None
+    wanted = sorted(set(pages)) if pages is not None else None
+    names = list(backends or DEFAULT_BACKENDS)
+    failures = failures if failures is not None else []
+    after = 0  # 已产出的最后一页（页面按页序产出）
+    last_err = None
+    any_available = False
+    k = 0
+    while k < len(names):
+        name = names[k]
+        remaining = [i for i in wanted if i > after] if wanted is not None else None
+        if remaining == []:
+            break
+        worker = PageWorker(pdf_path, name, remaining, after)
+        events = _supervise(worker, cache, pdf_hash, page_timeout)
+        status = None
+        try:
+            while True:
+                kind, i, payload = next(events)
+                if kind == "page":
+                    any_available = True
+                    after = i
+                    yield i, payload
+                    continue
+                # 页面失败：结束当前子进程，换下一个后端重试这一页
+                any_available = True
+                worker.close(kill=True)
+                retry = next((n for n in names[k + 1:] if not BACKENDS[n].whole_document), None)
+                print(f"[WARN] {name} 页面 {i} 失败: {payload}" + (f"，用 {retry} 重试..." if retry else ""))
+                text = _retry_page(pdf_path, retry, i, cache, pdf_hash, page_timeout) if retry else None
+                failures.append({"page": i, "backend": name, "reason": payload,
+                                 "retry": retry, "recovered": text is not None})
+                after = i
+                yield i, text or ""
+        except StopIteration as stop:
+            status = stop.value
+        finally:
+            worker.close(kill=status is None or status[0] in ("failed", "timeout"))
+
+        kind, detail = status
+        if kind == "end":
+            break
+        if kind == "failed":
+            continue  # 重启当前后端，从失败页之后继续
+        if kind == "unavailable":
+            print(f"[INFO] {name} 未安装，尝试下一种方法...")
+        elif kind == "timeout":
+            any_available = True
+            print(f"[WARN] {name} {detail}，已结束子进程，尝试下一种方法...")
+            failures.append({"page": None, "backend": name, "reason": detail,
+                             "retry": names[k + 1] if k + 1 < len(names) else None, "recovered": False})
+            last_err = TimeoutError(f"{name}: {detail}")
+        else:
+            any_available = True
+            print(f"[WARN] {name} 提取失败: {detail}，尝试下一种方法...")
+            last_err = RuntimeError(f"{name}: {detail}")
+        k += 1
+    else:
+        if last_err is not None:
+            print(f"[ERR] 所有方法都失败: {last_err}")
+            raise last_err
+        if not any_available:
+            print("[ERR] 需要安装 PyPDF2 或 pdfminer.six： pip install pdfminer.six")
+            raise ImportError("no PDF text backend available")
+
+    page_failures = [f for f in failures if f["page"] is not None]
+    if page_failures:
+        pages_failed = [f["page"] for f in page_failures if not f["recovered"]]
+        recovered = len(page_failures) - len(pages_failed)
+        if pages_failed:
+            print(f"[WARN] 失败页面 {len(page_failures)} 个，重试恢复 {recovered} 个，仍为空: {pages_failed}")
+        else:
+            print(f"[INFO] 失败页面 {len(page_failures)} 个，均已由重试恢复")
+
+def _retry_page(pdf_path: Path, name: str, pgno: int, cache, pdf_hash, page_timeout: float) -> Optional[str]:
+    """用指定后端在新子进程中只提取一页；成功返回文本，否则返回 None"""
+    worker = PageWorker(pdf_path, name, [pgno])
+    try:
+        for kind, i, payload in _supervise(worker, cache, pdf_hash, page_timeout):
+            if kind == "page" and i == pgno:
+                return payload
+            if kind == "failed":
+                print(f"[WARN] {name} 重试页面 {pgno} 仍失败: {payload}")
+                return None
+        print(f"[WARN] {name} 重试页面 {pgno} 未完成（打开或遍历失败/超时）")
+        return None
+    finally:
+        worker.close(kill=True)
 
 # --------- 工具函数 ---------
 def norm(s: str) -> str:
@@ -124,167 +510,202 @@ def load_pages(path: Path) -> List[int]:
     return pages
 
 # --------- Step 1: 识别包含"对照表"的页面 ---------
-def find_relevant_pages(pdf: Path) -> List[int]:
+ALIAS_SHAPE = re.compile(r"\b[A-Z0-9][A-Z0-9\-\(\)\/\.\+]{1,15}\b")
+
+def is_relevant_page(txt: str) -> bool:
     """
-    识别页面的启发式规则：
+    识别页面的启发式规则（txt 需已经过 norm）：
       - 出现 'Available in Databank'（目录总标题）
       - 或 同页包含表头关键词：'Alias' 和 'Name'，并且出现 'P11'（PURE11 列）
       - 或 行内大量"别名形状"的 token（如 C2H6O-2 / 大写字母数字+连字符组成的短 token）
     """
+    up = txt.upper()
+    score = 0
+    if "AVAILABLE IN DATABANK" in up:
+        score += 2
+    if ("ALIAS" in up and "NAME" in up and "P11" in up):
+        score += 2
+    # 别名样式的 token 数量
+    tokens = ALIAS_SHAPE.findall(up)
+    if len(tokens) >= 40:  # 阈值可调：一页上如果出现很多短大写 token，可能是目录页
+        score += 1
+    return score >= 2
+
+def print_relevant_pages(relevant: List[int]):
+    print(f"[INFO] find-pages: 命中 {len(relevant)} 页：{relevant[:12]}{' ...' if len(relevant)>12 else ''}")
+
+def find_relevant_pages(pdf: Path, cache=None, backends=None, page_timeout=None) -> List[int]:
+    """逐页判断是否为对照表页面，规则见 is_relevant_page"""
     relevant = []
-    alias_shape = re.compile(r"\b[A-Z0-9][A-Z0-9\-\(\)\/\.\+]{1,15}\b")
-    for pgno, raw in extract_text_pages(pdf):
-        txt = norm(raw)
-        up = txt.upper()
-        score = 0
-        if "AVAILABLE IN DATABANK" in up:
-            score += 2
-        if ("ALIAS" in up and "NAME" in up and "P11" in up):
-            score += 2
-        # 别名样式的 token 数量
-        tokens = alias_shape.findall(up)
-        if len(tokens) >= 40:  # 阈值可调：一页上如果出现很多短大写 token，可能是目录页
-            score += 1
-        if score >= 2:
+    for pgno, raw in extract_text_pages(pdf, cache, backends=backends, page_timeout=page_timeout):
+        if is_relevant_page(norm(raw)):
             relevant.append(pgno)
-    print(f"[INFO] find-pages: 命中 {len(relevant)} 页：{relevant[:12]}{' ...' if len(relevant)>12 else ''}")
+    print_relevant_pages(relevant)
     return relevant
 
 # --------- Step 2: 抽取相关页面文本 ---------
-def extract_pages_text(pdf: Path, pages: List[int]) -> List[str]:
+def page_block(pgno: int, txt: str) -> List[str]:
+    """单页输出块：页码标记 + 正文各行 + 分隔空行（txt 需已经过 norm）"""
+    return [f"===== [PAGE {pgno}] =====", *txt.splitlines(), ""]
+
+def extract_pages_text(pdf: Path, pages: List[int], cache=None, backends=None, page_timeout=None) -> List[str]:
     """
     将相关页的文本逐页抽出并返回（也可保存为 .txt）。
     """
-    page_set = set(pages)
     out_lines = []
-    for pgno, raw in extract_text_pages(pdf):
-        if pgno in page_set:
-            txt = norm(raw)
-            out_lines.append(f"===== [PAGE {pgno}] =====")
-            out_lines.extend(txt.splitlines())
-            out_lines.append("")  # 分隔空行
+    # 直接定位到目标页，不再解析整份文档
+    for pgno, raw in extract_text_pages(pdf, cache, pages, backends, page_timeout):
+        out_lines.extend(page_block(pgno, norm(raw)))
     print(f"[INFO] extract: 输出行数≈{len(out_lines)}")
     return out_lines
 
+def stream_relevant_lines(pdf: Path, sink=None, cache=None, backends=None, page_timeout=None) -> Iterator[str]:
+    """
+    单遍流式版本的 Step 1 + Step 2：每页只抽取、norm 一次，
+    命中的页面直接逐行产出（可同时写入 sink 文件，格式与 save_lines 一致）。
+    内存中只保留当前页。
+    """
+    return relevant_lines(extract_text_pages(pdf, cache, backends=backends, page_timeout=page_timeout), sink)
+
+def relevant_lines(page_texts: Iterable[Tuple[int, str]], sink=None) -> Iterator[str]:
+    """对任意 (页码, 原始文本) 流做识别 + 归一化，逐行产出命中页面的输出块"""
+    relevant = []
+    n_lines = 0
+    for pgno, raw in page_texts:
+        txt = norm(raw)
+        if not is_relevant_page(txt):
+            continue
+        relevant.append(pgno)
+        for ln in page_block(pgno, txt):
+            if sink is not None:
+                sink.write(ln if n_lines == 0 else "\n" + ln)
+            n_lines += 1
+            yield ln
+    print_relevant_pages(relevant)
+    print(f"[INFO] extract: 输出行数≈{n_lines}")
+
 # --------- Step 3: 从文本解析对照表（聚焦 PURE11） ---------
-def parse_alias_name_from_text(lines: List[str]) -> List[Tuple[str, str, str]]:
+class AliasNameParser:
     """
-    解析逻辑：
-      - 识别"Available in Databank"块，定位紧随其后的"表头行"
-      - 表头中找到 'P11' 的列索引
-      - 之后的非空行解析化合物条目：alias name 数据库标记...
-      - 如果包含 P11 标记（通常是 X），则认为该 alias/name 属于 PURE11
+    预编译的逐行状态机（OUTSIDE ↔ INSIDE 表格）：
+      - 表头行（alias … name … p11）      → 进入表格
+      - 表格内：空行 / 结束标记            → 离开表格
+      - 表格内：目录标题、表头重复行      → 跳过
+      - 表格内其余行                      → 解析 alias / name，X 标记表示 PURE11 可用
+    表格外只需判断是否为表头；所有正则与关键字集合都在类定义时编译一次。
+    文本版面里 X 标记的列位置已丢失，数据库位掩码记为未知（精确掩码见 extract_databank_tables.py）。
     """
-    out = []
-    inside_table = False
-    
-    # 表头检测 - 更宽松的匹配
-    hdr_detect = re.compile(r"alias.*name.*p11", re.IGNORECASE)
-    
+
+    HEADER = re.compile(r"alias.*name.*p11", re.IGNORECASE)
     # 结束块的启发关键字
-    end_block_markers = (
+    END_MARKERS = KeywordMatcher([
         "===== [PAGE",
-        "PURE COMPONENT DATABANK PARAMETERS", 
+        "PURE COMPONENT DATABANK PARAMETERS",
         "PURE COMPONENT DATABANKS:",
         "DATABANKS:",
-        "•"
-    )
-    
-    # 用于清理空格的正则
-    space_clean = re.compile(r'\s+')
-
-    for i, raw in enumerate(lines):
-        L = norm(raw).strip()
-        U = L.upper()
-
-        # 查找表头行
-        if hdr_detect.search(U):
-            inside_table = True
-            continue
+        "•",
+    ])
+    SKIP_MARKERS = KeywordMatcher(["AVAILABLE IN DATABANK", "ALIAS NAME P11"])
+    X_MARKS = re.compile(r"\bX+\b")
+    # 看起来像别名/化学式的 token（全大写字母数字及符号）
+    ALIAS_TOKEN = re.compile(r"^[A-Z0-9\(\)\-\+\.]+$")
+    NAME_WORDS = re.compile("ACID|OXIDE|CHLORIDE|AMINE|ALCOHOL")
+    BAD_ALIASES = frozenset({"DATABANK", "COMPONENT", "AVAILABLE"})
 
-        # 结束块？
-        if inside_table and (not L or any(m in U for m in end_block_markers)):
-            inside_table = False
-            continue
+    def __init__(self, normalized: bool = False):
+        self.normalized = normalized
+        self.inside = False
+        self.seen = set()
 
-        # 解析数据行
-        if inside_table and L and not any(m in U for m in ("AVAILABLE IN DATABANK", "ALIAS NAME P11")):
-            try:
-                # 寻找化合物条目模式：别名 名称 数据库标记
-                # 处理可能的格式：ALIAS NAME XXXXX 或 ALIAS-WITH-DASHES COMPOUND-NAME XXXXX
-                
-                # 首先尝试找到连续的X标记（表示数据库可用性）
-                x_pattern = re.search(r'\bX+\b', L)
-                if x_pattern:
-                    # 获取X标记之前的部分
-                    pre_x = L[:x_pattern.start()].strip()
-                    x_marks = x_pattern.group()
-                    
-                    # 清理多余空格并分割
-                    pre_x_clean = space_clean.sub(' ', pre_x)
-                    parts = pre_x_clean.split()
-                    
-                    if len(parts) >= 2:
-                        # 尝试识别别名和名称
-                        # 通常别名较短，名称较长
-                        alias_parts = []
-                        name_parts = []
-                        
-                        # 简单启发式：如果有连字符或看起来像化学符号，可能是别名
-                        found_name_start = False
-                        for part in parts:
-                            if not found_name_start:
-                                # 检查是否看起来像化学名称的开始
-                                if (len(part) > 4 and not re.match(r'^[A-Z0-9\(\)\-\+\.]+$', part)) or \
-                                   any(word in part.upper() for word in ['ACID', 'OXIDE', 'CHLORIDE', 'AMINE', 'ALCOHOL']):
-                                    found_name_start = True
-                                    name_parts.append(part)
-                                else:
-                                    alias_parts.append(part)
-                            else:
-                                name_parts.append(part)
-                        
-                        # 如果没有找到明确的名称开始，按位置分割
-                        if not name_parts and len(parts) >= 2:
-                            alias_parts = parts[:1]
-                            name_parts = parts[1:]
-                        
-                        if alias_parts and name_parts:
-                            alias = ''.join(alias_parts).upper()
-                            name = '-'.join(name_parts).upper()
-                            
-                            # 检查是否在 P11 中可用（第一个X通常表示P11）
-                            if 'X' in x_marks:
-                                # 基本过滤
-                                if (alias and name and 
-                                    len(alias) <= 50 and len(name) <= 100 and
-                                    not alias.isdigit() and
-                                    alias not in {"DATABANK", "COMPONENT", "AVAILABLE"}):
-                                    out.append(("PURE11", alias, name))
-                                    
-            except Exception as e:
-                # 忽略解析错误，继续处理下一行
-                continue
+    def parse_fields(self, L: str) -> Optional[Tuple[str, str, str, int]]:
+        """
+        数据行：别名 名称 数据库标记（X）；取第一个 X 标记之前的部分拆出别名与名称
+        返回普通元组 (alias, name, source_table, mask)，热循环去重后才构造 CompoundRecord
+        """
+        x = self.X_MARKS.search(L)
+        if x is None:
+            return None
+        parts = L[:x.start()].split()
+        if len(parts) < 2:
+            return None
+
+        # 启发式：第一个不像化学式的长 token（或含常见名称词）开始算名称，之前的是别名
+        alias_token, name_words = self.ALIAS_TOKEN.match, self.NAME_WORDS.search
+        for start, part in enumerate(parts):
+            if (len(part) > 4 and not alias_token(part)) or name_words(part.upper()):
+                break
+        else:
+            start = 1  # 没有找到明确的名称开始，按位置分割
+        if start == 0:
+            return None
+
+        alias = "".join(parts[:start]).upper()
+        name = "-".join(parts[start:]).upper()
+        if len(alias) > 50 or len(name) > 100 or alias.isdigit() or alias in self.BAD_ALIASES:
+            return None
+        return alias, name, "", UNKNOWN_MASK
+
+    def iter_rows(self, lines: Iterable[str]) -> Iterator[CompoundRecord]:
+        """逐行驱动状态机，边解析边按 (alias, name) 去重地产出条目（热循环中的方法/正则都绑定为局部变量）"""
+        # 热循环只需判断是否命中，直接用合并后的正则
+        header, end_marker, skip_marker = self.HEADER.search, self.END_MARKERS.pattern.search, self.SKIP_MARKERS.pattern.search
+        parse_fields, seen = self.parse_fields, self.seen
+        normalized, inside = self.normalized, self.inside
+        try:
+            for raw in lines:
+                L = (raw if normalized else norm(raw)).strip()
+                U = L.upper()
+                # 表头必含 P11，先做子串判断免去大部分正则匹配
+                if "P11" in U and header(U):
+                    inside = True
+                    continue
+                if not inside:
+                    continue
+                if not L or end_marker(U):
+                    inside = False
+                    continue
+                if skip_marker(U):
+                    continue
+                fields = parse_fields(L)
+                if fields is not None and fields[:2] not in seen:
+                    seen.add(fields[:2])
+                    yield CompoundRecord("PURE11", *fields)
+        finally:
+            self.inside = inside
 
-    # 去重
-    uniq = []
-    seen = set()
-    for row in out:
-        if row not in seen:
-            seen.add(row)
-            uniq.append(row)
-    
+def parse_alias_name_from_text(lines: Iterable[str], normalized: bool = False) -> List[CompoundRecord]:
+    """
+    lines 可以是任意可迭代对象（如 stream_relevant_lines 的生成器）；
+    normalized=True 表示各行已经过 norm，不再重复归一化。
+
+    解析逻辑见 AliasNameParser：
+      - 识别"Available in Databank"块，定位紧随其后的"表头行"
+      - 之后的非空行解析化合物条目：alias name 数据库标记...
+      - 如果包含 P11 标记（通常是 X），则认为该 alias/name 属于 PURE11
+      - 每条记录末尾附带数据库位掩码（databank_mask），文本中列位置已丢失，记为未知（-1）
+    """
+    uniq = list(AliasNameParser(normalized).iter_rows(lines))
     print(f"[INFO] parse: 解析出 PURE11 条目 {len(uniq)} 条")
     return uniq
 
 # --------- 主程序（分步/一体） ---------
 def cmd_find_pages(args):
-    pages = find_relevant_pages(Path(args.pdf))
+    cache = open_cache(not args.no_cache)
+    try:
+        pages = find_relevant_pages(Path(args.pdf), cache, args.backends, args.page_timeout)
+    finally:
+        if cache is not None:
+            cache.close()
     save_pages(Path(args.output), pages)
 
 def cmd_extract(args):
     pages = load_pages(Path(args.pages))
-    lines = extract_pages_text(Path(args.pdf), pages)
+    cache = open_cache(not args.no_cache)
+    try:
+        lines = extract_pages_text(Path(args.pdf), pages, cache, args.backends, args.page_timeout)
+    finally:
+        if cache is not None:
+            cache.close()
     save_lines(Path(args.output), lines)
 
 def cmd_parse(args):
@@ -293,40 +714,142 @@ def cmd_parse(args):
     lines = text_path.read_text(encoding="utf-8", errors="ignore").splitlines()
     records = parse_alias_name_from_text(lines)
     out_csv = Path(args.output)
+    write_records_csv(out_csv, records)
+    print(f"[OK] 写入 CSV: {out_csv}  ({len(records)} 行)")
+
+def write_records_csv(out_csv: Path, records: List[CompoundRecord]):
     with out_csv.open("w", newline="", encoding="utf-8") as f:
         w = csv.writer(f)
-        w.writerow(["databank","alias_or_code","registered_name"])
-        w.writerows(records)
-    print(f"[OK] 写入 CSV: {out_csv}  ({len(records)} 行)")
+        w.writerow(["databank","alias_or_code","registered_name",MASK_FIELD])
+        w.writerows((r.databank, r.alias, r.name, r.databank_mask) for r in records)
 
 def cmd_all(args):
     pdf = Path(args.pdf)
-    # 1) 找页
-    pages = find_relevant_pages(pdf)
-    # 2) 抽文本
-    lines = extract_pages_text(pdf, pages)
-    # 3) 解析
-    records = parse_alias_name_from_text(lines)
     out_csv = Path(args.output)
-    with out_csv.open("w", newline="", encoding="utf-8") as f:
-        w = csv.writer(f)
-        w.writerow(["databank","alias_or_code","registered_name"])
-        w.writerows(records)
     # 同时把中间文本落盘便于复核
     mid_txt = out_csv.with_suffix(".pages_text.txt")
-    save_lines(mid_txt, lines)
+    cache = open_cache(not args.no_cache)
+    try:
+        if args.two_pass:
+            # 旧流程：1) 找页 2) 抽文本 3) 解析（PDF 会被完整解析两遍）
+            pages = find_relevant_pages(pdf, cache, args.backends, args.page_timeout)
+            lines = extract_pages_text(pdf, pages, cache, args.backends, args.page_timeout)
+            records = parse_alias_name_from_text(lines)
+            save_lines(mid_txt, lines)
+        else:
+            # 单遍流式：抽取 → 识别 → 归一化 → 解析，一页只处理一次
+            with mid_txt.open("w", encoding="utf-8") as sink:
+                lines = stream_relevant_lines(pdf, sink, cache, args.backends, args.page_timeout)
+                records = parse_alias_name_from_text(lines, normalized=True)
+            print(f"[OK] 写入: {mid_txt}")
+    finally:
+        if cache is not None:
+            cache.close()
+    write_records_csv(out_csv, records)
     print(f"[DONE] CSV -> {out_csv}；中间文本 -> {mid_txt}")
 
+def bench_backend(pdf: Path, name: str) -> dict:
+    """单个后端完整跑一遍单遍流程（不用缓存），返回页数、耗时、峰值 RSS、解析行数"""
+    import contextlib
+    import io
+    import time
+    from perf import peak_rss_bytes
+
+    n_pages = 0
+    def counted():
+        nonlocal n_pages
+        for pgno, raw in extract_text_pages(pdf, backends=(name,)):
+            n_pages += 1
+            yield pgno, raw
+
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        records = parse_alias_name_from_text(relevant_lines(counted()), normalized=True)
+    seconds = time.perf_counter() - t0
+    return {"backend": name, "pages": n_pages, "seconds": seconds,
+            "peak_rss": peak_rss_bytes(), "rows": len(records)}
+
+def cmd_bench(args):
+    from perf import format_bytes, run_isolated
+
+    pdf = Path(args.pdf)
+    print(f"[INFO] bench: {pdf}")
+    print(f"{'backend':<14}{'pages':>7}{'sec':>9}{'pages/s':>10}{'peak RSS':>12}{'rows':>7}")
+    for name in args.backends:
+        try:
+            r = run_isolated(bench_backend, pdf, name)
+        except Exception as e:
+            print(f"{name:<14}  失败: {e}")
+            continue
+        rate = r["pages"] / r["seconds"] if r["seconds"] > 0 else float("inf")
+        print(f"{name:<14}{r['pages']:>7}{r['seconds']:>9.2f}{rate:>10.1f}"
+              f"{format_bytes(r['peak_rss']):>12}{r['rows']:>7}")
+
+def synthetic_lines(n_lines: int, seed: int = 0) -> List[str]:
+    """
+    生成与手册 dump 结构相似的合成文本（页标记、目录标题、表头、条目行、结束行），用于解析器基准；
+    各类条目（含别名/名称拆分的各种分支、重复条目）按固定比例随机混合
+    """
+    import random
+    rnd = random.Random(seed)
+    names = ["METHANOL", "ACETIC-ACID", "ETHYLENE-OXIDE", "METHYL-CHLORIDE", "DIETHYLAMINE",
+             "ISOPROPYL-ALCOHOL", "N-HEXADECANE", "2-METHYL-1-PROPANOL", "CARBON-DIOXIDE"]
+    out = []
+    page = 0
+    while len(out) < n_lines:
+        page += 1
+        out += [f"===== [PAGE {page}] =====", "Available in Databank", "Alias Name P11 P10 P93 P856 PCD"]
+        for _ in range(rnd.randint(20, 60)):
+            n = rnd.randint(1, 20000)
+            alias = rnd.choice([f"C{n % 40 + 1}H{n % 80 + 2}O-{n % 9 + 1}", f"A{n}", "(CH3)2O", "H2O"])
+            name = rnd.choice(names) + ("" if rnd.random() < 0.7 else f" {n}")
+            marks = " ".join(rnd.choice(["X", "X", "X", "-"]) for _ in range(5))
+            out.append(f"{alias}  {name}  {marks}" if rnd.random() < 0.95 else f"{alias} {name}")
+        out += ["", "PURE COMPONENT DATABANK PARAMETERS", "Some running text between tables."]
+    return out[:n_lines]
+
+def cmd_bench_parse(args):
+    import time
+    print(f"[INFO] bench-parse: 生成 {args.lines:,} 行合成文本 ...")
+    lines = synthetic_lines(args.lines, args.seed)
+    for label, normalized in (("raw (norm per line)", False), ("pre-normalized", True)):
+        best = None
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            n_rows = sum(1 for _ in AliasNameParser(normalized).iter_rows(lines))
+            dt = time.perf_counter() - t0
+            best = dt if best is None else min(best, dt)
+        print(f"  {label:<22} {len(lines) / best:>12,.0f} lines/s  ({best:.2f}s, {n_rows:,} rows)")
+
+def parse_backends(value: str) -> Tuple[str, ...]:
+    """--backend 参数：auto 或逗号分隔的后端名"""
+    if value == "auto":
+        return DEFAULT_BACKENDS
+    names = tuple(v.strip() for v in value.split(",") if v.strip())
+    unknown = [n for n in names if n not in BACKENDS]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown backend(s): {', '.join(unknown)}; choose from {', '.join(BACKENDS)}")
+    return names
+
 def build_argparser():
     p = argparse.ArgumentParser(description="Parse APRSYS Physical Property Data PDF to build alias↔name mapping for PURE11.")
     sub = p.add_subparsers(dest="cmd", required=True)
 
-    p1 = sub.add_parser("find-pages", help="Step 1: find relevant pages that contain the directory table")
+    # 读 PDF 的子命令共用：逐页文本缓存开关、提取后端、每页限时
+    cache_opts = argparse.ArgumentParser(add_help=False)
+    cache_opts.add_argument("--no-cache", action="store_true", help="Do not read or write the per-page text cache")
+    cache_opts.add_argument("--backend", dest="backends", type=parse_backends, default=DEFAULT_BACKENDS,
+                            help=f"Extraction backend(s), comma-separated fallback order ({', '.join(BACKENDS)}); default: auto")
+    cache_opts.add_argument("--page-timeout", type=float, default=None, metavar="SECONDS",
+                            help="Extract each page in a supervised worker process with this time budget; "
+                                 "timed-out or crashed pages are retried once with the next backend")
+
+    p1 = sub.add_parser("find-pages", help="Step 1: find relevant pages that contain the directory table", parents=[cache_opts])
     p1.add_argument("pdf", help="Input PDF path")
     p1.add_argument("-o", "--output", required=True, help="Output page list file (e.g., pages.txt)")
     p1.set_defaults(func=cmd_find_pages)
 
-    p2 = sub.add_parser("extract", help="Step 2: extract text from relevant pages")
+    p2 = sub.add_parser("extract", help="Step 2: extract text from relevant pages", parents=[cache_opts])
     p2.add_argument("pdf", help="Input PDF path")
     p2.add_argument("--pages", required=True, help="Page list file generated by find-pages")
     p2.add_argument("-o", "--output", required=True, help="Output text file (pages_text.txt)")
@@ -337,11 +860,25 @@ def build_argparser():
     p3.add_argument("-o", "--output", required=True, help="Output CSV path")
     p3.set_defaults(func=cmd_parse)
 
-    p4 = sub.add_parser("all", help="Run all steps at once")
+    p4 = sub.add_parser("all", help="Run all steps at once", parents=[cache_opts])
     p4.add_argument("pdf", help="Input PDF path")
     p4.add_argument("-o", "--output", required=True, help="Output CSV path")
+    p4.add_argument("--two-pass", action="store_true",
+                    help="Use the legacy find-pages + extract passes instead of the single-pass stream")
     p4.set_defaults(func=cmd_all)
 
+    p5 = sub.add_parser("bench", help="Benchmark extraction backends: pages/sec, peak RSS and rows parsed")
+    p5.add_argument("pdf", nargs="?", default="example/data/11.pdf", help="Input PDF path")
+    p5.add_argument("--backend", dest="backends", type=parse_backends, default=("pypdf2", "pdfminer", "pymupdf"),
+                    help="Comma-separated backends to compare")
+    p5.set_defaults(func=cmd_bench)
+
+    p6 = sub.add_parser("bench-parse", help="Micro-benchmark the alias/name parser on synthetic text (lines/sec)")
+    p6.add_argument("--lines", type=int, default=2_000_000, help="Number of synthetic lines")
+    p6.add_argument("--repeat", type=int, default=3, help="Repeat count; the best time is reported")
+    p6.add_argument("--seed", type=int, default=0, help="Random seed for the synthetic text")
+    p6.set_defaults(func=cmd_bench_parse)
+
     return p
 
 if __name__ == "__main__":
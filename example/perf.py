@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+性能测量小工具：峰值 RSS、在独立进程中运行（互不干扰地测内存）
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import sys
+
+
+def peak_rss_bytes():
+    """当前进程的峰值常驻内存（字节）；平台不支持时返回 None"""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def format_bytes(n):
+    if n is None:
+        return "n/a"
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024 or unit == "GB":
+            return f"{n:.1f} {unit}" if unit != "B" else f"{n} B"
+        n /= 1024
+
+
+def run_isolated(func, *args):
+    """在全新的 spawn 子进程中运行 func(*args)，使峰值 RSS 只反映该任务本身"""
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+        return pool.submit(func, *args).result()
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+PP.txt 偏移索引：随机访问某一页 / 某一张表，不必从头扫描或整体读入
+  - 索引文件与文本同目录：<文本文件名>.offsets.json
+    记录每个 "===== PAGE n =====" 标记与每个 Alias/Name 表头（---/Alias/---/Name/---）的字节偏移和行号
+  - 建索引是对 mmap 的一遍字节级正则扫描；文本的大小或 mtime 变了就视为过期，自动重建
+  - PPText 用 mmap 打开文本，按偏移直接切出页面或表格
+
+用法:
+  python example/pp_index.py build example/data/PP.txt
+  python example/pp_index.py page example/data/PP.txt 812
+  python example/pp_index.py table example/data/PP.txt 3
+"""
+
+from pathlib import Path
+import argparse
+import json
+import mmap
+import re
+
+OFFSET_INDEX_VERSION = 1
+PAGE_MARKER = re.compile(rb"^===== PAGE (\d+) =====[ \t]*\r?$", re.MULTILINE)
+# 与 split_tables.HEADER_PATTERN 相同的五行（各行 strip 后比较）；用零宽先行断言，重叠的表头也能逐个找到
+_WS = rb"[ \t\f\v]*"
+_EOL = rb"(?:\r?\n)"
+TABLE_HEADER = re.compile(
+    rb"^(?=" + _EOL.join(_WS + word + _WS for word in (rb"---", rb"Alias", rb"---", rb"Name", rb"---"))
+    + rb"\r?$)",
+    re.MULTILINE,
+)
+
+
+def offset_index_path(text_path):
+    """索引文件：与文本同目录，<文本文件名>.offsets.json"""
+    text_path = Path(text_path)
+    return text_path.with_name(text_path.name + ".offsets.json")
+
+
+def _stat_key(text_path):
+    st = Path(text_path).stat()
+    return st.st_size, st.st_mtime_ns
+
+
+def build_offset_index(text_path):
+    """一遍扫描文本，返回索引 dict（pages: [[页码, 偏移, 行号], ...]，tables: [[偏移, 行号], ...]）"""
+    size, mtime_ns = _stat_key(text_path)
+    pages, tables = [], []
+    if size:
+        with open(text_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            marks = [(m.start(), "page", int(m.group(1))) for m in PAGE_MARKER.finditer(mm)]
+            marks += [(m.start(), "table", None) for m in TABLE_HEADER.finditer(mm)]
+            marks.sort()
+            # 行号 = 偏移之前的换行数，按偏移顺序增量累计
+            line_no, last = 0, 0
+            for offset, kind, page_no in marks:
+                line_no += mm[last:offset].count(b"\n")
+                last = offset
+                if kind == "page":
+                    pages.append([page_no, offset, line_no])
+                else:
+                    tables.append([offset, line_no])
+    return {
+        "version": OFFSET_INDEX_VERSION,
+        "source": Path(text_path).name,
+        "size": size,
+        "mtime_ns": mtime_ns,
+        "pages": pages,
+        "tables": tables,
+    }
+
+
+def save_offset_index(text_path, index=None):
+    """建（或写出给定的）索引，返回索引文件路径"""
+    index = index if index is not None else build_offset_index(text_path)
+    path = offset_index_path(text_path)
+    path.write_text(json.dumps(index, separators=(",", ":")), encoding="utf-8")
+    return path
+
+
+def load_offset_index(text_path, rebuild=True):
+    """
+    读取索引；不存在、版本不符或文本已变化时：rebuild=True 重建并尝试写回，否则返回 None
+    """
+    path = offset_index_path(text_path)
+    try:
+        index = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        index = None
+    if (index is not None and index.get("version") == OFFSET_INDEX_VERSION
+            and (index.get("size"), index.get("mtime_ns")) == _stat_key(text_path)):
+        return index
+    if not rebuild:
+        return None
+    index = build_offset_index(text_path)
+    try:
+        save_offset_index(text_path, index)
+    except OSError:  # 只读目录：只在内存中使用
+        pass
+    return index
+
+
+def _text_lines(data):
+    """
+    字节切片 → 行列表，行尾保留 "\\n"；与文本模式逐行读取（通用换行）结果一致，
+    不用 str.splitlines()，它还会在 \\x0c、\\u2028 等字符处断行
+    """
+    text = data.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n")
+    lines = text.split("\n")
+    last = lines.pop()
+    lines = [line + "\n" for line in lines]
+    if last:
+        lines.append(last)
+    return lines
+
+
+class PPText:
+    """mmap 打开 PP.txt 并按偏移索引切片；可作为上下文管理器使用"""
+
+    def __init__(self, text_path, index=None):
+        self.path = Path(text_path)
+        self.index = index if index is not None else load_offset_index(self.path)
+        self._file = open(self.path, "rb")
+        size = self.index["size"]
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        self._page_at = {page_no: i for i, (page_no, _, _) in enumerate(self.index["pages"])}
+        self._page_starts = [offset for _, offset, _ in self.index["pages"]]
+        self._table_starts = [offset for offset, _ in self.index["tables"]]
+
+    @property
+    def page_numbers(self):
+        return [page_no for page_no, _, _ in self.index["pages"]]
+
+    @property
+    def num_tables(self):
+        return len(self._table_starts)
+
+    def _span(self, starts, i):
+        end = starts[i + 1] if i + 1 < len(starts) else self.index["size"]
+        return self._mmap[starts[i]:end]
+
+    def page_bytes(self, page_no):
+        """从该页标记到下一页标记（或文件末尾）的原始字节；页码不存在抛 KeyError"""
+        return self._span(self._page_starts, self._page_at[page_no])
+
+    def page(self, page_no):
+        return self.page_bytes(page_no).decode("utf-8")
+
+    def table_lines(self, table_no):
+        """第 table_no 张表（从 1 起，与 table_NN.txt 编号一致）的原始行"""
+        if not 1 <= table_no <= self.num_tables:
+            raise IndexError(f"表号超出范围: {table_no}（共 {self.num_tables} 张）")
+        return _text_lines(self._span(self._table_starts, table_no - 1))
+
+    def iter_table_lines(self):
+        """
+        逐表产出 (表头行号（从 0 起）, 原始行)；经 split_tables.clean_table_lines 清理后
+        与 split_tables.iter_tables 的产出一致
+        """
+        for table_no, (_, line_no) in enumerate(self.index["tables"], 1):
+            yield line_no, self.table_lines(table_no)
+
+    def close(self):
+        if isinstance(self._mmap, mmap.mmap):
+            self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def cmd_build(args):
+    index = build_offset_index(args.text)
+    path = save_offset_index(args.text, index)
+    print(f"🗂️  {path}: {len(index['pages'])} 页, {len(index['tables'])} 张表")
+
+
+def cmd_page(args):
+    with PPText(args.text) as pp:
+        try:
+            print(pp.page(args.page_no), end="")
+        except KeyError:
+            print(f"❌ 没有第 {args.page_no} 页（共 {len(pp.page_numbers)} 页）")
+
+
+def cmd_table(args):
+    with PPText(args.text) as pp:
+        try:
+            print("".join(pp.table_lines(args.table_no)), end="")
+        except IndexError as e:
+            print(f"❌ {e}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="PP.txt 页面/表格偏移索引与随机访问")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    pb = sub.add_parser("build", help="建立（或重建）偏移索引")
+    pb.add_argument("text", nargs="?", default="example/data/PP.txt")
+    pb.set_defaults(func=cmd_build)
+    pp = sub.add_parser("page", help="打印某一页")
+    pp.add_argument("text")
+    pp.add_argument("page_no", type=int)
+    pp.set_defaults(func=cmd_page)
+    pt = sub.add_parser("table", help="打印某一张表（从 1 起编号）")
+    pt.add_argument("text")
+    pt.add_argument("table_no", type=int)
+    pt.set_defaults(func=cmd_table)
+    args = ap.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
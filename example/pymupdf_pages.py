@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+PyMuPDF 逐页提取的公共函数
+供 extract_with_pymupdf.py / extract_compound_pages.py 共用：
+  - 单页 dict → 文本行 / 整页文本
+  - 按页码区间切分文档，多进程并行提取，结果按页序合并
+  - 可选的逐页缓存（page_cache.py），命中的页面不再重新提取
+"""
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import json
+
+MAX_CHUNK_PAGES = 16      # 每个子进程任务最多处理的页数
+OUTPUT_BUFFER = 1 << 20   # 输出文件缓冲区大小
+
+
+def dict_lines(text_dict):
+    """从 page.get_text("dict") 的结果中取出每一行文字（去空行）"""
+    lines = []
+    for block in text_dict["blocks"]:
+        if "lines" in block:  # 文本块
+            for line in block["lines"]:
+                line_text = ""
+                for span in line["spans"]:
+                    line_text += span["text"]
+
+                # 清理文字并添加
+                line_text = line_text.strip()
+                if line_text:  # 只添加非空行
+                    lines.append(line_text)
+    return lines
+
+
+def page_block(page_no, lines):
+    """单页输出块：页面标记 + 每行后添加 --- 分隔符 + 页面结束标记"""
+    block = [f"===== PAGE {page_no} =====", "---"]
+    for line_text in lines:
+        block.append(line_text)
+        block.append("---")
+    block.append("")
+    block.append("---")
+    return block
+
+
+def split_page_ranges(total_pages, workers, chunks_per_worker=4, max_chunk=MAX_CHUNK_PAGES):
+    """
+    把 [0, total_pages) 切成若干连续区间；区间数多于进程数以便负载均衡，
+    每个区间不超过 max_chunk 页，使单个任务结果的内存占用与文档长度无关
+    """
+    n_chunks = max(workers * chunks_per_worker, -(-total_pages // max_chunk))
+    n_chunks = max(1, min(total_pages, n_chunks))
+    size, extra = divmod(total_pages, n_chunks)
+    ranges = []
+    start = 0
+    for i in range(n_chunks):
+        end = start + size + (1 if i < extra else 0)
+        if end > start:
+            ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def slim_dict(text_dict):
+    """只保留文本块及其行/span 的文字、位置与字号，便于缓存与进程间传递"""
+    blocks = []
+    for block in text_dict["blocks"]:
+        if "lines" in block:
+            blocks.append({
+                "bbox": list(block["bbox"]),
+                "lines": [
+                    {
+                        "bbox": list(line["bbox"]),
+                        "spans": [
+                            {"text": span["text"], "bbox": list(span["bbox"]), "size": span["size"]}
+                            for span in line["spans"]
+                        ],
+                    }
+                    for line in block["lines"]
+                ],
+            })
+    return {"width": text_dict["width"], "height": text_dict["height"], "blocks": blocks}
+
+
+def backend_name():
+    """缓存键中的后端名（含 PyMuPDF 版本）"""
+    import fitz  # PyMuPDF
+
+    return f"pymupdf {fitz.VersionBind}"
+
+
+DICT_OPTIONS = {"format": "dict", "fields": "text,bbox,size"}
+
+
+def dict_text(text_dict):
+    """由 dict 拼出与 page.get_text() 等价的整页文本（用于页面分类，免去第二次解析）"""
+    return "\n".join(
+        "".join(span["text"] for span in line["spans"])
+        for block in text_dict["blocks"] if "lines" in block
+        for line in block["lines"]
+    )
+
+
+def extract_pages(pdf_path, page_nos):
+    """子进程任务：独立打开 PDF，提取给定页码，返回 [(页码, slim dict), ...]"""
+    import fitz  # PyMuPDF
+
+    doc = fitz.open(str(pdf_path))
+    try:
+        return [(page_no, slim_dict(doc.load_page(page_no - 1).get_text("dict")))
+                for page_no in page_nos]
+    finally:
+        doc.close()
+
+
+def _extract_todo(pdf_path, todo, workers):
+    """按页序产出待提取页面的结果；workers > 1 时切成连续页段多进程并行"""
+    if not todo:
+        return
+    if workers <= 1 or len(todo) <= 1:
+        yield from extract_pages(pdf_path, todo)
+        return
+
+    chunks = deque(todo[start:end] for start, end in split_page_ranges(len(todo), workers))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # 最多同时挂起 2×workers 个任务，按提交顺序取回结果，内存占用有界
+        pending = deque()
+        while chunks or pending:
+            while chunks and len(pending) < 2 * workers:
+                pending.append(pool.submit(extract_pages, pdf_path, chunks.popleft()))
+            yield from pending.popleft().result()
+
+
+def iter_pages(pdf_path, total_pages, workers=1, cache=None, pages=None, pdf_hash=None):
+    """
+    按页序产出 (页码, slim dict)，每页只做一次 get_text("dict")。
+    workers > 1 时把文档切成页码区间，由多个进程各自打开 PDF 并行提取；
+    结果按区间顺序合并，与单进程输出完全一致。
+    传入 cache（page_cache.PageCache）时，已缓存的页面直接读取，只提取未命中的页面。
+    pages: 只处理这些页码（如来自页面索引）；None 表示全部页面。
+    """
+    page_nos = list(range(1, total_pages + 1)) if pages is None else sorted(pages)
+    hits = set()
+    if cache is not None:
+        if pdf_hash is None:
+            from page_cache import file_sha256
+
+            pdf_hash = file_sha256(pdf_path)
+        backend = backend_name()
+        hits = cache.cached_pages(pdf_hash, backend, DICT_OPTIONS)
+        print(f"缓存命中: {sum(1 for n in page_nos if n in hits)}/{len(page_nos)} 页")
+
+    todo = [page_no for page_no in page_nos if page_no not in hits]
+    extracted = _extract_todo(pdf_path, todo, workers)
+    for page_no in page_nos:
+        if page_no in hits:
+            # 命中页逐页读取，不一次性载入整份文档
+            text_dict = cache.get(pdf_hash, page_no, backend, DICT_OPTIONS)
+            if text_dict is None:  # 运行期间被淘汰，就地重新提取
+                _, text_dict = extract_pages(pdf_path, [page_no])[0]
+            yield page_no, text_dict
+            continue
+        _, text_dict = next(extracted)
+        if cache is not None:
+            cache.put(pdf_hash, page_no, backend, DICT_OPTIONS, text_dict)
+        yield page_no, text_dict
+
+
+def line_records(page_no, text_dict):
+    """JSONL 格式：每个非空文本行一条记录（页码、块序号、行序号、bbox、字号、文字）"""
+    for block_no, block in enumerate(text_dict["blocks"]):
+        for line_no, line in enumerate(block["lines"]):
+            text = "".join(span["text"] for span in line["spans"]).strip()
+            if not text:
+                continue
+            yield {
+                "page": page_no,
+                "block": block_no,
+                "line": line_no,
+                "bbox": [round(v, 2) for v in line["bbox"]],
+                "size": round(max(span["size"] for span in line["spans"]), 2),
+                "text": text,
+            }
+
+
+class PageWriter:
+    """
+    逐页流式写出提取结果，内存中只保留当前页
+      - text : 与原来 '\n'.join(all_lines) 的输出逐字节一致（--- 分隔符格式）
+      - jsonl: 每个文本行一条 JSON 记录，取代 --- 分隔符约定
+    """
+
+    FORMATS = ("text", "jsonl")
+
+    def __init__(self, path, fmt="text"):
+        if fmt not in self.FORMATS:
+            raise ValueError(f"未知输出格式: {fmt}")
+        self.fmt = fmt
+        self.line_count = 0
+        self._file = open(path, "w", encoding="utf-8", buffering=OUTPUT_BUFFER)
+
+    def write_page(self, page_no, text_dict):
+        if self.fmt == "jsonl":
+            for record in line_records(page_no, text_dict):
+                self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+                self.line_count += 1
+            return
+        block = page_block(page_no, dict_lines(text_dict))
+        if self.line_count:
+            self._file.write("\n")
+        self._file.write("\n".join(block))
+        self.line_count += len(block)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
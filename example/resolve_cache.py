@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Aspen 别名解析结果的持久缓存（SQLite）
+  - search.py 的 resolve_component_id 每次都要插临时行、Tree.Process()、读标签、删行；
+    这里把 Aspen 的答案记下来，下次同一批名字直接跳过 COM
+  - 键 = (Aspen 版本, 当前挂接的数据库, 规范化别名)：换版本或换数据库组合后旧结果不会被误用
+  - 正向结果（别名 → Component ID）与负向结果（"数据库中没有"）分别设 TTL；
+    负向结果 TTL 较短，数据库更新后能较快重新尝试
+  - 只缓存 "Aspen 解析不出" 这一种失败；COM 调用本身出错不写缓存
+
+用法:
+  python example/resolve_cache.py stats
+  python example/resolve_cache.py show --negative
+  python example/resolve_cache.py purge            # 删除过期条目
+  python example/resolve_cache.py purge --all      # 清空
+"""
+
+from pathlib import Path
+from typing import NamedTuple
+import argparse
+import sqlite3
+import time
+
+DEFAULT_CACHE = "example/data/resolve_cache.sqlite3"
+POSITIVE_TTL = 30 * 24 * 3600   # 秒
+NEGATIVE_TTL = 24 * 3600
+DATABANK_NODES = (r"\Data\Components\Databanks", r"\Data\Components\DBANKS")
+
+
+class CachedResolution(NamedTuple):
+    component_id: str | None  # None = Aspen 此前判定数据库中没有
+    resolved_at: float
+
+    @property
+    def found(self):
+        return self.component_id is not None
+
+
+def alias_key(alias):
+    return " ".join(str(alias).split()).upper()
+
+
+def aspen_version(aspen_doc):
+    """Aspen 版本标识，如 "Aspen Plus 40.0 OLE Services"（即 print(aspen) 的输出）"""
+    for getter in (lambda: aspen_doc.Version, lambda: str(aspen_doc)):
+        try:
+            value = str(getter()).strip()
+        except Exception:
+            continue
+        if value:
+            return value
+    return "unknown"
+
+
+def active_databanks(aspen_doc):
+    """当前挂接的数据库名（排序后逗号连接）；取不到时返回空串，所有数据库组合共用一组缓存"""
+    for path in DATABANK_NODES:
+        try:
+            node = aspen_doc.Tree.FindNode(path)
+            if node is None:
+                continue
+            elements = node.Elements
+            names = [str(elements.Item(i).Name).strip().upper() for i in range(1, elements.Count + 1)]
+        except Exception:
+            continue
+        return ",".join(sorted(n for n in names if n))
+    return ""
+
+
+class ResolveCache:
+    """一个 (Aspen 版本, 数据库组合) 下的解析缓存；可作为上下文管理器使用"""
+
+    def __init__(self, path=DEFAULT_CACHE, version="unknown", databanks="",
+                 positive_ttl=POSITIVE_TTL, negative_ttl=NEGATIVE_TTL):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.version = version
+        self.databanks = databanks
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.hits = self.misses = 0
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS resolutions (
+                aspen_version TEXT NOT NULL,
+                databanks TEXT NOT NULL,
+                alias_key TEXT NOT NULL,
+                component_id TEXT,
+                resolved_at REAL NOT NULL,
+                PRIMARY KEY (aspen_version, databanks, alias_key)
+            ) WITHOUT ROWID
+            """
+        )
+
+    @classmethod
+    def for_aspen(cls, aspen_doc, path=DEFAULT_CACHE, **ttl):
+        return cls(path, aspen_version(aspen_doc), active_databanks(aspen_doc), **ttl)
+
+    def _fresh(self, component_id, resolved_at, now):
+        ttl = self.positive_ttl if component_id is not None else self.negative_ttl
+        return now - resolved_at < ttl
+
+    def get_many(self, aliases):
+        """{别名: CachedResolution}，只含未过期的条目；一次查询取回整批"""
+        keys = {alias: alias_key(alias) for alias in aliases}
+        rows = {}
+        unique = list(set(keys.values()))
+        for i in range(0, len(unique), 500):  # 每条语句的参数个数有上限
+            chunk = unique[i:i + 500]
+            rows.update((key, (cid, ts)) for key, cid, ts in self.conn.execute(
+                f"""
+                SELECT alias_key, component_id, resolved_at FROM resolutions
+                WHERE aspen_version = ? AND databanks = ? AND alias_key IN ({",".join("?" * len(chunk))})
+                """,
+                [self.version, self.databanks, *chunk],
+            ))
+        now = time.time()
+        result = {}
+        for alias, key in keys.items():
+            if key in rows and self._fresh(*rows[key], now):
+                result[alias] = CachedResolution(*rows[key])
+                self.hits += 1
+            else:
+                self.misses += 1
+        return result
+
+    def get(self, alias):
+        return self.get_many([alias]).get(alias)
+
+    def put(self, alias, component_id):
+        """记录 Aspen 的答案；component_id=None 表示数据库中没有"""
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO resolutions VALUES (?, ?, ?, ?, ?)",
+                (self.version, self.databanks, alias_key(alias), component_id, time.time()),
+            )
+
+    def purge(self, everything=False):
+        """删除过期条目（所有版本 / 数据库组合），everything=True 时清空；返回删除条数"""
+        now = time.time()
+        with self.conn:
+            if everything:
+                return self.conn.execute("DELETE FROM resolutions").rowcount
+            return self.conn.execute(
+                """
+                DELETE FROM resolutions
+                WHERE (component_id IS NOT NULL AND ? - resolved_at >= ?)
+                   OR (component_id IS NULL AND ? - resolved_at >= ?)
+                """,
+                (now, self.positive_ttl, now, self.negative_ttl),
+            ).rowcount
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def cmd_stats(args):
+    with ResolveCache(args.cache) as cache:
+        rows = cache.conn.execute(
+            """
+            SELECT aspen_version, databanks, COUNT(component_id), COUNT(*) - COUNT(component_id)
+            FROM resolutions GROUP BY aspen_version, databanks
+            """
+        ).fetchall()
+    if not rows:
+        print(f"📭 缓存为空: {args.cache}")
+    for version, databanks, n_pos, n_neg in rows:
+        print(f"🗂️  {version} [{databanks or '数据库未知'}]: 已解析 {n_pos:,}，数据库中没有 {n_neg:,}")
+
+
+def cmd_show(args):
+    now = time.time()
+    with ResolveCache(args.cache) as cache:
+        query = "SELECT alias_key, component_id, resolved_at, aspen_version FROM resolutions"
+        if args.negative:
+            query += " WHERE component_id IS NULL"
+        for key, cid, ts, version in cache.conn.execute(query + " ORDER BY alias_key"):
+            age = (now - ts) / 3600
+            fresh = cache._fresh(cid, ts, now)
+            print(f"   {key:25s} → {cid or '（数据库中没有）':20s} {age:7.1f} h 前{'' if fresh else '（已过期）'}  {version}")
+
+
+def cmd_purge(args):
+    with ResolveCache(args.cache) as cache:
+        n = cache.purge(everything=args.all)
+    print(f"🧹 删除 {n:,} 条")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Aspen 别名解析缓存")
+    ap.add_argument("--cache", default=DEFAULT_CACHE, help="缓存路径")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("stats", help="按 Aspen 版本 / 数据库组合统计").set_defaults(func=cmd_stats)
+    ps = sub.add_parser("show", help="列出条目")
+    ps.add_argument("--negative", action="store_true", help="只看负向结果")
+    ps.set_defaults(func=cmd_show)
+    pp = sub.add_parser("purge", help="删除过期条目")
+    pp.add_argument("--all", action="store_true", help="清空缓存")
+    pp.set_defaults(func=cmd_purge)
+    args = ap.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
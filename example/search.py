@@ -10,6 +10,9 @@ import sys
 import traceback
 import win32com.client
 
+from compound_index import resolve_with_local_index
+from resolve_cache import ResolveCache
+
 
 # —— 常量：组件表的“行维度” —— #
 ROW_DIM = 0  # 行维度固定用 0
@@ -133,12 +136,40 @@ def resolve_component_id(aspen_doc, alias_text):
     return str(resolved).strip()
 
 
+def resolve_component_id_cached(aspen_doc, alias_text, cache):
+    """
+    带持久缓存的 resolve_component_id（见 resolve_cache.py）：命中则不经 COM；
+    Aspen 的答案（包括"解析不出"）写回缓存，COM 自身出错不缓存
+    """
+    hit = cache.get(alias_text)
+    if hit is not None:
+        if not hit.found:
+            raise RuntimeError(f"别名 '{alias_text}' 此前已被 Aspen 判定不在数据库中（缓存结果，过期后重试）")
+        print(f"[Cache] alias='{alias_text}' -> '{hit.component_id}'")
+        return hit.component_id
+    try:
+        cid = resolve_component_id(aspen_doc, alias_text)
+    except RuntimeError:
+        cache.put(alias_text, None)
+        raise
+    cache.put(alias_text, cid)
+    return cid
+
+
 # —— 对外：按别名添加组件（带去重） —— #
-def add_component_by_alias(aspen_doc, alias_text, dedup=True):
+def add_component_by_alias(aspen_doc, alias_text, dedup=True, local_ids=None, cache=None):
     """
     使用别名添加组件：自动解析 -> 获取规范ID ->（可选去重）-> 正式插入。
+    local_ids: 本地索引预解析结果 {关键字: 别名}（见 compound_index.py），命中的不再经 COM 解析
+    cache: ResolveCache，记录 Aspen 以往的解析结果，命中的同样不经 COM
     """
-    cid = resolve_component_id(aspen_doc, alias_text)
+    cid = (local_ids or {}).get(alias_text)
+    if cid:
+        print(f"[Local] alias='{alias_text}' -> '{cid}'")
+    elif cache is not None:
+        cid = resolve_component_id_cached(aspen_doc, alias_text, cache)
+    else:
+        cid = resolve_component_id(aspen_doc, alias_text)
     tbl = _get_comp_table(aspen_doc)
 
     if dedup:
@@ -165,13 +196,17 @@ def main():
     # —— 示例：按别名/分子式/CAS 批量添加 —— #
     to_add = ["Water", "Methane", "7732-18-5", "APHA4HYD","C10H16N2O8" , "CH4", "4-HYDROXYACETOPHENONE", "C4H10O-5", "C10H16O4-D1"]
 
+    # 先用本地索引批量解析，再查以往 Aspen 的解析结果，只有都未命中的才交给 Aspen
+    local_ids = resolve_with_local_index(to_add)
+    cache = ResolveCache.for_aspen(aspen)
+
     tbl = _get_comp_table(aspen)
     print("RowCount (before):", _row_count(tbl))
 
     added = []
     for alias in to_add:
         try:
-            cid = add_component_by_alias(aspen, alias, dedup=True)
+            cid = add_component_by_alias(aspen, alias, dedup=True, local_ids=local_ids, cache=cache)
             added.append(cid)
         except Exception as e:
             print("Failed:", alias, "=>", e)
@@ -184,6 +219,8 @@ def main():
 
     print("RowCount (after):", _row_count(_get_comp_table(aspen)))
     print("Added IDs:", added)
+    print(f"解析缓存: 命中 {cache.hits}，未命中 {cache.misses}（{cache.version} [{cache.databanks or '数据库未知'}]）")
+    cache.close()
 
 
 if __name__ == "__main__":
@@ -4,90 +4,92 @@
 """
 分表工具：将 PP.txt 按照表头分割成独立的子表文件
 每个子表都以 "---\nAlias\n---\nName\n---" 模式开始
+表头位置取自 PP.txt 的偏移索引（pp_index.py，<PP.txt>.offsets.json，缺失或过期时自动重建），
+按偏移从 mmap 中直接切出每张表，不再逐行滑动窗口扫描整个文件
 """
 
 from pathlib import Path
 import re
 
-def find_table_headers(lines):
-    """查找所有表头的位置"""
-    table_positions = []
-    
-    # 查找模式: ---\nAlias\n---\nName\n---
-    for i in range(len(lines) - 4):
-        if (lines[i].strip() == "---" and 
-            lines[i+1].strip() == "Alias" and
-            lines[i+2].strip() == "---" and
-            lines[i+3].strip() == "Name" and
-            lines[i+4].strip() == "---"):
-            table_positions.append(i)
-    
-    return table_positions
+from pp_index import PPText
 
-def extract_table_content(lines, start_pos, end_pos=None):
-    """提取单个表的内容"""
-    if end_pos is None:
-        end_pos = len(lines)
-    
-    # 从表头开始提取到下一个表头或文件结束
-    table_lines = []
-    for i in range(start_pos, end_pos):
-        table_lines.append(lines[i])
-    
-    return table_lines
+HEADER_PATTERN = ["---", "Alias", "---", "Name", "---"]
+
+def clean_table_lines(table_content):
+    """清理空行（保留一些结构）：去行尾空白，去掉开头空行并合并连续空行"""
+    cleaned_content = []
+    for line in table_content:
+        line = line.rstrip()  # 移除行尾空白
+        if line or (cleaned_content and cleaned_content[-1] != ""):  # 避免连续空行
+            cleaned_content.append(line)
+    return cleaned_content
+
+def iter_tables(lines):
+    """
+    流式分表：逐行读入（可直接传文件对象），每遇到一个表头就产出上一张表
+    表头模式: ---\nAlias\n---\nName\n---，每张表从表头开始到下一个表头（或文件结束）为止
+    产出 (表头所在行号（从 0 起）, 清理后的表内容)；
+    第一个表头之前的内容丢弃，内存中只保留当前这张表
+    """
+    buf = []
+    start = None  # 当前表的起始行号；None 表示尚未遇到表头
+    for i, line in enumerate(lines):
+        buf.append(line)
+        if (len(buf) >= 5 and buf[-1].strip() == "---"
+                and [l.strip() for l in buf[-5:]] == HEADER_PATTERN):
+            if start is not None:
+                yield start, clean_table_lines(buf[:-5])
+            start = i - 4
+            buf = buf[-5:]
+        elif start is None and len(buf) > 4:
+            del buf[0]
+    if start is not None:
+        yield start, clean_table_lines(buf)
+
+def table_file_lines(cleaned_content):
+    """与写出 table_NN.txt 后再 readlines() 读回的结果一致（末行不带换行符）"""
+    text = "\n".join(cleaned_content).replace("\r\n", "\n").replace("\r", "\n")
+    parts = text.split("\n")
+    lines = [part + "\n" for part in parts[:-1]]
+    if parts[-1]:
+        lines.append(parts[-1])
+    return lines
+
+def table_number(table_file):
+    """table_NN.txt 的表号，用作排序键；表号超过两位时按文件名排序会把 table_100 排在 table_11 之前"""
+    suffix = Path(table_file).stem.rpartition("_")[2]
+    return (0, int(suffix), "") if suffix.isdigit() else (1, 0, suffix)
+
+def write_table(output_dir, table_no, cleaned_content):
+    """保存单个表：output_dir/table_NN.txt"""
+    table_file = output_dir / f"table_{table_no:02d}.txt"
+    with open(table_file, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(cleaned_content))
+    return table_file
 
 def split_tables(input_file, output_dir):
     """将 PP.txt 分割成独立的表文件"""
     
     print(f"📖 读取文件: {input_file}")
     
-    # 读取所有行
-    with open(input_file, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
-    
-    print(f"📄 总行数: {len(lines):,}")
-    
-    # 查找所有表头位置
-    table_positions = find_table_headers(lines)
-    
-    print(f"📋 找到 {len(table_positions)} 个表格:")
-    for i, pos in enumerate(table_positions, 1):
-        print(f"   表 {i}: 第 {pos+1} 行")
-    
     # 创建输出目录
     output_dir.mkdir(exist_ok=True)
     print(f"📁 创建输出目录: {output_dir}")
     
-    # 分割并保存每个表
-    for i, start_pos in enumerate(table_positions):
-        # 确定结束位置
-        if i + 1 < len(table_positions):
-            end_pos = table_positions[i + 1]
-        else:
-            end_pos = len(lines)
-        
-        # 提取表内容
-        table_content = extract_table_content(lines, start_pos, end_pos)
-        
-        # 清理空行（保留一些结构）
-        cleaned_content = []
-        for line in table_content:
-            line = line.rstrip()  # 移除行尾空白
-            if line or (cleaned_content and cleaned_content[-1] != ""):  # 避免连续空行
-                cleaned_content.append(line)
-        
-        # 保存到文件
-        table_file = output_dir / f"table_{i+1:02d}.txt"
-        with open(table_file, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(cleaned_content))
-        
-        print(f"💾 表 {i+1:2d}: {len(cleaned_content):4d} 行 → {table_file.name}")
+    # 按偏移索引逐表切片，边分表边保存
+    num_tables = 0
+    with PPText(input_file) as pp:
+        for num_tables, (start_pos, table_lines) in enumerate(pp.iter_table_lines(), 1):
+            cleaned_content = clean_table_lines(table_lines)
+            table_file = write_table(output_dir, num_tables, cleaned_content)
+            print(f"💾 表 {num_tables:2d}: 第 {start_pos+1} 行起, {len(cleaned_content):4d} 行 → {table_file.name}")
     
-    return len(table_positions)
+    print(f"📋 找到 {num_tables} 个表格")
+    return num_tables
 
 def analyze_table_summary(output_dir):
     """分析分割后的表格摘要"""
-    table_files = sorted(output_dir.glob("table_*.txt"))
+    table_files = sorted(output_dir.glob("table_*.txt"), key=table_number)
     
     if not table_files:
         print("❌ 没有找到表格文件")